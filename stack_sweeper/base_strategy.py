@@ -1,11 +1,44 @@
+from typing import TYPE_CHECKING, List, Optional, Set
+
 from .cloudformation import Stack
+from .decision import Decision
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
 
 
 class BaseStrategy:
-    """The base strategy class"""
+    """The base strategy class
+
+    Subclasses must implement at least one of should_remove() or evaluate()
+    """
 
     def should_remove(self, stack: Stack) -> bool:
         """Should this stack be removed?"""
+        return self.evaluate(stack).remove
+
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed, without modifying the stack or the strategy"""
+        return Decision(stack, bool(self.should_remove(stack)))
+
+    def candidates(  # pylint: disable=unused-argument
+        self, inventory: "Inventory"
+    ) -> Optional[Set[str]]:
+        """The IDs of the inventory's stacks that this strategy could remove
+
+        Strategies that can use the inventory's indexes to rule stacks out without evaluating
+        them return a superset of the stacks they'd remove. None means every stack needs to be
+        evaluated.
+        """
+        return None
+
+    def finalise(self, decisions: List[Decision]) -> List[Decision]:
+        """Apply any constraints that span the whole selection (e.g. limits) to a list of decisions"""
+        return decisions
+
+    def constrains_selection(self) -> bool:
+        """Can finalise() change any decision? Strategies that override it should say so"""
+        return False
 
     def get_mark_reason(self, stack: Stack) -> str:
         """Get a reason why the stack was marked"""
@@ -0,0 +1,156 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from .cloudformation import Stack
+from .log_utils import log
+from .paginator import paginate
+
+BUCKET_RESOURCE_TYPE = "AWS::S3::Bucket"
+REPOSITORY_RESOURCE_TYPE = "AWS::ECR::Repository"
+
+# the maximum number of keys/images each API call accepts
+DELETE_OBJECTS_BATCH_SIZE = 1000
+BATCH_DELETE_IMAGE_BATCH_SIZE = 100
+
+# the number of delete calls in flight for each bucket or repository
+DEFAULT_CONCURRENCY = 4
+
+
+class BucketNotEmptiedError(Exception):
+    """Raised when objects in a bucket can't be deleted"""
+
+    bucket: str
+    key: str
+    reason: str
+
+    def __init__(self, bucket: str, key: str, reason: str):
+        super().__init__(f"Could not empty bucket {bucket}: {key} - {reason}")
+        self.bucket = bucket
+        self.key = key
+        self.reason = reason
+
+
+def batches(items: Iterable, size: int) -> Iterator[List]:
+    """Split items into lists of at most size items"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+
+        yield batch
+
+
+def delete_in_batches(
+    delete, items: Iterable, size: int, concurrency: int = DEFAULT_CONCURRENCY
+) -> int:
+    """Call delete on batches of items, with at most concurrency calls in flight
+
+    Items are consumed lazily, so only the batches being deleted are held in memory.
+    """
+    deleted = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending: Deque[Future] = deque()
+        for batch in batches(items, size):
+            if len(pending) >= concurrency:
+                deleted += pending.popleft().result()
+
+            pending.append(executor.submit(delete, batch))
+
+        for future in pending:
+            deleted += future.result()
+
+    return deleted
+
+
+def object_versions(s3, bucket: str) -> Iterator[Dict[str, str]]:
+    """List every object version and delete marker in a bucket"""
+    paginator = s3.get_paginator("list_object_versions")
+    for page in paginator.paginate(Bucket=bucket):
+        for version in page.get("Versions", []) + page.get("DeleteMarkers", []):
+            yield {"Key": version["Key"], "VersionId": version["VersionId"]}
+
+
+def empty_bucket(s3, bucket: str, concurrency: int = DEFAULT_CONCURRENCY) -> int:
+    """Delete every object version in a bucket, returning the number deleted"""
+
+    def delete(objects: List[Dict[str, str]]) -> int:
+        response = s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": objects, "Quiet": True}
+        )
+        if response.get("Errors"):
+            error = response["Errors"][0]
+            raise BucketNotEmptiedError(bucket, error["Key"], error["Message"])
+
+        return len(objects)
+
+    return delete_in_batches(
+        delete, object_versions(s3, bucket), DELETE_OBJECTS_BATCH_SIZE, concurrency
+    )
+
+
+def empty_repository(
+    ecr, repository: str, concurrency: int = DEFAULT_CONCURRENCY
+) -> int:
+    """Delete every image in an ECR repository, returning the number deleted"""
+
+    def delete(image_ids: List[Dict[str, str]]) -> int:
+        ecr.batch_delete_image(repositoryName=repository, imageIds=image_ids)
+        return len(image_ids)
+
+    return delete_in_batches(
+        delete,
+        paginate(ecr.list_images, repositoryName=repository),
+        BATCH_DELETE_IMAGE_BATCH_SIZE,
+        concurrency,
+    )
+
+
+def find_blocking_resources(
+    stack: Stack, logical_resource_ids: Optional[Iterable[str]] = None
+) -> List[Dict[str, Any]]:
+    """Find the stack's resources that can't be deleted until they're emptied, optionally
+    only among some of its resources
+    """
+    wanted = None if logical_resource_ids is None else set(logical_resource_ids)
+    return [
+        resource
+        for logical_resource_id, resource in stack.resources.items()
+        if resource["ResourceType"] in (BUCKET_RESOURCE_TYPE, REPOSITORY_RESOURCE_TYPE)
+        and resource.get("PhysicalResourceId")
+        and resource["ResourceStatus"] != "DELETE_COMPLETE"
+        and (wanted is None or logical_resource_id in wanted)
+    ]
+
+
+def empty_blocking_resources(
+    stack: Stack,
+    s3,
+    ecr,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    logical_resource_ids: Optional[Iterable[str]] = None,
+):
+    """Empty the stack's buckets and repositories in parallel, so the stack can be deleted
+
+    With logical_resource_ids (e.g. the resources that failed to delete), only those
+    resources are emptied.
+    """
+
+    def empty(resource: Dict[str, Any]):
+        physical_id = resource["PhysicalResourceId"]
+        if resource["ResourceType"] == BUCKET_RESOURCE_TYPE:
+            deleted = empty_bucket(s3, physical_id, concurrency)
+            log(f"{stack.name}: deleted {deleted} object versions from {physical_id}")
+        else:
+            deleted = empty_repository(ecr, physical_id, concurrency)
+            log(f"{stack.name}: deleted {deleted} images from {physical_id}")
+
+    blocking_resources = find_blocking_resources(stack, logical_resource_ids)
+    if not blocking_resources:
+        return
+
+    with ThreadPoolExecutor(max_workers=len(blocking_resources)) as executor:
+        # list() re-raises the first failure, after all resources have been attempted
+        list(executor.map(empty, blocking_resources))
@@ -1,25 +1,555 @@
 import argparse
 import logging
 import os
+import signal
 import sys
-from datetime import timedelta
-from typing import List
-
-import boto3  # type: ignore
-
-from .base_strategy import BaseStrategy
-from .cloudformation import get_stacks
-from .exclude_names_strategy import ExcludeNamesStrategy
-from .exclude_tag_strategy import ExcludeTagStrategy
-from .expiration_tag_strategy import ExpirationTagStrategy
-from .last_updated_strategy import LastUpdatedStrategy
-from .limited_strategy import LimitedStrategy
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Set, Tuple
+
+from .cloudformation import ACTIVE_STACK_STATUSES, IN_PROGRESS_STACK_STATUSES
+from .expression_strategy import Expression, parse_expression
 from .log_utils import log, log_setup
-from .nested_strategies import NestedAllStrategy, NestedAnyStrategy
+from .nested_strategies import NestedAllStrategy
+from .options import get_exclusion_strategies_from_args, get_strategy_from_args
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
+    from .recording import Recorder
+    from .sharding import Shard
+    from .state import StateBackend
+
+# Only argument parsing and strategy construction happen at import time. boto3, dateutil and
+# the sweep modes are slow to import, so they're imported when they're used, which keeps
+# --help and argument errors fast. tests/test_import_time.py guards against regressions.
+# pylint: disable=import-outside-toplevel
 
 DEFAULT_REGION = "ap-southeast-2"
 
 
+def parse_thresholds(value: str) -> List[int]:
+    """Parse a comma-separated list of thresholds (in days)"""
+    try:
+        thresholds = [int(threshold) for threshold in value.split(",") if threshold]
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(
+            f"{value} is not a comma-separated list of days"
+        ) from e
+
+    if not thresholds or any(threshold < 0 for threshold in thresholds):
+        raise argparse.ArgumentTypeError(
+            f"{value} is not a comma-separated list of days"
+        )
+
+    return thresholds
+
+
+def parse_strategy_expression(value: str) -> Expression:
+    """Parse a --strategy expression"""
+    try:
+        return parse_expression(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+def parse_shard_argument(value: str) -> "Shard":
+    """Parse a --shard argument, in the form i/n"""
+    from .sharding import parse_shard
+
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(
+            f"{value} is not a shard in the form i/n, e.g. 1/4"
+        ) from e
+
+
+def add_sharding_arguments(parser: argparse.ArgumentParser):
+    """Add arguments for sharing an account's stacks between several sweepers"""
+    parser.add_argument(
+        "--shard",
+        type=parse_shard_argument,
+        help="only sweep shard i of n, partitioning stacks between n sweepers by a hash of their ID, e.g. 1/4",
+        required=False,
+    )
+    parser.add_argument(
+        "--lease-store",
+        type=str,
+        help="lease stacks before deleting them, so sweepers never delete the same stack: "
+        "sqlite:///relative/leases.db, sqlite:////absolute/leases.db, dynamodb://table-name or "
+        "dynamodb+http://host:port/table-name",
+        required=False,
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=int,
+        help="number of seconds a lease lasts before another sweeper can take it over (default: 3600)",
+        required=False,
+        default=3600,
+    )
+
+
+def add_recording_arguments(parser: argparse.ArgumentParser):
+    """Add arguments for recording CloudFormation calls, and replaying them offline"""
+    parser.add_argument(
+        "--record",
+        type=str,
+        help="record every CloudFormation call (scrubbed of account IDs) and how long it took "
+        "to a file, for --replay",
+        required=False,
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        help="answer CloudFormation calls from a --record recording rather than AWS, e.g. to "
+        "benchmark a sweep offline",
+        required=False,
+    )
+    parser.add_argument(
+        "--replay-latency-scale",
+        type=float,
+        help="multiply each replayed call's recorded latency by this, 0 for no latency "
+        "(default: 1)",
+        required=False,
+        default=1.0,
+    )
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser):
+    """Add the arguments controlling what's logged, and how"""
+    parser.add_argument(
+        "--log-level",
+        help="The log level to display (default: INFO)",
+        required=False,
+        default="INFO",
+    )
+    parser.add_argument(
+        "--async-logging",
+        help="Write logs from a background thread, so deletions never wait on log output "
+        "(messages are dropped if output falls too far behind)",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+    parser.add_argument(
+        "--coalesce-events",
+        help="Only log stack status changes and failed resources at INFO, and the progress of "
+        "every other resource at DEBUG",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+
+
+def add_deletion_arguments(parser: argparse.ArgumentParser):
+    """Add arguments controlling how stacks are deleted"""
+    parser.add_argument(
+        "--delete",
+        help="Should this delete identified stacks? (will perform a DRY RUN if not specified)",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+    parser.add_argument(
+        "--disable-termination-protection",
+        help="Should stacks with termination protection still be removed?",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+    parser.add_argument(
+        "--no-wait",
+        help="Should delete operations wait for each stack to finish?",
+        action="store_false",
+        required=False,
+        default=True,
+        dest="wait",
+    )
+    parser.add_argument(
+        "--empty-resources",
+        help="Should S3 buckets and ECR repositories that fail to delete be emptied before their "
+        "stacks are retried?",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+    parser.add_argument(
+        "--delete-retries",
+        type=int,
+        help="number of times to retry stacks that fail to delete (default: 2)",
+        required=False,
+        default=2,
+    )
+    parser.add_argument(
+        "--retry-delay",
+        type=int,
+        help="number of seconds before the first retry, doubling for each subsequent retry (default: 30)",
+        required=False,
+        default=30,
+    )
+    parser.add_argument(
+        "--retain-failed-resources",
+        help="Should the final retry retain resources that keep failing to delete?",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+
+
+def add_performance_arguments(parser: argparse.ArgumentParser):
+    """Add arguments controlling how inventories are taken, and how much runs at once"""
+    group = parser.add_argument_group("inventory and performance")
+    group.add_argument(
+        "--prefetch-pages",
+        type=int,
+        help="number of pages of stacks to fetch ahead, on a background thread, while taking an "
+        "inventory (default: 0, fetch each page when it's needed)",
+        required=False,
+        default=0,
+    )
+    group.add_argument(
+        "--fast-inventory",
+        help="take inventories with a streaming parser that only reads the stack fields and "
+        "tags the sweep needs, rather than parsing every field of every stack",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+    group.add_argument(
+        "--workers",
+        type=int,
+        help="number of stacks to describe, or to delete (and wait for), at the same time "
+        "(default: 1)",
+        required=False,
+        default=1,
+    )
+
+
+def add_sweep_mode_arguments(parser: argparse.ArgumentParser):
+    """Add arguments controlling when sweeps happen"""
+    parser.add_argument(
+        "--daemon",
+        help="Keep running, sweeping every --interval seconds",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+    parser.add_argument(
+        "--schedule",
+        help="Keep running, sweeping each stack as soon as its --expiry-tag or --stack-update-age "
+        "passes, and checking for changed stacks every --interval seconds",
+        action="store_true",
+        required=False,
+        default=False,
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        help="number of seconds between sweeps in --daemon mode, between checks for changed "
+        "stacks in --schedule mode, or between sweeps of every stack in --events mode "
+        "(default: 900)",
+        required=False,
+        default=900,
+    )
+    parser.add_argument(
+        "--health-port",
+        type=int,
+        help="local port to serve health and last run stats on in --daemon mode (default: 8080)",
+        required=False,
+        default=8080,
+    )
+    parser.add_argument(
+        "--events",
+        type=str,
+        help="sweep stacks as CloudFormation change events arrive from a file, stdin (-) or SQS queue URL",
+        required=False,
+    )
+    parser.add_argument(
+        "--state",
+        type=str,
+        help="keep the inventory and in-progress deletions between runs, in a local file or an "
+        "SSM parameter (ssm:/parameter/name), so each run only describes changed stacks",
+        required=False,
+    )
+    parser.add_argument(
+        "--snapshot-out",
+        type=str,
+        help="write the inventory to a compact snapshot file, for sweeping offline with "
+        "--snapshot",
+        required=False,
+    )
+    parser.add_argument(
+        "--snapshot",
+        type=str,
+        help="sweep the stacks in a --snapshot-out snapshot file rather than describing every "
+        "stack (always a dry run)",
+        required=False,
+    )
+
+
+def validate_deletion_args(
+    parser: argparse.ArgumentParser, parsed_args: argparse.Namespace
+):
+    """Validate the arguments controlling deletion, exiting with an error if they're invalid"""
+    if not parsed_args.wait and not parsed_args.delete:
+        parser.error("You must specify --delete to use --no-wait")
+
+    if parsed_args.disable_termination_protection and not parsed_args.delete:
+        parser.error(
+            "You must specify --delete to use --disable-termination-protection"
+        )
+
+    if parsed_args.empty_resources and not (
+        parsed_args.delete and parsed_args.wait and parsed_args.delete_retries
+    ):
+        parser.error(
+            "You must specify --delete, without --no-wait, and allow --delete-retries "
+            "to use --empty-resources"
+        )
+
+    if parsed_args.retain_failed_resources and not (
+        parsed_args.delete and parsed_args.wait and parsed_args.delete_retries
+    ):
+        parser.error(
+            "You must specify --delete, without --no-wait, and allow --delete-retries "
+            "to use --retain-failed-resources"
+        )
+
+    if parsed_args.delete_retries < 0:
+        parser.error("--delete-retries can not be negative")
+
+    if parsed_args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if parsed_args.lease_store and not parsed_args.delete:
+        parser.error("You must specify --delete to use --lease-store")
+
+    if parsed_args.lease_seconds < 1:
+        parser.error("--lease-seconds must be at least 1 second")
+
+
+def validate_apply_args(
+    parser: argparse.ArgumentParser, parsed_args: argparse.Namespace
+):
+    """Validate --apply, which takes its selection from the plan rather than strategies"""
+    selection_args = [
+        parsed_args.strategy,
+        parsed_args.expiry_tag,
+        parsed_args.stack_update_age,
+        parsed_args.stack_statuses,
+        parsed_args.exclude_tag,
+        parsed_args.exclude_stacks,
+        parsed_args.exclude_stack_prefixes,
+        parsed_args.limit,
+        parsed_args.plan_out,
+        parsed_args.plan_thresholds,
+        parsed_args.explain,
+    ]
+    if any(selection_args):
+        parser.error(
+            "--apply deletes the stacks selected by its plan, and can not be used with options "
+            "that select stacks"
+        )
+
+    if any(
+        [
+            parsed_args.daemon,
+            parsed_args.schedule,
+            parsed_args.events,
+            parsed_args.state,
+        ]
+    ):
+        parser.error(
+            "--apply can not be used with --daemon, --schedule, --events or --state"
+        )
+
+
+def validate_policies_args(
+    parser: argparse.ArgumentParser, parsed_args: argparse.Namespace
+):
+    """Validate --policies, where each policy has its own strategy and deletion options"""
+    policy_args = [
+        parsed_args.strategy,
+        parsed_args.expiry_tag,
+        parsed_args.stack_update_age,
+        parsed_args.stack_statuses,
+        parsed_args.exclude_tag,
+        parsed_args.exclude_stacks,
+        parsed_args.exclude_stack_prefixes,
+        parsed_args.limit,
+        parsed_args.disable_termination_protection,
+        parsed_args.empty_resources,
+        parsed_args.retain_failed_resources,
+    ]
+    if any(policy_args):
+        parser.error(
+            "--policies sets the strategy and deletion options of each policy, and can not be "
+            "used with those options"
+        )
+
+    if any(
+        [
+            parsed_args.plan_out,
+            parsed_args.apply,
+            parsed_args.explain,
+            parsed_args.daemon,
+            parsed_args.schedule,
+            parsed_args.events,
+            parsed_args.state,
+        ]
+    ):
+        parser.error(
+            "--policies can not be used with --plan-out, --apply, --explain, --daemon, "
+            "--schedule, --events or --state"
+        )
+
+
+def validate_snapshot_args(
+    parser: argparse.ArgumentParser, parsed_args: argparse.Namespace
+):
+    """Validate --snapshot and --snapshot-out, which are only used when sweeping once"""
+    other_modes = [
+        parsed_args.apply,
+        parsed_args.policies,
+        parsed_args.plan_thresholds,
+        parsed_args.daemon,
+        parsed_args.schedule,
+        parsed_args.events,
+    ]
+    if parsed_args.snapshot_out and any(other_modes):
+        parser.error(
+            "--snapshot-out can not be used with --apply, --policies, --plan-thresholds, "
+            "--daemon, --schedule or --events"
+        )
+
+    if parsed_args.snapshot and any(
+        [*other_modes, parsed_args.delete, parsed_args.state]
+    ):
+        parser.error(
+            "--snapshot sweeps stacks as they were when snapshotted, and can not be used with "
+            "--delete, --state, --apply, --policies, --plan-thresholds, --daemon, --schedule "
+            "or --events"
+        )
+
+
+def validate_recording_args(
+    parser: argparse.ArgumentParser, parsed_args: argparse.Namespace
+):
+    """Validate --record and --replay, which are only used by sweeps that end"""
+    if parsed_args.record and parsed_args.replay:
+        parser.error("Only one of --record or --replay can be used")
+
+    if parsed_args.record and parsed_args.delete:
+        parser.error(
+            "--record only records dry runs, and can not be used with --delete"
+        )
+
+    if (parsed_args.record or parsed_args.replay) and any(
+        [parsed_args.daemon, parsed_args.schedule, parsed_args.events]
+    ):
+        parser.error(
+            "--record and --replay can not be used with --daemon, --schedule or --events"
+        )
+
+    if parsed_args.replay_latency_scale < 0:
+        parser.error("--replay-latency-scale can not be negative")
+
+
+def validate_threshold_plan_args(
+    parser: argparse.ArgumentParser, parsed_args: argparse.Namespace
+):
+    """Validate --plan-thresholds, a report that neither deletes nor keeps running"""
+    if any(
+        [
+            parsed_args.delete,
+            parsed_args.daemon,
+            parsed_args.schedule,
+            parsed_args.events,
+            parsed_args.policies,
+            parsed_args.explain,
+        ]
+    ):
+        parser.error(
+            "--plan-thresholds is a report, and can not be used with --delete, --daemon, "
+            "--schedule, --events, --policies or --explain"
+        )
+
+
+def validate_selection_args(
+    parser: argparse.ArgumentParser, parsed_args: argparse.Namespace
+):
+    """Validate the arguments selecting stacks, either criteria or a --strategy expression"""
+    criteria = [
+        parsed_args.stack_update_age,
+        parsed_args.expiry_tag,
+        parsed_args.stack_statuses,
+    ]
+    if parsed_args.strategy:
+        if any(criteria):
+            parser.error(
+                "--strategy replaces --expiry-tag, --stack-update-age and --stack-statuses, "
+                "use tag_expired() or updated_before() instead"
+            )
+    elif not any(criteria):
+        parser.error(
+            "At least one of --expiry-tag, --stack-update-age, --stack-statuses or --strategy "
+            "is required"
+        )
+
+    if parsed_args.plan_out and parsed_args.delete:
+        parser.error(
+            "--plan-out writes a plan for --apply, and can not be used with --delete"
+        )
+
+
+def validate_sweep_mode_args(
+    parser: argparse.ArgumentParser, parsed_args: argparse.Namespace
+):
+    """Validate --daemon, --schedule and --events, the modes that keep running"""
+    sweep_modes = [parsed_args.daemon, parsed_args.schedule, bool(parsed_args.events)]
+    if sum(sweep_modes) > 1:
+        parser.error("Only one of --daemon, --schedule or --events can be used")
+
+    if parsed_args.schedule and (parsed_args.strategy or parsed_args.stack_statuses):
+        parser.error(
+            "--schedule works out when stacks are due from --expiry-tag and "
+            "--stack-update-age, and can not be used with --strategy or --stack-statuses"
+        )
+
+    if parsed_args.explain and any(sweep_modes):
+        parser.error("--explain can not be used with --daemon, --schedule or --events")
+
+    if parsed_args.state and any(sweep_modes):
+        parser.error("--state can not be used with --daemon, --schedule or --events")
+
+    if parsed_args.interval < 1:
+        parser.error("--interval must be at least 1 second")
+
+
+def validate_args(parser: argparse.ArgumentParser, parsed_args: argparse.Namespace):
+    """Validate combinations of arguments, exiting with an error if they're invalid"""
+    if parsed_args.prefetch_pages < 0:
+        parser.error("--prefetch-pages can not be negative")
+
+    validate_snapshot_args(parser, parsed_args)
+    validate_recording_args(parser, parsed_args)
+
+    if parsed_args.plan_thresholds:
+        validate_threshold_plan_args(parser, parsed_args)
+        return
+
+    validate_deletion_args(parser, parsed_args)
+
+    if parsed_args.policies:
+        validate_policies_args(parser, parsed_args)
+        return
+
+    if parsed_args.apply:
+        validate_apply_args(parser, parsed_args)
+        return
+
+    validate_selection_args(parser, parsed_args)
+    validate_sweep_mode_args(parser, parsed_args)
+
+
 def parse_args(args: List[str]) -> argparse.Namespace:
     """Parse CLI arguments"""
     parser = argparse.ArgumentParser(
@@ -31,6 +561,13 @@ def parse_args(args: List[str]) -> argparse.Namespace:
         help="the tag name that contains the stack's expiry",
         required=False,
     )
+    parser.add_argument(
+        "--strategy",
+        type=parse_strategy_expression,
+        help="an expression selecting stacks to remove, instead of --expiry-tag and --stack-update-age, "
+        'e.g. (tag_expired("expiry") or updated_before(30d)) and not name_glob("prod-*")',
+        required=False,
+    )
     parser.add_argument(
         "--exclude-tag",
         type=str,
@@ -60,97 +597,157 @@ def parse_args(args: List[str]) -> argparse.Namespace:
         required=False,
     )
     parser.add_argument(
-        "--limit",
-        type=int,
-        help="maximum number of stacks to delete",
+        "--stack-statuses",
+        nargs="+",
+        choices=ACTIVE_STACK_STATUSES,
+        metavar="STACK_STATUS",
+        help="list of stack statuses to remove stacks in, e.g. ROLLBACK_COMPLETE CREATE_FAILED",
         required=False,
+        default=[],
     )
     parser.add_argument(
-        "--log-level",
-        help="The log level to display (default: INFO)",
+        "--plan-thresholds",
+        type=parse_thresholds,
+        help="report how many stacks each comma-separated --stack-update-age would select, e.g. 30,60,90",
         required=False,
-        default="INFO",
     )
     parser.add_argument(
-        "--delete",
-        help="Should this delete identified stacks? (will perform a DRY RUN if not specified)",
-        action="store_true",
+        "--plan-out",
+        type=str,
+        help="write the stacks selected for deletion (and why) to a plan file, for --apply",
         required=False,
-        default=False,
     )
     parser.add_argument(
-        "--disable-termination-protection",
-        help="Should stacks with termination protection still be removed?",
+        "--apply",
+        type=str,
+        help="delete exactly the stacks in a --plan-out plan file, skipping any that changed since",
+        required=False,
+    )
+    parser.add_argument(
+        "--policies",
+        type=str,
+        help="sweep with the named policies in a JSON file, each applying its own strategy "
+        "and deletion options to the stacks matching its prefixes",
+        required=False,
+    )
+    parser.add_argument(
+        "--explain",
+        help="Report how many stacks each part of the strategy evaluated and removed, and how "
+        "long it took",
         action="store_true",
         required=False,
         default=False,
     )
     parser.add_argument(
-        "--no-wait",
-        help="Should delete operations wait for each stack to finish?",
-        action="store_false",
+        "--limit",
+        type=int,
+        help="maximum number of stacks to delete",
         required=False,
-        default=True,
-        dest="wait",
     )
+    add_logging_arguments(parser)
     parser.add_argument(
         "--region",
         help="What AWS region should be used? (Default: AWS_DEFAULT_REGION environment variable",
         required=False,
         default=os.environ.get("AWS_DEFAULT_REGION", DEFAULT_REGION),
     )
+    add_deletion_arguments(parser)
+    add_performance_arguments(parser)
+    add_sweep_mode_arguments(parser)
+    add_sharding_arguments(parser)
+    add_recording_arguments(parser)
 
     parsed_args = parser.parse_args(args=args)
-    if not any([parsed_args.stack_update_age, parsed_args.expiry_tag]):
-        parser.error("At least one of --expiry-tag or --stack-update-age is required")
+    validate_args(parser, parsed_args)
 
-    if not parsed_args.wait and not parsed_args.delete:
-        parser.error("You must specify --delete to use --no-wait")
+    return parsed_args
 
-    if parsed_args.disable_termination_protection and not parsed_args.delete:
-        parser.error(
-            "You must specify --delete to use --disable-termination-protection"
-        )
 
-    return parsed_args
+def get_inventory_statuses(args: argparse.Namespace) -> Optional[List[str]]:
+    """The statuses an inventory can be limited to, when --stack-statuses drives the selection
 
+    Stacks already being deleted are included, so they're still waited on.
+    """
+    if not args.stack_statuses or args.expiry_tag or args.stack_update_age:
+        return None
 
-def get_strategy_from_args(args: argparse.Namespace):
-    """Construct a strategy from args"""
-    age_strategies: List[BaseStrategy] = []
-    if args.expiry_tag:
-        age_strategies.append(ExpirationTagStrategy(args.expiry_tag))
+    return sorted(set(args.stack_statuses) | set(IN_PROGRESS_STACK_STATUSES))
 
-    if args.stack_update_age:
-        age_strategies.append(
-            LastUpdatedStrategy(timedelta(days=args.stack_update_age))
-        )
 
-    strategies: List[BaseStrategy] = [
-        NestedAnyStrategy(age_strategies),
-    ]
+def get_inventory_tag_keys(args: argparse.Namespace) -> Optional[Set[str]]:
+    """The only tags an inventory needs to keep, or None if it needs every tag
 
-    if args.exclude_tag:
-        strategies.append(ExcludeTagStrategy(args.exclude_tag))
+    Expressions and policies can test any tag, and plans, state and snapshots keep every tag.
+    """
+    if any(
+        [
+            args.strategy,
+            args.policies,
+            args.plan_out,
+            args.apply,
+            args.state,
+            args.snapshot_out,
+        ]
+    ):
+        return None
+
+    return {tag for tag in [args.expiry_tag, args.exclude_tag] if tag}
 
-    if any([args.exclude_stacks, args.exclude_stack_prefixes]):
-        strategies.append(
-            ExcludeNamesStrategy(
-                exclude_names=args.exclude_stacks,
-                exclude_name_prefixes=args.exclude_stack_prefixes,
-            )
-        )
 
-    strategy: BaseStrategy = NestedAllStrategy(strategies)
-    if args.limit:
-        strategy = LimitedStrategy(args.limit, strategy)
+def get_inventory_summary_client(args: argparse.Namespace):
+    """The client that describes stacks when loading an inventory, with --fast-inventory"""
+    if not args.fast_inventory:
+        return None
 
-    return strategy
+    from .fast_parsing import get_summary_client
+
+    return get_summary_client(args.region, args.workers, get_inventory_tag_keys(args))
+
+
+def get_inventory(args: argparse.Namespace, cloudformation) -> "Inventory":
+    """Create the (not yet loaded) inventory of the stacks to sweep"""
+    from .inventory import Inventory
+
+    return Inventory(
+        cloudformation,
+        args.shard,
+        get_inventory_statuses(args),
+        args.prefetch_pages,
+        get_inventory_summary_client(args),
+        args.workers,
+        get_inventory_tag_keys(args),
+    )
+
+
+def attach_recording(
+    args: argparse.Namespace, clients: List[Any]
+) -> Optional["Recorder"]:  # pragma: no cover
+    """Record the clients' calls with --record, or replay them with --replay
+
+    Returns the recorder, for its recording to be saved once the sweep ends.
+    """
+    if args.record:
+        from .recording import Recorder
+
+        recorder = Recorder()
+        for client in clients:
+            recorder.attach(client)
+
+        return recorder
+
+    if args.replay:
+        from .recording import Replayer, load_recording
+
+        replayer = Replayer(load_recording(args.replay), args.replay_latency_scale)
+        for client in clients:
+            replayer.attach(client)
+
+    return None
 
 
 def main(args: argparse.Namespace):  # pragma: no cover
     """The main entry point"""
-    log_setup(args.log_level)
+    log_setup(args.log_level, args.async_logging, args.coalesce_events)
 
     if not args.delete:
         log(
@@ -159,34 +756,211 @@ def main(args: argparse.Namespace):  # pragma: no cover
         command = " ".join(sys.argv[1:])
         log(f"e.g.: {os.path.basename(sys.argv[0])} {command} --delete")
 
-    strategy = get_strategy_from_args(args)
+    # plans and policies bring their own selection, so there's no strategy to report
+    if not (args.apply or args.policies):
+        strategy = get_strategy_from_args(args)
+        log(f"Using strategy configuration: {str(strategy)}", logging.DEBUG)
 
-    log(f"Using strategy configuration: {str(strategy)}", logging.DEBUG)
+    from .clients import get_client
 
-    cloudformation = boto3.client("cloudformation", region_name=args.region)
-    stacks = list(get_stacks(cloudformation))
+    cloudformation = get_client("cloudformation", args.region, args.workers)
+    inventory = get_inventory(args, cloudformation)
+    recorder = attach_recording(
+        args, list(filter(None, [cloudformation, inventory.summary_client]))
+    )
 
-    filtered_stacks = list(filter(strategy.should_remove, stacks))
+    run = next(
+        (runner for option, runner in MODE_RUNNERS if getattr(args, option)),
+        run_sweep,
+    )
+    try:
+        run(args, inventory)
+    finally:
+        if recorder:
+            recorder.save(args.record)
+            log(f"Recorded {len(recorder.calls)} CloudFormation calls in {args.record}")
 
-    log(f"{len(filtered_stacks)} stacks (of {len(stacks)}) identified for removal")
-    for stack in filtered_stacks:
-        marked_reasons = [
-            mark.get_mark_reason(stack) for mark in stack.marked_by_strategies
-        ]
+
+def load_sweep_inventory(
+    args: argparse.Namespace, inventory: "Inventory"
+) -> Optional["StateBackend"]:  # pragma: no cover
+    """Load the stacks to sweep, from --snapshot, or resuming from --state if given
+
+    Returns the --state backend, for the sweep's state to be saved to.
+    """
+    backend = None
+    saved_state = None
+    if args.state:
+        from .state import get_state_backend, restore_state
+
+        backend = get_state_backend(args.state, args.region)
+        saved_state = restore_state(backend, inventory)
+        if saved_state:
+            log(f"Resuming from the state saved in {args.state}")
+
+    if args.snapshot:
+        from .snapshot import Snapshot
+
+        inventory.restore(list(Snapshot(args.snapshot)))
+        log(f"Sweeping the {len(inventory)} stacks snapshotted in {args.snapshot}")
+    else:
+        inventory.refresh()  # a full load, unless resuming from --state
+        if saved_state:
+            from .state import report_deletions
+
+            report_deletions(saved_state, inventory)
+
+    return backend
+
+
+def run_sweep(args: argparse.Namespace, inventory: "Inventory"):  # pragma: no cover
+    """Sweep every stack once, resuming from (and then saving) --state if given
+
+    With --snapshot, the stacks are read from the snapshot rather than described.
+    """
+    from .sweeper import sweep
+
+    backend = load_sweep_inventory(args, inventory)
+    if args.snapshot_out:
+        from .snapshot import write_snapshot
+
+        write_snapshot(args.snapshot_out, inventory)
+
+    if args.explain:
+        from .explain import explain_strategy, log_explanation
+
+        explained = explain_strategy(get_strategy_from_args(args))
+        result = sweep(args, explained, inventory)
+        log_explanation(explained)
+    else:
+        result = sweep(args, get_strategy_from_args(args), inventory)
+
+    if backend:
+        from .state import save_state
+
+        save_state(backend, inventory, args, result)
+
+    if args.plan_out:
+        from .plan import create_plan, write_plan
+
+        write_plan(args.plan_out, create_plan(result.selected, args.region))
+
+
+def run_apply(args: argparse.Namespace, inventory: "Inventory"):  # pragma: no cover
+    """Delete the stacks in an --apply plan, checking only those stacks are unchanged"""
+    from .plan import check_freshness, read_plan
+    from .sweeper import delete_stacks
+
+    plan = read_plan(args.apply)
+    if plan["region"] != args.region:
+        raise ValueError(
+            f"{args.apply} was planned for {plan['region']}, not {args.region}"
+        )
+
+    check = check_freshness(inventory.cloudformation, plan, args.workers)
+    log(
+        f"{len(check.fresh)} stacks (of {len(plan['stacks'])} planned) are unchanged, "
+        f"{len(check.deleting)} are already being deleted"
+    )
+
+    if args.delete:
+        delete_stacks(args, check.fresh, check.deleting if args.wait else None)
+
+
+def run_policies(args: argparse.Namespace, inventory: "Inventory"):  # pragma: no cover
+    """Sweep every --policies policy over a single inventory"""
+    from .policies import load_policies, log_policy_results, sweep_policies
+
+    policies = load_policies(args.policies, args, parse_args)
+    inventory.load()
+    log_policy_results(sweep_policies(policies, inventory))
+
+
+def run_threshold_plan(
+    args: argparse.Namespace, inventory: "Inventory"
+):  # pragma: no cover
+    """Report what each --plan-thresholds threshold would select, from a single inventory"""
+    from .threshold_plan import log_threshold_plans, plan_thresholds
+
+    inventory.load()
+    exclusion = NestedAllStrategy(get_exclusion_strategies_from_args(args))
+    log_threshold_plans(plan_thresholds(inventory, args.plan_thresholds, exclusion))
+
+
+def run_daemon(args: argparse.Namespace, inventory: "Inventory"):  # pragma: no cover
+    """Sweep on an interval until terminated"""
+    from .daemon import Daemon, HealthServer
+
+    daemon = Daemon(args, inventory, get_strategy_from_args)
+    health_server = HealthServer(daemon, args.health_port)
+    health_server.start()
+    log(
+        f"Sweeping every {args.interval} seconds, health available on port {args.health_port}"
+    )
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        health_server.shutdown()
+
+
+def run_schedule(args: argparse.Namespace, inventory: "Inventory"):  # pragma: no cover
+    """Sweep stacks as they fall due until terminated"""
+    from .expiry_scheduler import ExpiryScheduler
+
+    scheduler = ExpiryScheduler(args, inventory, get_strategy_from_args)
+    log(
+        f"Sweeping stacks as they fall due, checking for changes every {args.interval} seconds"
+    )
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_events(args: argparse.Namespace, inventory: "Inventory"):  # pragma: no cover
+    """Sweep stacks as their change events arrive"""
+    from .clients import get_client
+    from .events import EventProcessor, sqs_batches, sqs_endpoint_url, stream_batches
+
+    processor = EventProcessor(args, inventory, get_strategy_from_args)
+    log(f"Sweeping stacks as change events arrive from {args.events}")
+
+    try:
+        if args.events == "-":
+            processor.run(stream_batches(sys.stdin))
+        elif args.events.startswith(("https://", "http://")):
+            sqs = get_client(
+                "sqs", args.region, endpoint_url=sqs_endpoint_url(args.events)
+            )
+            processor.run(sqs_batches(sqs, args.events))
+        else:
+            with open(args.events, encoding="utf-8") as stream:
+                processor.run(stream_batches(stream))
+    except KeyboardInterrupt:
+        pass
+
+    if processor.failed_batches:
         log(
-            f"{stack.name} selected for removal: {', '.join(marked_reasons)}",
-            logging.DEBUG,
+            f"{processor.failed_batches} batches of events failed to process",
+            logging.ERROR,
         )
 
-        if args.delete:
-            try:
-                if args.disable_termination_protection and stack.termination_protection:
-                    log(f"Disabling termination protection on stack {stack.name}")
-                    stack.disable_termination_protection()
 
-                stack.delete(args.wait)
-            except Exception as e:  # pylint: disable=broad-except
-                log(str(e), logging.ERROR)
+# the runners for each mode, checked in order; without any, stacks are swept once
+MODE_RUNNERS: List[Tuple[str, Callable[[argparse.Namespace, "Inventory"], None]]] = [
+    ("apply", run_apply),
+    ("policies", run_policies),
+    ("plan_thresholds", run_threshold_plan),
+    ("daemon", run_daemon),
+    ("schedule", run_schedule),
+    ("events", run_events),
+]
 
 
 def entry_point():  # pragma: no cover
@@ -0,0 +1,56 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+# botocore's default connection pool size, used as a floor
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+DEFAULT_MAX_ATTEMPTS = 10
+
+_CLIENTS: Dict[Tuple, Any] = {}
+_LOCK = threading.Lock()
+
+
+def client_config(concurrency: int = 1):
+    """The botocore config for clients shared by up to `concurrency` worker threads"""
+    from botocore.config import (  # type: ignore # pylint: disable=import-outside-toplevel
+        Config,
+    )
+
+    return Config(
+        max_pool_connections=max(concurrency, DEFAULT_MAX_POOL_CONNECTIONS),
+        retries={"mode": "adaptive", "max_attempts": DEFAULT_MAX_ATTEMPTS},
+    )
+
+
+def get_client(
+    service_name: str,
+    region_name: Optional[str] = None,
+    concurrency: int = 1,
+    endpoint_url: Optional[str] = None,
+):
+    """Get a boto3 client that can be shared by up to `concurrency` worker threads
+
+    Clients are cached, so every caller asking for the same service, region and concurrency
+    shares one client (and its connection pool). The pool is sized so that each worker can
+    hold a connection, and adaptive retries back off client-side when CloudFormation throttles.
+    """
+    key = (service_name, region_name, concurrency, endpoint_url)
+
+    # creating clients isn't thread-safe (using them is), so creation is serialised
+    with _LOCK:
+        if key not in _CLIENTS:
+            import boto3  # type: ignore # pylint: disable=import-outside-toplevel
+
+            _CLIENTS[key] = boto3.client(
+                service_name,
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=client_config(concurrency),
+            )
+
+        return _CLIENTS[key]
+
+
+def clear_clients():
+    """Forget all cached clients"""
+    with _LOCK:
+        _CLIENTS.clear()
@@ -1,14 +1,41 @@
+import logging
 import time
-from datetime import datetime
-from typing import Any, Dict, Iterator, List, Optional
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional
 
+from . import log_utils
 from .log_utils import log
-from .paginator import paginate
+from .paginator import paginate, paginate_prefetched
 
 IN_PROGRESS_STACK_STATUSES = [
     "DELETE_IN_PROGRESS",
 ]
 
+# every status except DELETE_COMPLETE, which list_stacks otherwise returns for 90 days
+ACTIVE_STACK_STATUSES = [
+    "CREATE_IN_PROGRESS",
+    "CREATE_FAILED",
+    "CREATE_COMPLETE",
+    "ROLLBACK_IN_PROGRESS",
+    "ROLLBACK_FAILED",
+    "ROLLBACK_COMPLETE",
+    "DELETE_IN_PROGRESS",
+    "DELETE_FAILED",
+    "UPDATE_IN_PROGRESS",
+    "UPDATE_COMPLETE_CLEANUP_IN_PROGRESS",
+    "UPDATE_COMPLETE",
+    "UPDATE_FAILED",
+    "UPDATE_ROLLBACK_IN_PROGRESS",
+    "UPDATE_ROLLBACK_FAILED",
+    "UPDATE_ROLLBACK_COMPLETE_CLEANUP_IN_PROGRESS",
+    "UPDATE_ROLLBACK_COMPLETE",
+    "REVIEW_IN_PROGRESS",
+    "IMPORT_IN_PROGRESS",
+    "IMPORT_COMPLETE",
+    "IMPORT_ROLLBACK_IN_PROGRESS",
+    "IMPORT_ROLLBACK_FAILED",
+    "IMPORT_ROLLBACK_COMPLETE",
+]
+
 SUCCESSFUL_STACK_STATUSES = [
     "CREATE_COMPLETE",
     "UPDATE_COMPLETE",
@@ -17,54 +44,253 @@ SUCCESSFUL_STACK_STATUSES = [
 ]
 
 
+def event_log_level(
+    logical_resource_id: str, resource_status: str, stack_name: Optional[str]
+) -> int:
+    """The level to log an event at
+
+    When events are coalesced, only the stack's own status transitions and failed resources
+    are logged at INFO, and every other resource's progress is logged at DEBUG.
+    """
+    if (
+        not log_utils.COALESCE_EVENTS
+        or logical_resource_id == stack_name
+        or resource_status.endswith("_FAILED")
+    ):
+        return logging.INFO
+
+    return logging.DEBUG
+
+
 def log_event(
-    logical_resource_id: str, resource_status: str, status_reason: Optional[str] = None
+    logical_resource_id: str,
+    resource_status: str,
+    status_reason: Optional[str] = None,
+    stack_name: Optional[str] = None,
 ):
-    """Formats and logs a CloudFormation stack event"""
+    """Formats and logs a CloudFormation stack event
+
+    Events are prefixed with their stack's name, as stacks deleted in parallel interleave
+    their events.
+    """
+    level = event_log_level(logical_resource_id, resource_status, stack_name)
+    if not log_utils.LOGGER.isEnabledFor(
+        level
+    ):  # skip formatting events nobody will see
+        return None
+
+    parts = [logical_resource_id, resource_status]
+    if stack_name:
+        parts.insert(0, stack_name)
     if status_reason:
-        return log(f"{logical_resource_id} - {resource_status} - {status_reason}")
+        parts.append(status_reason)
+
+    return log(" - ".join(parts), level)
+
+
+def find_failed_resources(events: List[Dict[str, Any]], stack_name: str) -> List[str]:
+    """Find the resources that failed to delete during the stack's most recent deletion
+
+    Events are newest first, so the search stops at the event that began the deletion.
+    """
+    failed_resources: List[str] = []
+    for event in events:
+        if event["LogicalResourceId"] == stack_name:
+            if event["ResourceStatus"] == "DELETE_IN_PROGRESS":
+                break
+
+            continue
+
+        if (
+            event["ResourceStatus"] == "DELETE_FAILED"
+            and event["LogicalResourceId"] not in failed_resources
+        ):
+            failed_resources.append(event["LogicalResourceId"])
+
+    return failed_resources
+
+
+class StackDeletionError(Exception):
+    """Raised when a stack deletion finishes in an unsuccessful status"""
+
+    stack_name: str
+    status: str
+    failed_resources: List[str]
+
+    def __init__(self, stack_name: str, status: str, failed_resources: List[str]):
+        super().__init__(
+            f"Stack did not delete successfully: {stack_name} is in {status} status"
+        )
+        self.stack_name = stack_name
+        self.status = status
+        self.failed_resources = failed_resources
+
+
+class DetailField:
+    """A Stack attribute that reads from (and writes to) the stack's describe_stacks detail"""
+
+    def __init__(self, key: str, fallback_key: Optional[str] = None):
+        self.key = key
+        self.fallback_key = fallback_key  # read when the key is missing
+
+    def __get__(self, stack: Optional["Stack"], owner=None) -> Any:
+        if stack is None:
+            return self
+
+        detail = stack.detail
+        if self.fallback_key and self.key not in detail:
+            return detail.get(self.fallback_key)
+
+        return detail.get(self.key)
+
+    def __set__(self, stack: "Stack", value: Any):
+        stack.detail[self.key] = value
+
+
+class DetailPairs(MutableMapping[str, str]):
+    """A dict over a list of key and value pairs in a stack's detail (e.g. its Tags)
+
+    Changes are written back to the detail's list, keeping any other fields of its entries.
+    """
+
+    def __init__(
+        self,
+        detail: MutableMapping[str, Any],
+        list_key: str,
+        key_field: str,
+        value_field: str,
+    ):
+        self.detail = detail
+        self.list_key = list_key
+        self.key_field = key_field
+        self.value_field = value_field
+        self.pairs = {
+            item[key_field]: item[value_field] for item in detail.get(list_key, [])
+        }
+
+    def __getitem__(self, key: str) -> str:
+        return self.pairs[key]
+
+    def __setitem__(self, key: str, value: str):
+        self.pairs[key] = value
+        self.__write()
+
+    def __delitem__(self, key: str):
+        del self.pairs[key]
+        self.__write()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.pairs)
 
-    return log(f"{logical_resource_id} - {resource_status}")
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def __repr__(self) -> str:
+        return repr(self.pairs)
+
+    def __write(self):
+        items = {
+            item[self.key_field]: item for item in self.detail.get(self.list_key, [])
+        }
+        self.detail[self.list_key] = [
+            {**items.get(key, {}), self.key_field: key, self.value_field: value}
+            for key, value in self.pairs.items()
+        ]
 
 
 class Stack:
-    """Class that holds information about a CloudFormation stack, and can perform update to it"""
-
-    stack_id: str
-    name: str
-    parameters: Dict[str, str]
-    tags: Dict[str, str]
-    created_at: datetime
-    last_updated_at: datetime
+    """Class that holds information about a CloudFormation stack, and can perform update to it
+
+    A stack is a view over its describe_stacks detail, which it owns: nothing is copied out of
+    the detail, and tags and parameters are only built when they're first needed. Stacks that
+    a strategy rejects straight away cost little more than the detail itself.
+    """
+
+    detail: MutableMapping[str, Any]  # e.g. a dict, or a snapshot's SnapshotDetail
+    stack_id = DetailField("StackId")
+    name = DetailField("StackName")
+    created_at = DetailField("CreationTime")
+    last_updated_at = DetailField("LastUpdatedTime", "CreationTime")
+    parent_id = DetailField("ParentId")
+    # as of the inventory, see status for the current status
+    stack_status = DetailField("StackStatus")
+    failed_resources: List[str]
     marked_by_strategies: List
     cloudformation: Any
 
-    def __init__(self, **kwargs):
+    def __init__(self, detail: Optional[MutableMapping[str, Any]] = None, **kwargs):
+        self.detail = {} if detail is None else detail
+        self.failed_resources = []
+        self.marked_by_strategies = []
+        self.__tags: Optional[DetailPairs] = None
+        self.__parameters: Optional[DetailPairs] = None
+
         for attribute, value in kwargs.items():
             setattr(self, attribute, value)
 
-        self.marked_by_strategies = []
-
     @classmethod
-    def factory_from_stack_detail(cls, cloudformation, stack_detail: Dict[str, Any]):
+    def factory_from_stack_detail(
+        cls, cloudformation, stack_detail: MutableMapping[str, Any]
+    ):
         """Create a Stack object from the describe_stacks output"""
-        tags = {tag["Key"]: tag["Value"] for tag in stack_detail.get("Tags", [])}
-        parameters = {
-            parameter["ParameterKey"]: parameter["ParameterValue"]
-            for parameter in stack_detail.get("Parameters", [])
-        }
+        return cls(stack_detail, cloudformation=cloudformation)
 
-        return cls(
-            stack_id=stack_detail["StackId"],
-            name=stack_detail["StackName"],
-            parameters=parameters,
-            tags=tags,
-            created_at=stack_detail["CreationTime"],
-            last_updated_at=stack_detail.get(
-                "LastUpdatedTime", stack_detail["CreationTime"]
-            ),
-            cloudformation=cloudformation,
-        )
+    @property
+    def tag_list(self) -> List[Dict[str, str]]:
+        """The stack's tags, as described, see tags for a dict"""
+        return self.detail.get("Tags", [])
+
+    @tag_list.setter
+    def tag_list(self, tag_list: List[Dict[str, str]]):
+        self.detail["Tags"] = tag_list
+        self.__tags = None
+
+    @property
+    def parameters(self) -> MutableMapping[str, str]:
+        """The stack's parameters, built from the described parameters the first time they're needed
+
+        Changes are written through to the detail.
+        """
+        if self.__parameters is None:
+            self.__parameters = DetailPairs(
+                self.detail, "Parameters", "ParameterKey", "ParameterValue"
+            )
+
+        return self.__parameters
+
+    @parameters.setter
+    def parameters(self, parameters: Dict[str, str]):
+        self.detail["Parameters"] = [
+            {"ParameterKey": key, "ParameterValue": value}
+            for key, value in parameters.items()
+        ]
+        self.__parameters = None
+
+    @property
+    def tags(self) -> MutableMapping[str, str]:
+        """The stack's tags, built from the described tag list the first time they're needed
+
+        Changes are written through to the detail.
+        """
+        if self.__tags is None:
+            self.__tags = DetailPairs(self.detail, "Tags", "Key", "Value")
+
+        return self.__tags
+
+    @tags.setter
+    def tags(self, tags: Dict[str, str]):
+        self.tag_list = [{"Key": key, "Value": value} for key, value in tags.items()]
+
+    def tag_value(self, key: str) -> Optional[str]:
+        """Find a single tag's value, without building every tag if they aren't needed yet"""
+        if self.__tags is not None:
+            return self.__tags.get(key)
+
+        for tag in self.tag_list:
+            if tag["Key"] == key:
+                return tag["Value"]
+
+        return None
 
     @property
     def status(self) -> str:
@@ -98,36 +324,51 @@ class Stack:
             StackName=self.stack_id, EnableTerminationProtection=False
         )
 
-    def delete(self, wait: bool = True):
-        """Performs a delete against the stack and optionally waits for it to complete"""
-        self.cloudformation.delete_stack(StackName=self.stack_id)
+    def delete(self, wait: bool = True, retain_resources: Optional[List[str]] = None):
+        """Performs a delete against the stack and optionally waits for it to complete
+
+        retain_resources can only be used on stacks in DELETE_FAILED status.
+        """
+        if retain_resources:
+            self.cloudformation.delete_stack(
+                StackName=self.stack_id, RetainResources=retain_resources
+            )
+        else:
+            self.cloudformation.delete_stack(StackName=self.stack_id)
 
         if wait:
-            stack_status = self.wait()
+            self.wait_for_deletion()
 
-            if stack_status not in SUCCESSFUL_STACK_STATUSES:
-                raise Exception(
-                    f"Stack did not delete successfully: {self.name} is in {stack_status} status"
-                )
+    def wait_for_deletion(self):
+        """Waits for the stack's deletion to complete, raising StackDeletionError if it fails"""
+        stack_status = self.wait()
+
+        if stack_status not in SUCCESSFUL_STACK_STATUSES:
+            raise StackDeletionError(self.name, stack_status, self.failed_resources)
 
     def wait(self) -> str:
-        """Waits for a stack update to complete, logging each event during the update"""
+        """Waits for a stack update to complete, logging each event during the update
+
+        Resources that failed to delete are recorded in failed_resources.
+        """
         stack_status = self.status
-        events = self.events
+        all_events = self.events
 
-        event_ids = [event["EventId"] for event in events]
+        event_ids = [event["EventId"] for event in all_events]
 
-        for event in reversed(events[:1]):
+        for event in reversed(all_events[:1]):
             log_event(
                 event["LogicalResourceId"],
                 event["ResourceStatus"],
                 event.get("ResourceStatusReason", None),
+                self.name,
             )
 
         while stack_status in IN_PROGRESS_STACK_STATUSES:
+            all_events = self.events
             events = filter(
                 lambda event: event["EventId"] not in event_ids,
-                reversed(self.events),
+                reversed(all_events),
             )
 
             for event in events:
@@ -135,6 +376,7 @@ class Stack:
                     event["LogicalResourceId"],
                     event["ResourceStatus"],
                     event.get("ResourceStatusReason", None),
+                    self.name,
                 )
                 event_ids.append(event["EventId"])
 
@@ -142,6 +384,8 @@ class Stack:
 
             time.sleep(5)
 
+        self.failed_resources = find_failed_resources(all_events, self.name)
+
         return stack_status
 
     def mark(self, strategy):
@@ -155,12 +399,34 @@ class Stack:
         return stack_data["Stacks"][0]  # type: ignore
 
 
-def get_stacks(cloudformation) -> Iterator[Stack]:
-    """Retrieve all stacks as Stack objects"""
+def get_stacks(
+    cloudformation, prefetch_pages: int = 0, summary_client=None
+) -> Iterator[Stack]:
+    """Retrieve all stacks as Stack objects, optionally fetching pages ahead of their use
+
+    With a summary client (see fast_parsing), pages are described by it, but the stacks are
+    still bound to the regular client.
+    """
+    describe_stacks = (summary_client or cloudformation).describe_stacks
+    stack_details = (
+        paginate_prefetched(describe_stacks, prefetch_pages)
+        if prefetch_pages
+        else paginate(describe_stacks)
+    )
+
     return map(
         lambda stack: Stack.factory_from_stack_detail(cloudformation, stack),
-        filter(
-            lambda stack: "ParentId" not in stack,
-            paginate(cloudformation.describe_stacks),
-        ),
+        filter(lambda stack: "ParentId" not in stack, stack_details),
     )
+
+
+def get_stack(cloudformation, stack_id: str) -> Optional[Stack]:
+    """Retrieve a single stack as a Stack object, or None if it no longer exists"""
+    try:
+        stack_data = cloudformation.describe_stacks(StackName=stack_id)
+    except cloudformation.exceptions.ClientError as e:
+        if "does not exist" in str(e):
+            return None
+        raise
+
+    return Stack.factory_from_stack_detail(cloudformation, stack_data["Stacks"][0])
@@ -0,0 +1,130 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+from .base_strategy import BaseStrategy
+from .inventory import Inventory
+from .log_utils import log
+from .sweeper import sweep
+
+
+class Daemon:
+    """Runs sweeps on an interval, keeping the CloudFormation client and inventory warm between sweeps"""
+
+    args: argparse.Namespace
+    inventory: Inventory
+    strategy_factory: Callable[[argparse.Namespace], BaseStrategy]
+    runs: int
+    last_run: Optional[Dict[str, Any]]
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        inventory: Inventory,
+        strategy_factory: Callable[[argparse.Namespace], BaseStrategy],
+    ):
+        self.args = args
+        self.inventory = inventory
+        self.strategy_factory = strategy_factory
+        self.runs = 0
+        self.last_run = None
+        self.__stop = threading.Event()
+        self.__lock = threading.Lock()
+
+    def tick(self) -> Dict[str, Any]:
+        """Incrementally refresh the inventory, then sweep it"""
+        started_at = time.monotonic()
+        stats: Dict[str, Any] = {
+            "started_at": datetime.now(tz=timezone.utc).isoformat(timespec="seconds"),
+            "error": None,
+        }
+
+        try:
+            changes = self.inventory.refresh()
+            # strategies compare against the time they were created, so they're rebuilt every tick
+            result = sweep(self.args, self.strategy_factory(self.args), self.inventory)
+            stats.update(
+                added=len(changes.added),
+                updated=len(changes.updated),
+                removed=len(changes.removed),
+                stacks=result.stacks,
+                selected=len(result.selected),
+                failed=len(result.failed),
+                deleting=len(result.deleting),
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            log(f"Sweep failed: {e}", logging.ERROR)
+            stats["error"] = str(e)
+
+        stats["duration_seconds"] = round(time.monotonic() - started_at, 3)
+        with self.__lock:
+            self.runs += 1
+            self.last_run = stats
+
+        return stats
+
+    def run(self):
+        """Sweep every interval until stopped"""
+        while not self.__stop.is_set():
+            self.tick()
+            self.__stop.wait(self.args.interval)
+
+    def stop(self):
+        """Stop sweeping once the current sweep completes"""
+        self.__stop.set()
+
+    def health(self) -> Dict[str, Any]:
+        """Describe the daemon's health and the outcome of its last sweep"""
+        with self.__lock:
+            if not self.last_run:
+                status = "starting"
+            elif self.last_run["error"]:
+                status = "failing"
+            else:
+                status = "ok"
+
+            return {"status": status, "runs": self.runs, "last_run": self.last_run}
+
+
+class HealthRequestHandler(BaseHTTPRequestHandler):
+    """Serves the daemon's health as JSON"""
+
+    server: "HealthServer"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Respond to GET requests"""
+        if self.path not in ("/", "/health"):
+            self.send_error(404)
+            return
+
+        health = self.server.daemon.health()
+        body = json.dumps(health).encode("utf-8")
+
+        self.send_response(503 if health["status"] == "failing" else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Send request logs to the debug log, rather than stderr"""
+        log(format % args, logging.DEBUG)
+
+
+class HealthServer(ThreadingHTTPServer):
+    """A HTTP server exposing a daemon's health"""
+
+    daemon_threads = True
+
+    def __init__(self, daemon: Daemon, port: int, host: str = "127.0.0.1"):
+        super().__init__((host, port), HealthRequestHandler)
+        self.daemon = daemon
+
+    def start(self):
+        """Serve requests on a background thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
@@ -0,0 +1,11 @@
+from typing import NamedTuple, Tuple
+
+from .cloudformation import Stack
+
+
+class Decision(NamedTuple):
+    """An immutable record of whether a strategy would remove a stack, and why"""
+
+    stack: Stack
+    remove: bool
+    reasons: Tuple[str, ...] = ()
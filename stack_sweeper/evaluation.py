@@ -0,0 +1,16 @@
+from typing import Iterable, List
+
+from .base_strategy import BaseStrategy
+from .cloudformation import Stack
+from .decision import Decision
+
+
+def evaluate_stacks(strategy: BaseStrategy, stacks: Iterable[Stack]) -> List[Decision]:
+    """Evaluate stacks against a strategy, returning a decision for every stack
+
+    Neither the stacks nor the strategy are modified, so the same strategy can be used to
+    evaluate several inventories (e.g. one per region) concurrently.
+    """
+    decisions = [strategy.evaluate(stack) for stack in stacks]
+
+    return strategy.finalise(decisions)
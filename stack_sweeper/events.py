@@ -0,0 +1,277 @@
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from functools import partial
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+from urllib.parse import urlparse
+
+from .base_strategy import BaseStrategy
+from .inventory import Inventory
+from .log_utils import log
+from .sweeper import SweepResult, sweep
+
+STACK_EVENT_SOURCE = "aws.cloudformation"
+
+
+class StackChange(NamedTuple):
+    """A change to a stack, as reported by a CloudFormation event"""
+
+    stack_id: str
+    status: Optional[str]
+
+
+def parse_event(record: Dict[str, Any]) -> Optional[StackChange]:
+    """Extract the stack change from an EventBridge CloudFormation event, if it is one"""
+    if record.get("source") != STACK_EVENT_SOURCE:
+        return None
+
+    detail = record.get("detail", {})
+    stack_id = detail.get("stack-id")
+    if not stack_id:
+        return None
+
+    # only stack status changes carry the stack's status, resource changes are treated as updates
+    status = None
+    if record.get("detail-type") == "CloudFormation Stack Status Change":
+        status = detail.get("status-details", {}).get("status")
+
+    return StackChange(stack_id, status)
+
+
+def unwrap_records(payload: Any) -> List[Dict[str, Any]]:
+    """Unwrap event records from a JSON payload (a record, a list of records or an SNS envelope)"""
+    if isinstance(payload, list):
+        return [record for item in payload for record in unwrap_records(item)]
+
+    if isinstance(payload, dict) and "detail" not in payload and "Message" in payload:
+        return unwrap_records(json.loads(payload["Message"]))
+
+    return [payload] if isinstance(payload, dict) else []
+
+
+class EventBatch(NamedTuple):
+    """A batch of event records, and how to remove them from their source once processed"""
+
+    records: List[Dict[str, Any]]
+    acknowledge: Callable[[], None]
+
+
+def no_acknowledgement():
+    """Records read from a stream can't be removed from it"""
+
+
+def stream_batches(stream: IO[str]) -> Iterator[EventBatch]:
+    """Read JSON event records from a stream, one per line, yielding each line as it arrives"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            yield EventBatch(unwrap_records(json.loads(line)), no_acknowledgement)
+        except json.JSONDecodeError as e:
+            log(f"Ignoring malformed event: {e}", logging.WARNING)
+
+
+def sqs_batches(sqs, queue_url: str) -> Iterator[EventBatch]:
+    """Long-poll an SQS (or SQS-compatible) queue for event records
+
+    Messages are only removed from the queue when their batch is acknowledged, once it's been
+    processed. Malformed messages, and batches that fail, are left in the queue to become
+    visible again (and eventually move to the queue's dead-letter queue). Empty polls yield
+    empty batches, so a quiet queue still hands back control every 20 seconds.
+    """
+    while True:
+        messages = sqs.receive_message(
+            QueueUrl=queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=20
+        ).get("Messages", [])
+        if not messages:
+            yield EventBatch([], no_acknowledgement)
+            continue
+
+        records = []
+        receipt_handles = []
+        for message in messages:
+            try:
+                records.extend(unwrap_records(json.loads(message["Body"])))
+                receipt_handles.append(message["ReceiptHandle"])
+            except json.JSONDecodeError as e:
+                log(f"Leaving malformed event in the queue: {e}", logging.WARNING)
+
+        yield EventBatch(
+            records, partial(delete_messages, sqs, queue_url, receipt_handles)
+        )
+
+
+def delete_messages(sqs, queue_url: str, receipt_handles: List[str]):
+    """Remove processed messages from an SQS queue"""
+    if not receipt_handles:
+        return
+
+    response = sqs.delete_message_batch(
+        QueueUrl=queue_url,
+        Entries=[
+            {"Id": str(index), "ReceiptHandle": receipt_handle}
+            for index, receipt_handle in enumerate(receipt_handles)
+        ],
+    )
+    for failure in response.get("Failed", []):
+        log(
+            f"Failed to remove a processed event from the queue: {failure['Code']}",
+            logging.WARNING,
+        )
+
+
+def idle_batches(
+    batches: Iterable[EventBatch], timeout: Callable[[], float]
+) -> Iterator[EventBatch]:
+    """Yield batches as they arrive, and an empty batch whenever none arrives in time
+
+    The batches are read on a background thread, so a quiet source (e.g. stdin) never holds
+    up work that falls due in the meantime. timeout() is checked before each wait.
+    """
+    arrived: "queue.Queue[Any]" = queue.Queue(maxsize=1)
+    finished = object()
+
+    def read():
+        try:
+            for batch in batches:
+                arrived.put(batch)
+        except Exception as e:  # pylint: disable=broad-except
+            arrived.put(e)
+            return
+
+        arrived.put(finished)
+
+    threading.Thread(target=read, daemon=True).start()
+    while True:
+        try:
+            item = arrived.get(timeout=timeout())
+        except queue.Empty:
+            yield EventBatch([], no_acknowledgement)
+            continue
+
+        if item is finished:
+            return
+
+        if isinstance(item, Exception):
+            raise item
+
+        yield item
+
+
+def sqs_endpoint_url(queue_url: str) -> Optional[str]:
+    """The endpoint to use for a queue URL, when it isn't hosted by AWS (e.g. a local queue)"""
+    url = urlparse(queue_url)
+    if url.hostname and url.hostname.endswith(".amazonaws.com"):
+        return None
+
+    return f"{url.scheme}://{url.netloc}"
+
+
+class EventProcessor:
+    """Keeps an inventory up to date from stack change events, sweeping only the changed stacks
+
+    Events only say which stacks changed, but stacks also fall due without changing (e.g. as
+    they age past --stack-update-age), so the whole inventory is also refreshed and swept
+    when processing starts, and every --interval seconds after that, whether or not events
+    arrive. --limit applies to each sweep: each full sweep, and each batch of events.
+    """
+
+    args: argparse.Namespace
+    inventory: Inventory
+    strategy_factory: Callable[[argparse.Namespace], BaseStrategy]
+    failed_batches: int
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        inventory: Inventory,
+        strategy_factory: Callable[[argparse.Namespace], BaseStrategy],
+    ):
+        self.args = args
+        self.inventory = inventory
+        self.strategy_factory = strategy_factory
+        self.failed_batches = 0
+        self.__swept_at: Optional[float] = None
+
+    def sweep_all(self) -> Optional[SweepResult]:
+        """Incrementally refresh the whole inventory, then sweep it"""
+        self.__swept_at = time.monotonic()
+        try:
+            self.inventory.refresh()
+            return sweep(self.args, self.strategy_factory(self.args), self.inventory)
+        except Exception as e:  # pylint: disable=broad-except
+            log(f"Sweep failed: {e}", logging.ERROR)
+            return None
+
+    def seconds_until_sweep(self) -> float:
+        """The number of seconds until the whole inventory is due to be swept again"""
+        if self.__swept_at is None:
+            return 0
+
+        return max(self.__swept_at + self.args.interval - time.monotonic(), 0)
+
+    def sweep_due(self) -> bool:
+        """Whether it's been --interval seconds since the whole inventory was swept"""
+        return self.seconds_until_sweep() <= 0
+
+    def process(self, records: Iterable[Dict[str, Any]]) -> SweepResult:
+        """Apply a batch of event records to the inventory, and sweep the stacks they changed"""
+        changes: Dict[str, Optional[str]] = {}
+        for record in records:
+            change = parse_event(record)
+            if change:
+                changes[change.stack_id] = change.status
+
+        changed_stacks = []
+        for stack_id, status in changes.items():
+            if status == "DELETE_COMPLETE":
+                self.inventory.discard(stack_id)
+                continue
+
+            stack = self.inventory.refresh_stack(stack_id)
+            if stack:
+                changed_stacks.append(stack)
+
+        if not changed_stacks:
+            return SweepResult(0, [], [], [])
+
+        return sweep(self.args, self.strategy_factory(self.args), changed_stacks)
+
+    def run(self, batches: Iterable[EventBatch]):
+        """Process batches of event records until the source is exhausted, sweeping the whole
+        inventory whenever it's due
+
+        Each batch is only acknowledged once it's been processed, so a batch that fails is
+        left with its source to be retried. Failed batches are counted in failed_batches.
+        """
+        for batch in idle_batches(batches, self.seconds_until_sweep):
+            if self.sweep_due():
+                self.sweep_all()
+
+            try:
+                self.process(batch.records)
+            except Exception as e:  # pylint: disable=broad-except
+                self.failed_batches += 1
+                log(
+                    f"Failed to process {len(batch.records)} events, leaving them to be "
+                    f"retried: {e}",
+                    logging.ERROR,
+                )
+                continue
+
+            batch.acknowledge()
@@ -2,6 +2,7 @@ from typing import List, Optional
 
 from .base_strategy import BaseStrategy
 from .cloudformation import Stack
+from .decision import Decision
 
 
 class ExcludeNamesStrategy(BaseStrategy):
@@ -18,17 +19,17 @@ class ExcludeNamesStrategy(BaseStrategy):
         self.exclude_names = exclude_names
         self.exclude_name_prefixes = exclude_name_prefixes
 
-    def should_remove(self, stack: Stack) -> bool:
-        """Should this stack be removed?"""
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed"""
         if self.exclude_names and stack.name in self.exclude_names:
-            return False
+            return Decision(stack, False)
 
         if self.exclude_name_prefixes:
             for name_prefix in self.exclude_name_prefixes:
                 if stack.name.startswith(name_prefix):
-                    return False
+                    return Decision(stack, False)
 
-        return True
+        return Decision(stack, True)
 
     def __str__(self):
         list_to_str = lambda a_list: f"[{', '.join(a_list)}]" if a_list else "None"
@@ -1,5 +1,11 @@
+from typing import TYPE_CHECKING, Optional, Set
+
 from .base_strategy import BaseStrategy
 from .cloudformation import Stack
+from .decision import Decision
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
 
 
 class ExcludeTagStrategy(BaseStrategy):
@@ -10,9 +16,13 @@ class ExcludeTagStrategy(BaseStrategy):
     def __init__(self, tag_name: str):
         self.tag_name = tag_name
 
-    def should_remove(self, stack: Stack) -> bool:
-        """Should this stack be removed?"""
-        return self.tag_name not in stack.tags
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed"""
+        return Decision(stack, self.tag_name not in stack.tags)
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """Only stacks without the exclusion tag can be removed"""
+        return set(inventory.stacks) - inventory.tagged(self.tag_name)
 
     def __str__(self):
         return f"ExcludeTagStrategy({self.tag_name})"
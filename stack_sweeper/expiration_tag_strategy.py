@@ -1,12 +1,12 @@
-from datetime import datetime, timedelta
-from typing import Optional
-
-from dateutil import parser
-from dateutil.parser import ParserError  # type: ignore
-from dateutil.tz import tzutc
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Optional, Set
 
 from .base_strategy import BaseStrategy
 from .cloudformation import Stack
+from .decision import Decision
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
 
 
 class ExpirationTagStrategy(BaseStrategy):
@@ -17,28 +17,59 @@ class ExpirationTagStrategy(BaseStrategy):
 
     def __init__(self, tag_name: str, compare_time: Optional[datetime] = None):
         if not compare_time:
-            compare_time = datetime.now(tz=tzutc())
+            compare_time = datetime.now(tz=timezone.utc)
 
         self.tag_name = tag_name
         self.compare_time = compare_time
 
     def expiry(self, stack: Stack) -> datetime:
         """Provide a parsed, tz-aware expiry datetime object"""
-        expiry = parser.parse(stack.tags[self.tag_name])
+        return self.parse_expiry(stack.tags[self.tag_name])
+
+    @staticmethod
+    def parse_expiry(value: str) -> datetime:
+        """Parse an expiry tag's value into a tz-aware datetime object"""
+        # dateutil's parser is slow to import, so it's only loaded once an expiry is needed
+        from dateutil import parser  # pylint: disable=import-outside-toplevel
+
+        expiry = parser.parse(value)
         if not expiry.tzinfo:  # force it to have a timezone of UTC if none is set
-            expiry = expiry.replace(tzinfo=tzutc())
+            expiry = expiry.replace(tzinfo=timezone.utc)
 
         return expiry
 
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed"""
+        try:
+            expiry = self.expiry(stack)
+        except (KeyError, ValueError):  # a missing or unparsable tag never expires
+            return Decision(stack, False)
+
+        if expiry > self.compare_time:
+            return Decision(stack, False)
+
+        return Decision(stack, True, (self.__reason(expiry),))
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """Only stacks with an expiry that has passed can be removed
+
+        Each distinct expiry is parsed once, no matter how many stacks share it.
+        """
+        candidates: Set[str] = set()
+        for value, stack_ids in inventory.tag_values(self.tag_name).items():
+            try:
+                expiry = self.parse_expiry(value)
+            except ValueError:  # an unparsable tag never expires
+                continue
+
+            if expiry <= self.compare_time:
+                candidates |= stack_ids
+
+        return candidates
+
     def should_remove(self, stack: Stack) -> bool:
         """Should this stack be removed?"""
-        if self.tag_name not in stack.tags:
-            return False
-
-        try:
-            result = self.expiry(stack) <= self.compare_time
-        except ParserError:
-            return False
+        result = self.evaluate(stack).remove
 
         if result:
             stack.mark(self)
@@ -50,7 +81,10 @@ class ExpirationTagStrategy(BaseStrategy):
 
     def get_mark_reason(self, stack: Stack) -> str:
         """Get a reason why the stack was marked"""
-        expiry = self.expiry(stack)
+        return self.__reason(self.expiry(stack))
+
+    def __reason(self, expiry: datetime) -> str:
+        """Describe how long ago the expiry passed"""
         age: timedelta = self.compare_time - expiry
 
         return f"expired {age.days} days ago (expiry: {expiry.isoformat(timespec='seconds')})"
@@ -0,0 +1,230 @@
+import argparse
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .base_strategy import BaseStrategy
+from .cloudformation import Stack
+from .expiration_tag_strategy import ExpirationTagStrategy
+from .inventory import Inventory, InventoryChanges
+from .log_utils import log
+from .sweeper import SweepResult, sweep
+
+# stacks that keep failing to delete are swept again at most this often
+MAX_RESCHEDULE_DELAY = 24 * 60 * 60
+
+
+class ScheduledStack(NamedTuple):
+    """When a stack is due to be swept, and what that was worked out from"""
+
+    due_at: datetime
+    tag_value: Optional[str]
+    last_updated_at: datetime
+    sequence: int
+    failures: int = 0  # how many sweeps in a row it failed to delete in
+
+
+class ExpiryScheduler:
+    """Sweeps each stack when its expiry (or --stack-update-age) passes, instead of on an interval
+
+    Stacks are kept in a priority queue ordered by when they are due. A stack's expiry tag is
+    only read again when the stack is updated, and it is only rescheduled if the tag (or its
+    last update time) actually changed. Stacks that fail to delete are swept again after
+    --interval seconds, doubling each time they fail again, and due stacks a sweep left out
+    (e.g. over its --limit) are swept again after --interval seconds.
+    """
+
+    args: argparse.Namespace
+    inventory: Inventory
+    strategy_factory: Callable[[argparse.Namespace], BaseStrategy]
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        inventory: Inventory,
+        strategy_factory: Callable[[argparse.Namespace], BaseStrategy],
+    ):
+        self.__scheduled: Dict[str, ScheduledStack] = {}
+        self.__queue: List[Tuple[datetime, int, str]] = []
+        self.__counter = itertools.count()  # identifies the latest schedule for a stack
+        self.__stop = threading.Event()
+        self.args = args
+        self.inventory = inventory
+        self.strategy_factory = strategy_factory
+
+    def __len__(self) -> int:
+        return len(self.__scheduled)
+
+    def get(self, stack_id: str) -> Optional[ScheduledStack]:
+        """Retrieve when a stack is scheduled to be swept"""
+        return self.__scheduled.get(stack_id)
+
+    def sync(self) -> InventoryChanges:
+        """Incrementally refresh the inventory, rescheduling only the stacks that changed"""
+        changes = self.inventory.refresh()
+        for stack_id in changes.removed:
+            self.__scheduled.pop(stack_id, None)
+
+        for stack_id in changes.added + changes.updated:
+            stack = self.inventory.get(stack_id)
+            if stack:
+                self.schedule(stack)
+
+        return changes
+
+    def schedule(self, stack: Stack) -> bool:
+        """Schedule a stack to be swept when it's due, returning False if nothing changed"""
+        tag_value = self.__tag_value(stack)
+        scheduled = self.__scheduled.get(stack.stack_id)
+        if (
+            scheduled
+            and scheduled.tag_value == tag_value
+            and scheduled.last_updated_at == stack.last_updated_at
+        ):
+            return False
+
+        due_at = self.due_at(stack, tag_value)
+        if not due_at:
+            self.__scheduled.pop(stack.stack_id, None)
+            return scheduled is not None
+
+        self.__push(stack, due_at, tag_value)
+
+        return True
+
+    def reschedule_failed(self, stacks: List[Stack], now: Optional[datetime] = None):
+        """Schedule stacks that failed to delete to be swept again, backing off each time"""
+        if not now:
+            now = datetime.now(tz=timezone.utc)
+
+        for stack in stacks:
+            scheduled = self.__scheduled.get(stack.stack_id)
+            failures = (scheduled.failures if scheduled else 0) + 1
+            delay = min(self.args.interval * 2 ** (failures - 1), MAX_RESCHEDULE_DELAY)
+            log(
+                f"Stack {stack.name} failed to delete, sweeping it again in {delay} seconds",
+                logging.WARNING,
+            )
+            self.__push(
+                stack, now + timedelta(seconds=delay), self.__tag_value(stack), failures
+            )
+
+    def __tag_value(self, stack: Stack) -> Optional[str]:
+        return stack.tag_value(self.args.expiry_tag) if self.args.expiry_tag else None
+
+    def __push(
+        self,
+        stack: Stack,
+        due_at: datetime,
+        tag_value: Optional[str],
+        failures: int = 0,
+    ):
+        sequence = next(self.__counter)
+        self.__scheduled[stack.stack_id] = ScheduledStack(
+            due_at, tag_value, stack.last_updated_at, sequence, failures
+        )
+        heapq.heappush(self.__queue, (due_at, sequence, stack.stack_id))
+
+    def due_at(self, stack: Stack, tag_value: Optional[str]) -> Optional[datetime]:
+        """Work out when a stack is due to be swept, or None if it never will be"""
+        due_times = []
+        if tag_value is not None:
+            try:
+                due_times.append(ExpirationTagStrategy.parse_expiry(tag_value))
+            except ValueError:  # an unparsable tag never expires
+                pass
+
+        if self.args.stack_update_age:
+            due_times.append(
+                stack.last_updated_at + timedelta(days=self.args.stack_update_age)
+            )
+
+        return min(due_times, default=None)
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[Stack]:
+        """Remove and return every stack that is due to be swept"""
+        if not now:
+            now = datetime.now(tz=timezone.utc)
+
+        due = []
+        while self.__queue and self.__queue[0][0] <= now:
+            _, sequence, stack_id = heapq.heappop(self.__queue)
+            scheduled = self.__scheduled.get(stack_id)
+            stack = self.inventory.get(stack_id)
+            # entries superseded by a reschedule are skipped, rather than removed from the heap
+            if scheduled and scheduled.sequence == sequence and stack:
+                due.append(stack)
+
+        return due
+
+    def seconds_until_due(self, now: Optional[datetime] = None) -> Optional[float]:
+        """The number of seconds until the next stack is due, or None if nothing is scheduled"""
+        if not now:
+            now = datetime.now(tz=timezone.utc)
+
+        while self.__queue:
+            due_at, sequence, stack_id = self.__queue[0]
+            scheduled = self.__scheduled.get(stack_id)
+            if scheduled and scheduled.sequence == sequence:
+                return max((due_at - now).total_seconds(), 0)
+
+            heapq.heappop(self.__queue)
+
+        return None
+
+    def tick(self, now: Optional[datetime] = None) -> SweepResult:
+        """Sweep the stacks that are due, rescheduling any that aren't deleted"""
+        if not now:
+            now = datetime.now(tz=timezone.utc)
+
+        due = self.pop_due(now)
+        if not due:
+            return SweepResult(0, [], [], [])
+
+        result = sweep(self.args, self.strategy_factory(self.args), due)
+        failed = {stack.stack_id for stack in result.failed}
+        # a dry run is done with the stacks it selected. Other due stacks may have been
+        # left out by --limit or leased by another sweeper, so they're swept again after
+        # --interval (deleted stacks are dropped by the inventory refresh before then)
+        done = (
+            set() if self.args.delete else {d.stack.stack_id for d in result.selected}
+        )
+        for stack in due:
+            if stack.stack_id not in failed and stack.stack_id not in done:
+                self.__push(
+                    stack,
+                    now + timedelta(seconds=self.args.interval),
+                    self.__tag_value(stack),
+                )
+
+        self.reschedule_failed(result.failed, now)
+
+        return result
+
+    def run(self):
+        """Sweep stacks as they fall due, checking for changed stacks every interval, until stopped"""
+        next_sync = time.monotonic()
+        while not self.__stop.is_set():
+            try:
+                if time.monotonic() >= next_sync:
+                    next_sync = time.monotonic() + self.args.interval
+                    self.sync()
+
+                self.tick()
+            except Exception as e:  # pylint: disable=broad-except
+                log(f"Scheduled sweep failed: {e}", logging.ERROR)
+
+            wait = next_sync - time.monotonic()
+            until_due = self.seconds_until_due()
+            if until_due is not None:
+                wait = min(wait, until_due)
+
+            self.__stop.wait(max(wait, 0))
+
+    def stop(self):
+        """Stop sweeping once the current sweep completes"""
+        self.__stop.set()
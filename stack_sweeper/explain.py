@@ -0,0 +1,121 @@
+import copy
+import time
+from typing import TYPE_CHECKING, List, Optional, Set
+
+from .base_strategy import BaseStrategy
+from .cloudformation import Stack
+from .decision import Decision
+from .limited_strategy import LimitedStrategy
+from .log_utils import log
+from .nested_strategies import BaseMultiNestedStrategy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
+
+
+class ExplainedStrategy(BaseStrategy):
+    """Wraps a strategy, recording how often it's evaluated, what it decides and how long it takes
+
+    Stacks the strategy rules out using an inventory's indexes are never evaluated, so they're
+    counted as pruned instead (None if the strategy's candidates were never asked for).
+    """
+
+    strategy: BaseStrategy
+    calls: int
+    removed: int
+    seconds: float
+    pruned: Optional[int]
+
+    def __init__(self, strategy: BaseStrategy):
+        self.strategy = strategy
+        self.calls = 0
+        self.removed = 0
+        self.seconds = 0.0
+        self.pruned = None
+
+    @property
+    def children(self) -> List["ExplainedStrategy"]:
+        """The wrapped strategy's (wrapped) nested strategies"""
+        if isinstance(self.strategy, BaseMultiNestedStrategy):
+            return self.strategy.nested_strategies  # type: ignore
+
+        if isinstance(self.strategy, LimitedStrategy):
+            return [self.strategy.nested_strategy]  # type: ignore
+
+        return []
+
+    def evaluate(self, stack: Stack) -> Decision:
+        """Evaluate the wrapped strategy, recording the decision and time taken"""
+        started_at = time.perf_counter()
+        decision = self.strategy.evaluate(stack)
+        self.seconds += time.perf_counter() - started_at
+        self.calls += 1
+        self.removed += decision.remove
+
+        return decision
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """The wrapped strategy's candidates, recording how many stacks they rule out"""
+        candidates = self.strategy.candidates(inventory)
+        self.pruned = 0 if candidates is None else len(inventory) - len(candidates)
+
+        return candidates
+
+    def finalise(self, decisions: List[Decision]) -> List[Decision]:
+        """The wrapped strategy's finalised decisions"""
+        return self.strategy.finalise(decisions)
+
+    def constrains_selection(self) -> bool:
+        """Whether the wrapped strategy constrains the selection"""
+        return self.strategy.constrains_selection()
+
+    def __str__(self):
+        return str(self.strategy)
+
+
+def explain_strategy(strategy: BaseStrategy) -> ExplainedStrategy:
+    """Wrap every node of a strategy tree, without modifying the original tree"""
+    strategy = copy.copy(strategy)
+    if isinstance(strategy, BaseMultiNestedStrategy):
+        strategy.nested_strategies = [
+            explain_strategy(nested_strategy)
+            for nested_strategy in strategy.nested_strategies
+        ]
+    elif isinstance(strategy, LimitedStrategy):
+        strategy.nested_strategy = explain_strategy(strategy.nested_strategy)
+
+    return ExplainedStrategy(strategy)
+
+
+def format_explanation(explained: ExplainedStrategy, depth: int = 0) -> List[str]:
+    """Describe each node of an explained strategy tree, one line per node"""
+    children = explained.children
+    # nodes with children are named by class, as their str() includes every child
+    name = (
+        explained.strategy.__class__.__name__ if children else str(explained.strategy)
+    )
+    if explained.calls:
+        removed = f"{explained.removed / explained.calls:.1%}"
+        average = f"{explained.seconds / explained.calls * 1_000_000:.1f}µs"
+    else:
+        removed = average = "n/a"
+
+    pruned = (
+        "" if explained.pruned is None else f"{explained.pruned} pruned by indexes, "
+    )
+    lines = [
+        f"{'  ' * depth}{name}: {pruned}{explained.calls} evaluated, {explained.removed} "
+        f"removed ({removed}), {explained.calls - explained.removed} kept, "
+        f"{explained.seconds * 1000:.2f}ms total ({average} each)"
+    ]
+    for child in children:
+        lines.extend(format_explanation(child, depth + 1))  # type: ignore
+
+    return lines
+
+
+def log_explanation(explained: ExplainedStrategy):
+    """Report the annotated strategy tree"""
+    log("Strategy evaluation (times include nested strategies):")
+    for line in format_explanation(explained):
+        log(f"  {line}")
@@ -0,0 +1,413 @@
+import re
+from datetime import datetime, timedelta, timezone
+from fnmatch import translate
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    NoReturn,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .base_strategy import BaseStrategy
+from .cloudformation import Stack
+from .decision import Decision
+from .expiration_tag_strategy import ExpirationTagStrategy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
+
+TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<duration>\d+[mhdw])(?![\w"]) |
+        (?P<string>"(?:[^"\\]|\\.)*") |
+        (?P<word>[A-Za-z_]+) |
+        (?P<punctuation>[(),])
+    )""",
+    re.VERBOSE,
+)
+
+DURATION_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+# the argument type each function takes, and its relative cost to evaluate
+FUNCTIONS = {
+    "has_tag": ("string", 1),
+    "updated_before": ("duration", 1),
+    "name_glob": ("string", 2),
+    "tag_expired": (
+        "string",
+        5,
+    ),  # parses dates, although each distinct value only once
+}
+
+
+class Call(NamedTuple):
+    """A call to one of FUNCTIONS"""
+
+    function: str
+    argument: Any
+
+
+class Not(NamedTuple):
+    """The negation of an expression"""
+
+    operand: Any
+
+
+class And(NamedTuple):
+    """Every operand must be true"""
+
+    operands: tuple
+
+
+class Or(NamedTuple):
+    """Any operand must be true"""
+
+    operands: tuple
+
+
+class Constant(NamedTuple):
+    """true or false"""
+
+    value: bool
+
+
+class Expression(NamedTuple):
+    """A parsed (and folded) strategy expression"""
+
+    text: str
+    node: Any
+
+
+class Parser:
+    """A recursive descent parser for strategy expressions
+
+    expression := term ("or" term)*
+    term       := factor ("and" factor)*
+    factor     := "not" factor | "(" expression ")" | "true" | "false" | function "(" argument ")"
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = self.tokenise(text)
+        self.position = 0
+
+    @staticmethod
+    def tokenise(text: str) -> List[Tuple[str, str, int]]:
+        """Split an expression into (kind, value, offset) tokens"""
+        tokens: List[Tuple[str, str, int]] = []
+        offset = 0
+        while text[offset:].strip():
+            match = TOKEN_PATTERN.match(text, offset)
+            if not match:
+                raise ValueError(f"Unexpected character at position {offset}: {text}")
+
+            kind = match.lastgroup
+            assert kind is not None  # every alternative of the pattern is a named group
+            tokens.append((kind, match.group(kind), match.start(kind)))
+            offset = match.end()
+
+        return tokens
+
+    def parse(self) -> Any:
+        """Parse the whole expression"""
+        node = self.expression()
+        if self.position < len(self.tokens):
+            self.error("Unexpected")
+
+        return node
+
+    def error(self, problem: str) -> NoReturn:
+        """Raise a ValueError describing the problem at the current token"""
+        if self.position >= len(self.tokens):
+            raise ValueError(f"{problem} end of expression: {self.text}")
+
+        _, value, offset = self.tokens[self.position]
+        raise ValueError(f"{problem} {value} at position {offset}: {self.text}")
+
+    def peek(self) -> Optional[str]:
+        """The value of the next token, if there is one"""
+        if self.position >= len(self.tokens):
+            return None
+
+        return self.tokens[self.position][1]
+
+    def take(self, kind: str) -> str:
+        """Consume the next token, which must be of the given kind"""
+        if self.position >= len(self.tokens) or self.tokens[self.position][0] != kind:
+            self.error(f"Expected a {kind}, not")
+
+        value = self.tokens[self.position][1]
+        self.position += 1
+        return value
+
+    def expect(self, value: str):
+        """Consume the next token, which must have the given value"""
+        if self.peek() != value:
+            self.error(f"Expected {value}, not")
+
+        self.position += 1
+
+    def expression(self) -> Any:
+        """Parse operands joined by or"""
+        operands = [self.term()]
+        while self.peek() == "or":
+            self.position += 1
+            operands.append(self.term())
+
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+    def term(self) -> Any:
+        """Parse operands joined by and"""
+        operands = [self.factor()]
+        while self.peek() == "and":
+            self.position += 1
+            operands.append(self.factor())
+
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+    def factor(self) -> Any:
+        """Parse a negation, a parenthesised expression, a constant or a function call"""
+        value = self.peek()
+        if value == "not":
+            self.position += 1
+            return Not(self.factor())
+
+        if value == "(":
+            self.position += 1
+            node = self.expression()
+            self.expect(")")
+            return node
+
+        if value in ("true", "false"):
+            self.position += 1
+            return Constant(value == "true")
+
+        if value is None or value not in FUNCTIONS:
+            self.error("Unknown function")
+
+        self.position += 1
+        self.expect("(")
+        argument_kind = FUNCTIONS[value][0]
+        argument = self.take(argument_kind)
+        self.expect(")")
+
+        if argument_kind == "string":
+            return Call(value, re.sub(r"\\(.)", r"\1", argument[1:-1]))
+
+        return Call(
+            value, timedelta(**{DURATION_UNITS[argument[-1]]: int(argument[:-1])})
+        )
+
+
+def cost(node: Any) -> int:
+    """The relative cost of evaluating a node"""
+    if isinstance(node, Call):
+        return FUNCTIONS[node.function][1]
+
+    if isinstance(node, Not):
+        return cost(node.operand)
+
+    if isinstance(node, (And, Or)):
+        return sum(cost(operand) for operand in node.operands)
+
+    return 0
+
+
+def fold(node: Any) -> Any:
+    """Simplify an expression, without changing what it selects
+
+    Constants are folded away, double negations removed, nested and/or flattened, repeated
+    operands dropped, and cheap operands moved ahead of expensive ones so that
+    short-circuiting skips as much work as possible.
+    """
+    if isinstance(node, Not):
+        operand = fold(node.operand)
+        if isinstance(operand, Constant):
+            return Constant(not operand.value)
+
+        if isinstance(operand, Not):
+            return operand.operand
+
+        return Not(operand)
+
+    if isinstance(node, (And, Or)):
+        node_type = type(node)
+        identity = node_type is And  # the constant that doesn't change the result
+
+        operands: List[Any] = []
+        for operand in (fold(operand) for operand in node.operands):
+            if isinstance(operand, Constant):
+                if operand.value != identity:
+                    return operand  # short-circuits the whole node
+
+                continue
+
+            for flattened in (
+                operand.operands if isinstance(operand, node_type) else [operand]
+            ):
+                if flattened not in operands:
+                    operands.append(flattened)
+
+        if not operands:
+            return Constant(identity)
+
+        if len(operands) == 1:
+            return operands[0]
+
+        return node_type(tuple(sorted(operands, key=cost)))
+
+    return node
+
+
+def parse_expression(text: str) -> Expression:
+    """Parse and fold a strategy expression, raising ValueError if it's invalid"""
+    return Expression(text, fold(Parser(text).parse()))
+
+
+def compile_expression(node: Any, compare_time: datetime) -> Callable[[Stack], bool]:
+    """Compile a folded expression into a single predicate
+
+    The whole expression becomes one Python expression, so evaluating a stack costs one
+    function call rather than a method call per node. Values are bound as constants, and are
+    never written into the generated source.
+    """
+    constants: Dict[str, Any] = {}
+
+    def constant(value: Any) -> str:
+        name = f"_c{len(constants)}"
+        constants[name] = value
+        return name
+
+    def emit(node: Any) -> str:
+        if isinstance(node, Constant):
+            return str(node.value)
+
+        if isinstance(node, Not):
+            return f"(not {emit(node.operand)})"
+
+        if isinstance(node, (And, Or)):
+            joiner = " and " if isinstance(node, And) else " or "
+            return f"({joiner.join(emit(operand) for operand in node.operands)})"
+
+        if node.function == "has_tag":
+            return f"(stack.tag_value({constant(node.argument)}) is not None)"
+
+        if node.function == "updated_before":
+            return (
+                f"(stack.last_updated_at <= {constant(compare_time - node.argument)})"
+            )
+
+        if node.function == "name_glob":
+            match = re.compile(translate(node.argument)).match
+            return f"({constant(match)}(stack.name) is not None)"
+
+        return f"{constant(tag_expired_predicate(node.argument, compare_time))}(stack)"
+
+    source = f"lambda stack: {emit(node)}"
+    return eval(source, {"__builtins__": {}, **constants})  # pylint: disable=eval-used
+
+
+def tag_expired_predicate(
+    tag_name: str, compare_time: datetime
+) -> Callable[[Stack], bool]:
+    """A predicate for stacks whose expiry tag has passed, parsing each distinct expiry once"""
+
+    @lru_cache(maxsize=None)
+    def expired(value: str) -> bool:
+        try:
+            return ExpirationTagStrategy.parse_expiry(value) <= compare_time
+        except ValueError:  # an unparsable tag never expires
+            return False
+
+    def predicate(stack: Stack) -> bool:
+        value = stack.tag_value(tag_name)
+        return value is not None and expired(value)
+
+    return predicate
+
+
+class ExpressionStrategy(BaseStrategy):
+    """A strategy that removes stacks matching an expression, e.g.
+
+    (tag_expired("expiry") or updated_before(30d)) and not name_glob("prod-*")
+    """
+
+    expression: Expression
+    compare_time: datetime
+
+    def __init__(self, expression: Expression, compare_time: Optional[datetime] = None):
+        if not compare_time:
+            compare_time = datetime.now(tz=timezone.utc)
+
+        self.expression = expression
+        self.compare_time = compare_time
+        self.predicate = compile_expression(expression.node, compare_time)
+
+    def should_remove(self, stack: Stack) -> bool:
+        """Should this stack be removed?"""
+        return self.predicate(stack)
+
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed"""
+        if not self.predicate(stack):
+            return Decision(stack, False)
+
+        return Decision(stack, True, (f"matches {self.expression.text}",))
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """The stacks the expression could match, using the inventory's indexes"""
+        return self.__candidates(self.expression.node, inventory)
+
+    def __candidates(self, node: Any, inventory: "Inventory") -> Optional[Set[str]]:
+        """The stacks a node could match, or None if every stack could match"""
+        if isinstance(node, Constant):
+            return None if node.value else set()
+
+        if isinstance(node, And):
+            candidates: Optional[Set[str]] = None
+            for operand in node.operands:
+                operand_candidates = self.__candidates(operand, inventory)
+                if operand_candidates is not None:
+                    candidates = (
+                        operand_candidates
+                        if candidates is None
+                        else candidates & operand_candidates
+                    )
+
+            return candidates
+
+        if isinstance(node, Or):
+            candidates = set()
+            for operand in node.operands:
+                operand_candidates = self.__candidates(operand, inventory)
+                if operand_candidates is None:
+                    return None
+
+                candidates |= operand_candidates
+
+            return candidates
+
+        if isinstance(node, Call):
+            if node.function == "has_tag":
+                return inventory.tagged(node.argument)
+
+            if node.function == "updated_before":
+                cutoff = self.compare_time - node.argument
+                return {stack.stack_id for stack in inventory.updated_before(cutoff)}
+
+            if node.function == "tag_expired":
+                return ExpirationTagStrategy(
+                    node.argument, self.compare_time
+                ).candidates(inventory)
+
+        return None  # negations and globs can match stacks the indexes can't find
+
+    def __str__(self):
+        return f"ExpressionStrategy({self.expression.text})"
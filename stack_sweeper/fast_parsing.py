@@ -0,0 +1,185 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from xml.parsers import expat
+
+import boto3  # type: ignore
+import botocore.session  # type: ignore
+from botocore.parsers import ResponseParserFactory  # type: ignore
+from botocore.utils import parse_timestamp  # type: ignore
+
+from .clients import client_config
+
+# the only fields of each stack that get_stacks needs, besides its tags
+STRING_FIELDS = {"StackId", "StackName", "StackStatus", "ParentId"}
+TIMESTAMP_FIELDS = {"CreationTime", "LastUpdatedTime"}
+
+
+def parse_iso_timestamp(text: str) -> datetime:
+    """Parse a timestamp, quickly if it's ISO 8601 (as CloudFormation's are)
+
+    botocore's parse_timestamp goes through dateutil, which costs more than the rest of the
+    parse put together.
+    """
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return parse_timestamp(text)
+
+
+class DescribeStacksHandler:
+    """Expat handlers that pull the fields get_stacks needs out of a DescribeStacks response
+
+    Elements are tracked by their depth in the response:
+
+    DescribeStacksResponse/DescribeStacksResult/Stacks/member/<field>
+    DescribeStacksResponse/DescribeStacksResult/Stacks/member/Tags/member/<Key or Value>
+    DescribeStacksResponse/DescribeStacksResult/NextToken
+    DescribeStacksResponse/ResponseMetadata/RequestId
+
+    Only the text of those elements is kept, everything else (e.g. Outputs and Parameters)
+    is skipped as it streams past.
+    """
+
+    def __init__(self, tag_keys: Optional[Set[str]] = None):
+        self.tag_keys = tag_keys
+        self.stacks: List[Dict[str, Any]] = []
+        self.parsed: Dict[str, Any] = {"Stacks": self.stacks, "ResponseMetadata": {}}
+        self.path: List[str] = []
+        self.text: List[str] = []
+        self.capture = False
+        self.stack: Dict[str, Any] = {}
+        self.tag: Dict[str, str] = {}
+
+    def start(self, name: str, _attributes):
+        """Track the element, and whether its text is needed"""
+        name = name.rpartition(" ")[2]  # drop the namespace
+        path = self.path
+        path.append(name)
+        depth = len(path)
+
+        self.capture = (
+            (depth == 5 and (name in STRING_FIELDS or name in TIMESTAMP_FIELDS))
+            or (depth == 7 and path[4] == "Tags")
+            or (depth == 3 and name in ("NextToken", "RequestId"))
+        )
+        if self.capture:
+            self.text = []
+        elif depth == 4 and name == "member" and path[2] == "Stacks":
+            self.stack = {}
+        elif depth == 5 and name == "Tags" and path[2] == "Stacks":
+            self.stack["Tags"] = []
+        elif depth == 6 and path[4] == "Tags":
+            self.tag = {}
+
+    def characters(self, data: str):
+        """Collect the text of needed elements"""
+        if self.capture:
+            self.text.append(data)
+
+    def end(self, _name: str):
+        """Store the element's text, or the stack or tag it completes"""
+        path = self.path
+        depth = len(path)
+        name = path.pop()
+
+        if self.capture:
+            self.capture = False
+            text = "".join(self.text)
+            if depth == 5:
+                self.stack[name] = (
+                    parse_iso_timestamp(text) if name in TIMESTAMP_FIELDS else text
+                )
+            elif depth == 7:
+                self.tag[name] = text
+            elif name == "NextToken":
+                self.parsed["NextToken"] = text
+            else:
+                self.parsed["ResponseMetadata"]["RequestId"] = text
+        elif depth == 6 and path[4] == "Tags":
+            if self.tag_keys is None or self.tag.get("Key") in self.tag_keys:
+                self.stack["Tags"].append(self.tag)
+        elif depth == 4 and name == "member" and path[2] == "Stacks":
+            self.stacks.append(self.stack)
+
+
+def parse_describe_stacks(
+    body: bytes, tag_keys: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """Parse a DescribeStacks response, keeping only what get_stacks needs
+
+    With tag_keys, only those tags are kept.
+    """
+    handler = DescribeStacksHandler(tag_keys)
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.characters
+    parser.Parse(body, True)
+
+    return handler.parsed
+
+
+class SummaryParser:
+    """A response parser that streams DescribeStacks responses, and leaves the rest to botocore"""
+
+    def __init__(self, parser, tag_keys: Optional[Set[str]] = None):
+        self.parser = parser
+        self.tag_keys = tag_keys
+
+    def parse(self, response: Dict[str, Any], shape) -> Dict[str, Any]:
+        """Parse a response, streaming it if it's a successful DescribeStacks response"""
+        if (
+            shape is None
+            or shape.name != "DescribeStacksOutput"
+            or response["status_code"] >= 301
+        ):
+            return self.parser.parse(response, shape)
+
+        parsed = parse_describe_stacks(response["body"], self.tag_keys)
+        parsed["ResponseMetadata"].update(
+            HTTPStatusCode=response["status_code"],
+            HTTPHeaders=response["headers"],
+        )
+        return parsed
+
+
+class SummaryParserFactory(ResponseParserFactory):
+    """Creates SummaryParsers for the query protocol CloudFormation uses"""
+
+    def __init__(self, tag_keys: Optional[Set[str]] = None):
+        super().__init__()
+        self.tag_keys = tag_keys
+
+    def create_parser(self, protocol_name: str):
+        """Create a parser for a protocol"""
+        parser = super().create_parser(protocol_name)
+        if protocol_name != "query":
+            return parser
+
+        return SummaryParser(parser, self.tag_keys)
+
+
+def get_summary_client(
+    region_name: Optional[str] = None,
+    concurrency: int = 1,
+    tag_keys: Optional[Set[str]] = None,
+    endpoint_url: Optional[str] = None,
+):
+    """Get a CloudFormation client whose describe_stacks only returns what get_stacks needs
+
+    Each stack's ID, name, creation and last updated times, status, parent ID and tags (only
+    tag_keys, if given) are streamed out of the response, rather than botocore parsing every
+    field (e.g. Outputs and Parameters). It's only suitable for taking inventories.
+    """
+    session = botocore.session.get_session()
+    session.register_component(
+        "response_parser_factory", SummaryParserFactory(tag_keys)
+    )
+
+    return boto3.Session(botocore_session=session).client(
+        "cloudformation",
+        region_name=region_name,
+        endpoint_url=endpoint_url,
+        config=client_config(concurrency),
+    )
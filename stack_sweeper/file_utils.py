@@ -0,0 +1,25 @@
+import os
+from contextlib import contextmanager
+from typing import IO, Any, Iterator
+
+
+@contextmanager
+def atomic_write(path: str, binary: bool = False) -> Iterator[IO[Any]]:
+    """Open a file that replaces path only once it's completely written
+
+    The file is written alongside path, flushed to disk, then renamed over path, so neither an
+    interrupted write nor a crash ever leaves a partial file at path.
+    """
+    temporary_path = f"{path}.tmp"
+    mode, encoding = ("wb", None) if binary else ("w", "utf-8")
+    try:
+        with open(temporary_path, mode, encoding=encoding) as temporary_file:
+            yield temporary_file
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+    os.replace(temporary_path, path)
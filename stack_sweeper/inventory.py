@@ -0,0 +1,289 @@
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .cloudformation import ACTIVE_STACK_STATUSES, Stack, get_stack, get_stacks
+from .paginator import paginate, paginate_prefetched
+from .sharding import Shard
+
+# with more stacks in the inventory's statuses than this, paging through every stack takes
+# fewer calls than describing each matching stack
+DESCRIBE_EACH_LIMIT = 200
+
+
+class InventoryChanges(NamedTuple):
+    """The stack IDs that changed during an inventory refresh"""
+
+    added: List[str]
+    updated: List[str]
+    removed: List[str]
+
+
+class Inventory:
+    """An index of an account's top-level stacks that can be refreshed incrementally
+
+    With a shard, only the stacks that shard owns are kept (and described). With stack
+    statuses, only stacks in those statuses are listed (and described). With prefetch pages,
+    the next pages of stacks are fetched while the current page is processed. With a summary
+    client, every stack is described by it when loading (see fast_parsing). Stacks are
+    described up to workers at a time, and tag_keys are the only tags that are needed (or
+    None if every tag is).
+    """
+
+    cloudformation: Any
+    shard: Optional[Shard]
+    stack_statuses: Optional[List[str]]
+    prefetch_pages: int
+    summary_client: Any
+    workers: int
+    tag_keys: Optional[Set[str]]
+    stacks: Dict[str, Stack]
+    loaded: bool
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        cloudformation,
+        shard: Optional[Shard] = None,
+        stack_statuses: Optional[List[str]] = None,
+        prefetch_pages: int = 0,
+        summary_client=None,
+        workers: int = 1,
+        tag_keys: Optional[Set[str]] = None,
+    ):
+        self.cloudformation = cloudformation
+        self.shard = shard
+        self.stack_statuses = stack_statuses
+        self.prefetch_pages = prefetch_pages
+        self.summary_client = summary_client
+        self.workers = workers
+        self.tag_keys = tag_keys
+        self.stacks = {}
+        self.loaded = False
+        self.__updated_index: Optional[Tuple[List[datetime], List[str]]] = None
+        self.__tag_index: Dict[str, Dict[str, Set[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.stacks)
+
+    def __iter__(self) -> Iterator[Stack]:
+        return iter(list(self.stacks.values()))
+
+    def __contains__(self, stack_id: str) -> bool:
+        return stack_id in self.stacks
+
+    def get(self, stack_id: str) -> Optional[Stack]:
+        """Retrieve a stack by its ID"""
+        return self.stacks.get(stack_id)
+
+    def updated_before(self, cutoff: datetime) -> List[Stack]:
+        """Find the stacks last updated at or before cutoff, oldest first
+
+        The stacks are found by bisecting an index sorted by last update time, which is built
+        on first use and rebuilt only after the inventory changes.
+        """
+        if self.__updated_index is None:
+            index = sorted(
+                (stack.last_updated_at, stack_id)
+                for stack_id, stack in self.stacks.items()
+            )
+            self.__updated_index = (
+                [last_updated_at for last_updated_at, _ in index],
+                [stack_id for _, stack_id in index],
+            )
+
+        updated_at, stack_ids = self.__updated_index
+        position = bisect_right(updated_at, cutoff)
+
+        return [self.stacks[stack_id] for stack_id in stack_ids[:position]]
+
+    def tag_values(self, key: str) -> Dict[str, Set[str]]:
+        """Find the IDs of the stacks with a tag, grouped by the tag's value
+
+        An index is only built for the tag keys that are asked for, on first use, and is rebuilt
+        only after the inventory changes.
+        """
+        if key not in self.__tag_index:
+            index: Dict[str, Set[str]] = {}
+            for stack_id, stack in self.stacks.items():
+                value = stack.tag_value(key)
+                if value is not None:
+                    index.setdefault(value, set()).add(stack_id)
+
+            self.__tag_index[key] = index
+
+        return self.__tag_index[key]
+
+    def tagged(self, key: str, value: Optional[str] = None) -> Set[str]:
+        """Find the IDs of the stacks with a tag, optionally with a specific value"""
+        values = self.tag_values(key)
+        if value is not None:
+            return set(values.get(value, ()))
+
+        return set().union(*values.values())
+
+    def refresh_stack(self, stack_id: str) -> Optional[Stack]:
+        """Describe a single stack again, removing it from the inventory if it no longer exists"""
+        stack = (
+            get_stack(self.cloudformation, stack_id) if self.__owns(stack_id) else None
+        )
+        if not stack or stack.parent_id:  # nested stacks are deleted by their parents
+            self.discard(stack_id)
+            return None
+
+        self.stacks[stack_id] = stack
+        self.__invalidate()
+        return stack
+
+    def discard(self, stack_id: str):
+        """Remove a stack from the inventory"""
+        self.stacks.pop(stack_id, None)
+        self.__invalidate()
+
+    def load(self) -> InventoryChanges:
+        """Perform a full inventory, describing every stack"""
+        stacks = {
+            stack.stack_id: stack
+            for stack in self.__get_stacks()
+            if self.__owns(stack.stack_id)
+        }
+
+        changes = InventoryChanges(
+            added=[stack_id for stack_id in stacks if stack_id not in self.stacks],
+            updated=[stack_id for stack_id in stacks if stack_id in self.stacks],
+            removed=[stack_id for stack_id in self.stacks if stack_id not in stacks],
+        )
+        self.stacks = stacks
+        self.loaded = True
+        self.__invalidate()
+
+        return changes
+
+    def restore(self, stack_details: Iterable[MutableMapping[str, Any]]):
+        """Restore stacks saved by an earlier run, so the next refresh is incremental"""
+        self.stacks = {
+            detail["StackId"]: Stack.factory_from_stack_detail(
+                self.cloudformation, detail
+            )
+            for detail in stack_details
+            if self.__owns(detail["StackId"])
+        }
+        self.loaded = True
+        self.__invalidate()
+
+    def refresh(self) -> InventoryChanges:
+        """Refresh the inventory, only describing stacks that are new or updated since the last refresh
+
+        Changes are detected from the LastUpdatedTime of each stack's summary in list_stacks,
+        which is far cheaper than describing every stack again.
+        """
+        if not self.loaded:
+            return self.load()
+
+        seen = set()
+        added: List[str] = []
+        updated: List[str] = []
+        for summary in self.__list_stacks(self.stack_statuses or ACTIVE_STACK_STATUSES):
+            if "ParentId" in summary or not self.__owns(summary["StackId"]):
+                continue
+
+            stack_id = summary["StackId"]
+            seen.add(stack_id)
+
+            known_stack = self.stacks.get(stack_id)
+            last_updated_at = summary.get("LastUpdatedTime", summary["CreationTime"])
+            if known_stack and known_stack.last_updated_at == last_updated_at:
+                # deletions don't change LastUpdatedTime, but are tracked through the status
+                known_stack.stack_status = summary["StackStatus"]
+                continue
+
+            stack = get_stack(self.cloudformation, stack_id)
+            if not stack:  # deleted between being listed and described
+                seen.discard(stack_id)
+                continue
+
+            self.stacks[stack_id] = stack
+            (updated if known_stack else added).append(stack_id)
+
+        removed = [stack_id for stack_id in self.stacks if stack_id not in seen]
+        for stack_id in removed:
+            del self.stacks[stack_id]
+
+        if added or updated or removed:
+            self.__invalidate()
+
+        return InventoryChanges(added, updated, removed)
+
+    def __list_stacks(self, stack_statuses: List[str]) -> Iterator[Dict[str, Any]]:
+        """List the summaries of stacks in some statuses"""
+        if self.prefetch_pages:
+            return paginate_prefetched(
+                self.cloudformation.list_stacks,
+                self.prefetch_pages,
+                StackStatusFilter=stack_statuses,
+            )
+
+        return paginate(
+            self.cloudformation.list_stacks, StackStatusFilter=stack_statuses
+        )
+
+    def __get_stacks(self) -> Iterator[Stack]:
+        """Describe every stack, or only the stacks in the inventory's statuses
+
+        list_stacks can filter by status (describe_stacks can't), so when only some statuses
+        are wanted the matching stacks are listed first. Without any tags to keep, their
+        summaries are all that's needed. Otherwise they're described up to workers at a time,
+        or when many stacks match, by paging through every stack and keeping the matches.
+        """
+        if not self.stack_statuses:
+            yield from get_stacks(
+                self.cloudformation, self.prefetch_pages, self.summary_client
+            )
+            return
+
+        summaries = [
+            summary
+            for summary in self.__list_stacks(self.stack_statuses)
+            if "ParentId" not in summary and self.__owns(summary["StackId"])
+        ]
+        if self.tag_keys is not None and not self.tag_keys:
+            for summary in summaries:
+                yield Stack.factory_from_stack_detail(self.cloudformation, summary)
+            return
+
+        if len(summaries) > DESCRIBE_EACH_LIMIT:
+            matching = {summary["StackId"] for summary in summaries}
+            for stack in get_stacks(
+                self.cloudformation, self.prefetch_pages, self.summary_client
+            ):
+                if stack.stack_id in matching:
+                    yield stack
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for described in executor.map(
+                lambda summary: get_stack(self.cloudformation, summary["StackId"]),
+                summaries,
+            ):
+                if described:  # deleted between being listed and described
+                    yield described
+
+    def __owns(self, stack_id: str) -> bool:
+        """Does this inventory's shard own the stack?"""
+        return not self.shard or self.shard.includes(stack_id)
+
+    def __invalidate(self):
+        """Forget the indexes, so they're rebuilt the next time they're used"""
+        self.__updated_index = None
+        self.__tag_index = {}
@@ -0,0 +1,329 @@
+import argparse
+import logging
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .base_strategy import BaseStrategy
+from .cli import get_inventory, parse_args
+from .cloudformation import (
+    IN_PROGRESS_STACK_STATUSES,
+    SUCCESSFUL_STACK_STATUSES,
+    Stack,
+    find_failed_resources,
+    get_stack,
+)
+from .log_utils import log, log_setup
+from .options import MODE_OPTIONS, get_strategy_from_args, options_to_args
+from .retry_queue import Retry, RetryQueue
+
+# Only argument parsing, strategies and the Stack model are imported on a cold start. boto3
+# is imported when the first client is created, and clients are cached between invocations.
+# pylint: disable=import-outside-toplevel
+
+DEFAULT_RESERVE_SECONDS = 30
+POLL_SECONDS = 5
+
+
+class Deadline:
+    """The time an invocation has left, less a reserve for returning its result"""
+
+    def __init__(self, context: Any, reserve_seconds: float = DEFAULT_RESERVE_SECONDS):
+        self.context = context
+        self.reserve_seconds = reserve_seconds
+
+    def remaining(self) -> float:
+        """The number of seconds left to work in"""
+        return self.context.get_remaining_time_in_millis() / 1000 - self.reserve_seconds
+
+    def expired(self) -> bool:
+        """Has the time to work run out?"""
+        return self.remaining() <= 0
+
+
+class Continuation(NamedTuple):
+    """Where an invocation stopped, for the next invocation to pick up"""
+
+    pending: List[str]  # stacks selected for deletion, but not yet deleted
+    deleting: List[str]  # stacks whose deletions are in progress
+    attempts: Optional[Dict[str, int]] = None  # the attempt each retried stack is on
+    lease_owner: Optional[str] = None  # the owner of the leases on these stacks
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        """The continuation token, or None if there is nothing left to do"""
+        if not self.pending and not self.deleting:
+            return None
+
+        token: Dict[str, Any] = {"pending": self.pending, "deleting": self.deleting}
+        if self.attempts:
+            token["attempts"] = self.attempts
+        if self.lease_owner:
+            token["lease_owner"] = self.lease_owner
+
+        return token
+
+
+def parse_options(options: Dict[str, Any]) -> argparse.Namespace:
+    """Parse an event's options with the same rules as the CLI"""
+    unsupported = [option for option in MODE_OPTIONS if options.get(option)]
+    if unsupported:
+        raise ValueError(f"{', '.join(unsupported)} can not be used from Lambda")
+
+    try:
+        args = parse_args(options_to_args(options))
+    except SystemExit as e:  # argparse has already logged why
+        raise ValueError(f"Invalid options: {options}") from e
+
+    # deletions are never waited on in-line, they're polled within the time budget instead
+    args.wait = False
+    return args
+
+
+class BudgetedDeleter:  # pylint: disable=too-many-instance-attributes
+    """Deletes stacks, up to --workers at a time, until the deadline approaches
+
+    Each pending stack is described again just before it's deleted, and skipped if it no
+    longer exists or the strategy no longer selects it (e.g. it was updated since it was
+    selected). Stacks that end up in DELETE_FAILED are retried with backoff, as in a sweep.
+
+    With a --lease-store, each stack is leased before it's deleted, and skipped if another
+    sweeper holds it. Leases are renewed while stacks are polled, and kept between
+    invocations by passing their owner on in the continuation token.
+    """
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        deadline: Deadline,
+        strategy: BaseStrategy,
+        lease_owner: Optional[str] = None,
+    ):
+        from .sweeper import get_stack_leases
+
+        self.args = args
+        self.deadline = deadline
+        self.strategy = strategy
+        self.retry_queue = RetryQueue(
+            args.delete_retries, args.retry_delay, args.retain_failed_resources
+        )
+        self.attempts: Dict[str, int] = {}  # the attempt each retried stack is on
+        self.deleted: List[Stack] = []
+        self.failed: List[Stack] = []
+        self.leases = get_stack_leases(args)
+        if self.leases and lease_owner:
+            self.leases.owner = lease_owner
+
+    def run(
+        self,
+        cloudformation,
+        pending: List[str],
+        deleting: List[Stack],
+        attempts: Optional[Dict[str, int]] = None,
+    ) -> Continuation:
+        """Delete the pending stacks and wait on the deleting stacks, until done or out of time"""
+        self.attempts.update(attempts or {})
+        pending = list(pending)
+        retries: List[Retry] = []
+        while (
+            pending or retries or deleting or self.retry_queue
+        ) and not self.deadline.expired():
+            retries.extend(self.retry_queue.pop_due())
+            while (pending or retries) and len(deleting) < self.args.workers:
+                started = self.start_next(cloudformation, pending, retries)
+                if started:
+                    deleting.append(started)
+
+                if self.deadline.expired():
+                    break
+
+            deleting = self.poll(deleting)
+            if (deleting or self.retry_queue) and not self.deadline.expired():
+                wait: float = POLL_SECONDS
+                if not deleting:
+                    wait = min(wait, self.retry_queue.seconds_until_due() or 0)
+
+                time.sleep(min(wait, max(self.deadline.remaining(), 0)))
+
+        # retries that haven't started are picked up by the next invocation
+        retries.extend(self.retry_queue.pop_all())
+        pending = [retry.stack.stack_id for retry in retries] + pending
+        deleting_ids = [stack.stack_id for stack in deleting]
+        return Continuation(
+            pending,
+            deleting_ids,
+            {
+                stack_id: self.attempts[stack_id]
+                for stack_id in pending + deleting_ids
+                if stack_id in self.attempts
+            },
+            self.leases.owner if self.leases else None,
+        )
+
+    def start_next(
+        self, cloudformation, pending: List[str], retries: List[Retry]
+    ) -> Optional[Stack]:
+        """Start the next retry or pending stack, returning it if its deletion is in progress"""
+        if retries:
+            retry = retries.pop(0)
+            return self.start(retry.stack, retry.retain_resources)
+
+        stack = self.describe_pending(cloudformation, pending.pop(0))
+        if stack and stack.stack_status not in IN_PROGRESS_STACK_STATUSES:
+            return self.start(stack, self.retained_resources(stack))
+
+        return stack
+
+    def describe_pending(self, cloudformation, stack_id: str) -> Optional[Stack]:
+        """Describe a pending stack again, returning None if it should no longer be deleted"""
+        stack = get_stack(cloudformation, stack_id)
+        if not stack:
+            log(f"Skipping stack {stack_id}, it no longer exists")
+            return None
+
+        if stack_id in self.attempts:
+            # retried by an earlier invocation, so it's in DELETE_FAILED rather than selected
+            stack.failed_resources = find_failed_resources(stack.events, stack.name)
+        elif not self.strategy.evaluate(stack).remove:
+            log(f"Skipping stack {stack.name}, it has changed since it was selected")
+            return None
+
+        return stack
+
+    def retained_resources(self, stack: Stack) -> Optional[List[str]]:
+        """The resources to retain when deleting a stack, if it's on its final attempt"""
+        if (
+            self.args.retain_failed_resources
+            and self.attempts.get(stack.stack_id, 1) > self.args.delete_retries
+        ):
+            return stack.failed_resources or None
+
+        return None
+
+    def start(
+        self, stack: Stack, retain_resources: Optional[List[str]] = None
+    ) -> Optional[Stack]:
+        """Start deleting a stack, returning None if it couldn't be or another sweeper holds it"""
+        from .sweeper import delete_leased_stack
+
+        try:
+            if not delete_leased_stack(self.args, self.leases, stack, retain_resources):
+                return None
+        except Exception as e:  # pylint: disable=broad-except
+            log(str(e), logging.ERROR)
+            self.finish(stack, failed=True)
+            return None
+
+        return stack
+
+    def poll(self, deleting: List[Stack]) -> List[Stack]:
+        """Check on stacks being deleted, returning those still in progress"""
+        still_deleting = []
+        for stack in deleting:
+            current = get_stack(stack.cloudformation, stack.stack_id)
+            status = current.stack_status if current else "DELETE_COMPLETE"
+            if status in IN_PROGRESS_STACK_STATUSES:
+                self.renew_lease(stack)
+                still_deleting.append(stack)
+            elif status in SUCCESSFUL_STACK_STATUSES:
+                log(f"Deleted stack {stack.name}")
+                self.finish(stack)
+            else:
+                log(f"Stack {stack.name} failed to delete: {status}", logging.ERROR)
+                self.retry(stack)
+
+        return still_deleting
+
+    def retry(self, stack: Stack):
+        """Schedule a failed deletion to be retried, if the stack has attempts left"""
+        stack.failed_resources = find_failed_resources(stack.events, stack.name)
+        attempt = self.attempts.get(stack.stack_id, 1)
+        if self.retry_queue.schedule(stack, attempt, stack.failed_resources):
+            self.attempts[stack.stack_id] = attempt + 1
+        else:
+            self.finish(stack, failed=True)
+
+    def finish(self, stack: Stack, failed: bool = False):
+        """Record a stack as deleted or out of retries, and give up its lease"""
+        if failed:
+            self.failed.append(stack)
+        else:
+            self.deleted.append(stack)
+
+        if self.leases:
+            self.leases.release(stack)
+
+    def renew_lease(self, stack: Stack):
+        """Renew the lease on a stack that's still being deleted"""
+        if self.leases and not self.leases.store.acquire(
+            stack.stack_id, self.leases.owner, self.leases.seconds
+        ):
+            log(
+                f"Lost the lease on stack {stack.name} to another sweeper",
+                logging.WARNING,
+            )
+
+
+def select_stacks(args: argparse.Namespace, cloudformation) -> Continuation:
+    """Inventory and evaluate every stack, without deleting any"""
+    from .sweeper import sweep
+
+    inventory = get_inventory(args, cloudformation)
+    inventory.load()
+    result = sweep(
+        argparse.Namespace(**{**vars(args), "delete": False}),
+        get_strategy_from_args(args),
+        inventory,
+    )
+
+    return Continuation(
+        [decision.stack.stack_id for decision in result.selected],
+        [stack.stack_id for stack in result.deleting],
+    )
+
+
+def describe_stacks(cloudformation, stack_ids: List[str]) -> List[Stack]:
+    """Describe the stacks in a continuation token, skipping any that no longer exist"""
+    stacks = [get_stack(cloudformation, stack_id) for stack_id in stack_ids]
+    return [stack for stack in stacks if stack]
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """The Lambda entry point
+
+    The event holds the CLI's options (e.g. {"options": {"stack_update_age": 90, "delete": true}}).
+    When the invocation runs short of time, it stops starting new deletions and returns a
+    continuation token; invoking again with the same options and that token (as "continuation")
+    picks up where it stopped, without inventorying the account again.
+    """
+    from .clients import get_client
+
+    args = parse_options(event.get("options", {}))
+    log_setup(args.log_level)
+    deadline = Deadline(context, event.get("reserve_seconds", DEFAULT_RESERVE_SECONDS))
+    cloudformation = get_client("cloudformation", args.region, args.workers)
+
+    selected: List[str] = []
+    if event.get("continuation"):
+        continuation = Continuation(**event["continuation"])
+    else:
+        continuation = select_stacks(args, cloudformation)
+        selected = continuation.pending
+
+    deleter = BudgetedDeleter(
+        args, deadline, get_strategy_from_args(args), continuation.lease_owner
+    )
+    if args.delete:
+        continuation = deleter.run(
+            cloudformation,
+            continuation.pending,
+            describe_stacks(cloudformation, continuation.deleting),
+            continuation.attempts,
+        )
+    else:
+        continuation = Continuation([], [])
+
+    return {
+        "selected": selected,
+        "deleted": [stack.stack_id for stack in deleter.deleted],
+        "failed": [stack.stack_id for stack in deleter.failed],
+        "continuation": continuation.to_dict(),
+    }
@@ -1,10 +1,12 @@
-from datetime import datetime, timedelta
-from typing import Optional
-
-from dateutil.tz import tzutc
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Optional, Set
 
 from .base_strategy import BaseStrategy
 from .cloudformation import Stack
+from .decision import Decision
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
 
 
 class LastUpdatedStrategy(BaseStrategy):
@@ -17,16 +19,29 @@ class LastUpdatedStrategy(BaseStrategy):
         self, allowed_delta: timedelta, compare_time: Optional[datetime] = None
     ):
         if not compare_time:
-            compare_time = datetime.now(tz=tzutc())
+            compare_time = datetime.now(tz=timezone.utc)
 
         self.allowed_delta = allowed_delta
         self.compare_time = compare_time
 
-    def should_remove(self, stack: Stack) -> bool:
-        """Should this stack be removed?"""
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed"""
         expiry = stack.last_updated_at + self.allowed_delta
 
-        result = expiry <= self.compare_time
+        if expiry > self.compare_time:
+            return Decision(stack, False)
+
+        return Decision(stack, True, (self.get_mark_reason(stack),))
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """Only stacks last updated before the threshold can be removed"""
+        cutoff = self.compare_time - self.allowed_delta
+
+        return {stack.stack_id for stack in inventory.updated_before(cutoff)}
+
+    def should_remove(self, stack: Stack) -> bool:
+        """Should this stack be removed?"""
+        result = self.evaluate(stack).remove
 
         if result:
             stack.mark(self)
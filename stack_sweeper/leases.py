@@ -0,0 +1,221 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+from urllib.parse import urlparse
+
+from .cloudformation import Stack
+from .log_utils import log
+
+
+def default_owner() -> str:
+    """An owner name that is unique to this process"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# every sweep in a process shares an owner, so a daemon can renew its own leases
+OWNER = default_owner()
+
+
+class LeaseStore(ABC):
+    """Grants time-limited, exclusive leases on stacks, so only one sweeper deletes each stack
+
+    A lease that isn't released (e.g. because its sweeper died) can be taken over by another
+    owner once it expires.
+    """
+
+    @abstractmethod
+    def acquire(self, key: str, owner: str, seconds: float) -> bool:
+        """Take (or renew) the lease on key, returning False if another owner holds it"""
+
+    @abstractmethod
+    def release(self, key: str, owner: str):
+        """Give up the lease on key, if owner still holds it"""
+
+
+class SqliteLeaseStore(LeaseStore):
+    """Leases kept in a SQLite database, shared by sweepers on the same host"""
+
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases "
+            "(key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def acquire(self, key: str, owner: str, seconds: float) -> bool:
+        """Take (or renew) the lease on key, returning False if another owner holds it"""
+        now = time.time()
+        with self.__lock:
+            cursor = self.__connection.execute(
+                "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+                (key, owner, now + seconds, now),
+            )
+
+            return cursor.rowcount == 1
+
+    def release(self, key: str, owner: str):
+        """Give up the lease on key, if owner still holds it"""
+        with self.__lock:
+            self.__connection.execute(
+                "DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner)
+            )
+
+
+class DynamoDBLeaseStore(LeaseStore):
+    """Leases kept in a DynamoDB (or DynamoDB-compatible) table, shared by sweepers anywhere
+
+    The table needs a string partition key named `key`. Leases are taken with conditional
+    writes, so two sweepers can never both hold the same lease.
+    """
+
+    dynamodb: Any
+    table_name: str
+
+    def __init__(self, dynamodb, table_name: str):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+
+    def acquire(self, key: str, owner: str, seconds: float) -> bool:
+        """Take (or renew) the lease on key, returning False if another owner holds it"""
+        now = time.time()
+        try:
+            self.dynamodb.put_item(
+                TableName=self.table_name,
+                Item={
+                    "key": {"S": key},
+                    "owner": {"S": owner},
+                    "expires_at": {"N": str(now + seconds)},
+                },
+                ConditionExpression="attribute_not_exists(#key) OR #owner = :owner OR expires_at <= :now",
+                ExpressionAttributeNames={"#key": "key", "#owner": "owner"},
+                ExpressionAttributeValues={
+                    ":owner": {"S": owner},
+                    ":now": {"N": str(now)},
+                },
+            )
+        except self.dynamodb.exceptions.ConditionalCheckFailedException:
+            return False
+
+        return True
+
+    def release(self, key: str, owner: str):
+        """Give up the lease on key, if owner still holds it"""
+        try:
+            self.dynamodb.delete_item(
+                TableName=self.table_name,
+                Key={"key": {"S": key}},
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={"#owner": "owner"},
+                ExpressionAttributeValues={":owner": {"S": owner}},
+            )
+        except self.dynamodb.exceptions.ConditionalCheckFailedException:
+            pass  # it expired, and was taken over by another sweeper
+
+
+class StackLeases:
+    """The leases one sweeper holds on the stacks it is deleting"""
+
+    store: LeaseStore
+    owner: str
+    seconds: float
+
+    def __init__(self, store: LeaseStore, owner: str, seconds: float):
+        self.store = store
+        self.owner = owner
+        self.seconds = seconds
+
+    def acquire(self, stack: Stack) -> bool:
+        """Lease (or renew the lease on) a stack, returning False if another sweeper holds it"""
+        if self.store.acquire(stack.stack_id, self.owner, self.seconds):
+            return True
+
+        log(f"Skipping stack {stack.name}, another sweeper is deleting it")
+        return False
+
+    @contextmanager
+    def held(self, stack: Stack) -> Iterator[bool]:
+        """Lease a stack, renewing the lease in the background for as long as it's held
+
+        Yields False if another sweeper holds the stack. The lease isn't released on exit,
+        as it's kept while the stack's deletion is retried.
+        """
+        if not self.acquire(stack):
+            yield False
+            return
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self.__renew, args=(stack, stop), daemon=True
+        )
+        heartbeat.start()
+        try:
+            yield True
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def __renew(self, stack: Stack, stop: threading.Event):
+        """Renew a lease every third of its length, until stopped"""
+        while not stop.wait(self.seconds / 3):
+            try:
+                if not self.store.acquire(stack.stack_id, self.owner, self.seconds):
+                    log(
+                        f"Lost the lease on stack {stack.name} to another sweeper",
+                        logging.WARNING,
+                    )
+                    return
+            except Exception as e:  # pylint: disable=broad-except
+                log(
+                    f"Could not renew the lease on stack {stack.name}: {e}",
+                    logging.WARNING,
+                )
+
+    def release(self, stack: Stack):
+        """Give up the lease on a stack, if this sweeper still holds it"""
+        self.store.release(stack.stack_id, self.owner)
+
+
+def get_lease_store(url: str, region_name: Optional[str] = None) -> LeaseStore:
+    """Create a lease store from a URL
+
+    - sqlite:///relative/path/to/leases.db, or sqlite:////absolute/path/to/leases.db
+    - dynamodb://table-name
+    - dynamodb+http://localhost:8000/table-name (a DynamoDB-compatible endpoint)
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        if parsed.netloc or not parsed.path.startswith("/"):
+            raise ValueError(f"{url} is not a sqlite:///path/to/leases.db lease store")
+
+        return SqliteLeaseStore(parsed.path[1:])
+
+    if parsed.scheme == "dynamodb":
+        from .clients import get_client  # pylint: disable=import-outside-toplevel
+
+        return DynamoDBLeaseStore(get_client("dynamodb", region_name), parsed.netloc)
+
+    if parsed.scheme.startswith("dynamodb+"):
+        from .clients import get_client  # pylint: disable=import-outside-toplevel
+
+        endpoint_url = f"{parsed.scheme.split('+', 1)[1]}://{parsed.netloc}"
+        return DynamoDBLeaseStore(
+            get_client("dynamodb", region_name, endpoint_url=endpoint_url),
+            parsed.path.lstrip("/"),
+        )
+
+    raise ValueError(f"{url} is not a sqlite:// or dynamodb:// lease store")
@@ -1,5 +1,11 @@
+from typing import TYPE_CHECKING, List, Optional, Set
+
 from .base_strategy import BaseStrategy
 from .cloudformation import Stack
+from .decision import Decision
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
 
 
 class LimitedStrategy(BaseStrategy):
@@ -25,5 +31,34 @@ class LimitedStrategy(BaseStrategy):
 
         return result
 
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed, ignoring the limit (which is applied by finalise())"""
+        return self.nested_strategy.evaluate(stack)
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """The stacks the nested strategy could remove"""
+        return self.nested_strategy.candidates(inventory)
+
+    def finalise(self, decisions: List[Decision]) -> List[Decision]:
+        """Keep any stacks selected for removal beyond the limit"""
+        decisions = self.nested_strategy.finalise(decisions)
+
+        selected = 0
+        limited_decisions = []
+        for decision in decisions:
+            if decision.remove:
+                if selected >= self.limit:
+                    decision = Decision(decision.stack, False)
+                else:
+                    selected += 1
+
+            limited_decisions.append(decision)
+
+        return limited_decisions
+
+    def constrains_selection(self) -> bool:
+        """The limit constrains the selection"""
+        return True
+
     def __str__(self):
         return f"LimitedStrategy({self.limit}, nested_strategy={self.nested_strategy})"
@@ -1,10 +1,75 @@
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
 LOGGER = logging.getLogger()
 
+# the most records a queued log holds before dropping records, while output is slow
+DEFAULT_QUEUE_SIZE = 10_000
+
+# only log stack events that change a stack's status (or fail) at INFO
+COALESCE_EVENTS = False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """A queue handler that drops records when the queue is full, rather than blocking"""
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        """Queue a record, or count it as dropped if the queue is full"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def queue_handlers(queue_size: int = DEFAULT_QUEUE_SIZE) -> QueueListener:
+    """Move the root logger's handlers behind a bounded queue, written by a background thread
+
+    Logging then never waits on output (or on other threads' output). The returned listener
+    is started, and is stopped (flushing any queued records) when the process exits.
+    """
+    handler = BoundedQueueHandler(queue.Queue(queue_size))
+    listener = QueueListener(
+        handler.queue, *LOGGER.handlers, respect_handler_level=True
+    )
+    for existing_handler in list(LOGGER.handlers):
+        LOGGER.removeHandler(existing_handler)
+
+    LOGGER.addHandler(handler)
+    listener.start()
+
+    def stop():
+        listener.stop()
+        if handler.dropped:
+            for output_handler in listener.handlers:
+                output_handler.handle(
+                    LOGGER.makeRecord(
+                        LOGGER.name,
+                        logging.WARNING,
+                        __file__,
+                        0,
+                        f"{handler.dropped} log messages were dropped, as output was too slow",
+                        (),
+                        None,
+                    )
+                )
+
+    atexit.register(stop)
+    return listener
+
+
+def log_setup(
+    level: str = "INFO", queued: bool = False, coalesce_events: bool = False
+) -> Optional[QueueListener]:  # pragma: no cover
+    """Configure base logging, optionally queued and with stack events coalesced"""
+    global COALESCE_EVENTS  # pylint: disable=global-statement
 
-def log_setup(level: str = "INFO"):  # pragma: no cover
-    """Configure base logging"""
     log_level = getattr(logging, level.upper(), None)
     if not isinstance(log_level, int):
         raise ValueError(f"Invalid log level: {level}")
@@ -12,6 +77,8 @@ def log_setup(level: str = "INFO"):  # pragma: no cover
     logging.basicConfig(
         level=log_level, format="%(asctime)s %(levelname)-2s: %(message)s"
     )
+    # basicConfig does nothing if a handler is already configured (e.g. by AWS Lambda)
+    LOGGER.setLevel(log_level)
 
     # quieten boto3 and related components
     logging.getLogger("boto3").setLevel(logging.CRITICAL)
@@ -19,6 +86,12 @@ def log_setup(level: str = "INFO"):  # pragma: no cover
     logging.getLogger("s3transfer").setLevel(logging.CRITICAL)
     logging.getLogger("urllib3").setLevel(logging.CRITICAL)
 
+    COALESCE_EVENTS = coalesce_events
+    if queued:
+        return queue_handlers()
+
+    return None
+
 
 def log(msg: str, level=logging.INFO):
     """Writes a message to the log"""
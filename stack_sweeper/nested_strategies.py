@@ -1,7 +1,11 @@
-from typing import List
+from typing import TYPE_CHECKING, List, Optional, Set
 
 from .base_strategy import BaseStrategy
 from .cloudformation import Stack
+from .decision import Decision
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
 
 
 class BaseMultiNestedStrategy(BaseStrategy):
@@ -18,6 +22,12 @@ class BaseMultiNestedStrategy(BaseStrategy):
         ]
         return f"{self.__class__.__name__}(nested_strategies=[{', '.join(nested_strategies)}])"
 
+    def constrains_selection(self) -> bool:
+        """Whether any nested strategy constrains the selection"""
+        return any(
+            strategy.constrains_selection() for strategy in self.nested_strategies
+        )
+
 
 class NestedAllStrategy(BaseMultiNestedStrategy):
     """A strategy that requires that all nested strategies concur before the stack is selected"""
@@ -31,6 +41,44 @@ class NestedAllStrategy(BaseMultiNestedStrategy):
 
         return True
 
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed, collecting the reasons of every nested strategy"""
+        reasons: List[str] = []
+        for strategy in self.nested_strategies:
+            decision = strategy.evaluate(stack)
+            if not decision.remove:
+                return Decision(stack, False)
+
+            reasons.extend(decision.reasons)
+
+        return Decision(stack, True, tuple(reasons))
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """Only stacks that every nested strategy could remove"""
+        candidates: Optional[Set[str]] = None
+        for strategy in self.nested_strategies:
+            strategy_candidates = strategy.candidates(inventory)
+            if strategy_candidates is None:
+                continue
+
+            if candidates is None:
+                candidates = strategy_candidates
+            else:
+                candidates = candidates & strategy_candidates
+
+        return candidates
+
+    def finalise(self, decisions: List[Decision]) -> List[Decision]:
+        """Apply each nested strategy's constraints (e.g. limits) in turn
+
+        Every stack selected was selected by every nested strategy, so each can constrain the
+        whole selection.
+        """
+        for strategy in self.nested_strategies:
+            decisions = strategy.finalise(decisions)
+
+        return decisions
+
 
 class NestedAnyStrategy(BaseMultiNestedStrategy):
     """A strategy that requires that a single nested strategy concurs before the stack is selected"""
@@ -43,3 +91,70 @@ class NestedAnyStrategy(BaseMultiNestedStrategy):
                 return True
 
         return False
+
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed, using the reasons of the first concurring strategy"""
+        for strategy in self.nested_strategies:
+            decision = strategy.evaluate(stack)
+            if decision.remove:
+                return Decision(stack, True, decision.reasons)
+
+        return Decision(stack, False)
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """Any stack that a nested strategy could remove"""
+        candidates: Set[str] = set()
+        for strategy in self.nested_strategies:
+            strategy_candidates = strategy.candidates(inventory)
+            if strategy_candidates is None:
+                return None
+
+            candidates |= strategy_candidates
+
+        return candidates
+
+    def finalise(self, decisions: List[Decision]) -> List[Decision]:
+        """Apply each nested strategy's constraints (e.g. limits) to the stacks it selected
+
+        Each constraining nested strategy only constrains its own selection, so the selected
+        stacks are evaluated again by each one. A stack stays selected if any constraining
+        strategy's finalised decision, or any other nested strategy, still selects it.
+        """
+        constraining = [
+            strategy
+            for strategy in self.nested_strategies
+            if strategy.constrains_selection()
+        ]
+        selected = [
+            index for index, decision in enumerate(decisions) if decision.remove
+        ]
+        if not constraining or not selected:
+            return decisions
+
+        finalised = [
+            strategy.finalise(
+                [strategy.evaluate(decisions[index].stack) for index in selected]
+            )
+            for strategy in constraining
+        ]
+        unconstrained = [
+            strategy
+            for strategy in self.nested_strategies
+            if strategy not in constraining
+        ]
+        decisions = list(decisions)
+        for position, index in enumerate(selected):
+            stack = decisions[index].stack
+            decisions[index] = Decision(stack, False)
+            for strategy_decisions in finalised:
+                if strategy_decisions[position].remove:
+                    decisions[index] = strategy_decisions[position]
+                    break
+            else:  # only the strategies without constraints can still select it
+                for strategy in unconstrained:
+                    decision = strategy.evaluate(stack)
+                    if decision.remove:
+                        decisions[index] = decision
+                        break
+
+        return decisions
@@ -0,0 +1,95 @@
+import argparse
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from .base_strategy import BaseStrategy
+from .exclude_names_strategy import ExcludeNamesStrategy
+from .exclude_tag_strategy import ExcludeTagStrategy
+from .expiration_tag_strategy import ExpirationTagStrategy
+from .expression_strategy import ExpressionStrategy
+from .last_updated_strategy import LastUpdatedStrategy
+from .limited_strategy import LimitedStrategy
+from .nested_strategies import NestedAllStrategy, NestedAnyStrategy
+from .stack_status_strategy import StackStatusStrategy
+
+# options that choose a sweep's mode or its outputs, rather than which stacks it deletes
+MODE_OPTIONS = [
+    "daemon",
+    "schedule",
+    "interval",
+    "health_port",
+    "events",
+    "coalesce_events",
+    "state",
+    "snapshot",
+    "snapshot_out",
+    "plan_out",
+    "apply",
+    "plan_thresholds",
+    "policies",
+    "explain",
+    "record",
+    "replay",
+    "replay_latency_scale",
+    "async_logging",
+]
+
+
+def options_to_args(options: Dict[str, Any]) -> List[str]:
+    """Convert options (e.g. {"stack_update_age": 90, "delete": true}) to CLI arguments"""
+    args: List[str] = []
+    for option, value in options.items():
+        flag = f"--{option.replace('_', '-')}"
+        if value is True:
+            args.append(flag)
+        elif isinstance(value, list):
+            args.extend([flag, *[str(item) for item in value]])
+        elif value not in (False, None):
+            args.extend([flag, str(value)])
+
+    return args
+
+
+def get_exclusion_strategies_from_args(args: argparse.Namespace) -> List[BaseStrategy]:
+    """Construct the strategies that exclude stacks from args"""
+    strategies: List[BaseStrategy] = []
+    if args.exclude_tag:
+        strategies.append(ExcludeTagStrategy(args.exclude_tag))
+
+    if any([args.exclude_stacks, args.exclude_stack_prefixes]):
+        strategies.append(
+            ExcludeNamesStrategy(
+                exclude_names=args.exclude_stacks,
+                exclude_name_prefixes=args.exclude_stack_prefixes,
+            )
+        )
+
+    return strategies
+
+
+def get_strategy_from_args(args: argparse.Namespace):
+    """Construct a strategy from args"""
+    age_strategies: List[BaseStrategy] = []
+    if args.expiry_tag:
+        age_strategies.append(ExpirationTagStrategy(args.expiry_tag))
+
+    if args.stack_update_age:
+        age_strategies.append(
+            LastUpdatedStrategy(timedelta(days=args.stack_update_age))
+        )
+
+    if args.stack_statuses:
+        age_strategies.append(StackStatusStrategy(args.stack_statuses))
+
+    strategies: List[BaseStrategy] = [
+        ExpressionStrategy(args.strategy)
+        if args.strategy
+        else NestedAnyStrategy(age_strategies),
+    ]
+    strategies.extend(get_exclusion_strategies_from_args(args))
+
+    strategy: BaseStrategy = NestedAllStrategy(strategies)
+    if args.limit:
+        strategy = LimitedStrategy(args.limit, strategy)
+
+    return strategy
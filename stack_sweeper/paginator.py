@@ -1,4 +1,11 @@
-from typing import Dict, Iterator
+import queue
+import threading
+from typing import Dict, Iterator, List, Union
+
+# the most pages a prefetching paginator holds, waiting to be consumed
+DEFAULT_PREFETCH_PAGES = 2
+
+_DONE = object()
 
 
 def paginate(method, **kwargs) -> Iterator[Dict]:
@@ -8,3 +15,59 @@ def paginate(method, **kwargs) -> Iterator[Dict]:
     for page in paginator.paginate(**kwargs).result_key_iters():
         for result in page:
             yield result
+
+
+def paginate_prefetched(
+    method, pages: int = DEFAULT_PREFETCH_PAGES, **kwargs
+) -> Iterator[Dict]:
+    """Paginates through a boto3/botocore client method, fetching ahead on a background thread
+
+    While one page's results are consumed, up to `pages` more are fetched, so the latency of
+    each request overlaps with processing the page before it. Closing the iterator early
+    stops the fetching.
+    """
+    client = method.__self__
+    page_iterator = client.get_paginator(method.__name__).paginate(**kwargs)
+    fetched: "queue.Queue[Union[List[Dict], Exception, object]]" = queue.Queue(pages)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        """Queue an item, giving up if the consumer has stopped"""
+        while not stopped.is_set():
+            try:
+                fetched.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def fetch():
+        try:
+            for page in page_iterator:
+                results = [
+                    result
+                    for result_key in page_iterator.result_keys
+                    for result in result_key.search(page) or []
+                ]
+                if not put(results):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            put(e)  # raised by the consumer
+            return
+
+        put(_DONE)
+
+    threading.Thread(target=fetch, daemon=True).start()
+    try:
+        while True:
+            item = fetched.get()
+            if item is _DONE:
+                return
+
+            if isinstance(item, Exception):
+                raise item
+
+            yield from item  # type: ignore
+    finally:
+        stopped.set()
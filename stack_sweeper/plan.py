@@ -0,0 +1,99 @@
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple
+
+from .cloudformation import IN_PROGRESS_STACK_STATUSES, Stack, get_stack
+from .decision import Decision
+from .file_utils import atomic_write
+from .log_utils import log
+
+PLAN_VERSION = 1
+
+
+class FreshnessCheck(NamedTuple):
+    """The planned stacks, sorted by whether they can still be deleted as planned"""
+
+    fresh: List[Stack]
+    deleting: List[Stack]  # stacks that are already being deleted
+    stale: List[str]  # stacks that changed (or were deleted) after planning
+
+
+def stack_fingerprint(stack: Stack) -> str:
+    """A fingerprint of everything a strategy could have based its decision on"""
+    payload = json.dumps(
+        [stack.name, stack.last_updated_at.isoformat(), sorted(stack.tags.items())]
+    )
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def create_plan(decisions: List[Decision], region: str) -> Dict[str, Any]:
+    """Record the stacks a sweep selected for deletion, and why"""
+    return {
+        "version": PLAN_VERSION,
+        "created_at": datetime.now(tz=timezone.utc).isoformat(timespec="seconds"),
+        "region": region,
+        "stacks": [
+            {
+                "stack_id": decision.stack.stack_id,
+                "name": decision.stack.name,
+                "fingerprint": stack_fingerprint(decision.stack),
+                "reasons": list(decision.reasons),
+            }
+            for decision in decisions
+        ],
+    }
+
+
+def write_plan(path: str, plan: Dict[str, Any]):
+    """Write a plan to a file, for review before it's applied"""
+    with atomic_write(path) as plan_file:
+        json.dump(plan, plan_file, indent=2)
+
+    log(f"Wrote a plan to delete {len(plan['stacks'])} stacks to {path}")
+
+
+def read_plan(path: str) -> Dict[str, Any]:
+    """Read a plan written by write_plan"""
+    with open(path, encoding="utf-8") as plan_file:
+        plan = json.load(plan_file)
+
+    if plan.get("version") != PLAN_VERSION:
+        raise ValueError(
+            f"{path} is not a plan this version of stack-sweeper can apply"
+        )
+
+    return plan
+
+
+def check_freshness(
+    cloudformation, plan: Dict[str, Any], workers: int = 1
+) -> FreshnessCheck:
+    """Describe only the planned stacks, checking each is unchanged since it was planned
+
+    This replaces a full inventory when applying a plan. Stacks that were updated (or
+    re-tagged) after planning are skipped, as their evaluation may no longer hold.
+    """
+    planned = plan["stacks"]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        stacks = executor.map(
+            lambda planned_stack: get_stack(cloudformation, planned_stack["stack_id"]),
+            planned,
+        )
+
+        check = FreshnessCheck([], [], [])
+        for planned_stack, stack in zip(planned, stacks):
+            if not stack:
+                log(f"Skipping stack {planned_stack['name']}, it no longer exists")
+                check.stale.append(planned_stack["stack_id"])
+            elif stack.stack_status in IN_PROGRESS_STACK_STATUSES:
+                check.deleting.append(stack)
+            elif stack_fingerprint(stack) != planned_stack["fingerprint"]:
+                log(f"Skipping stack {stack.name}, it has changed since it was planned")
+                check.stale.append(stack.stack_id)
+            else:
+                check.fresh.append(stack)
+
+    return check
@@ -0,0 +1,155 @@
+import argparse
+import json
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+
+from .base_strategy import BaseStrategy
+from .cloudformation import Stack
+from .log_utils import log
+from .options import MODE_OPTIONS, get_strategy_from_args, options_to_args
+from .sweeper import SweepResult, sweep
+
+# options that control how or where a sweep runs, rather than what a policy deletes
+UNSUPPORTED_OPTIONS = MODE_OPTIONS + [
+    "region",
+    "shard",
+    "prefetch_pages",
+    "fast_inventory",
+    "log_level",
+]
+
+
+def inherited_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """The sweep's deletion options, which policies use unless they set their own"""
+    return {
+        "no_wait": not args.wait,
+        "workers": args.workers,
+        "delete_retries": args.delete_retries,
+        "retry_delay": args.retry_delay,
+        "lease_store": args.lease_store,
+        "lease_seconds": args.lease_seconds,
+    }
+
+
+class Policy(NamedTuple):
+    """A named strategy and deletion options, applied to the stacks matching its prefixes"""
+
+    name: str
+    stack_prefixes: List[str]  # empty to match every stack
+    args: argparse.Namespace
+
+    def matches(self, stack: Stack) -> bool:
+        """Does this policy apply to the stack?"""
+        return not self.stack_prefixes or stack.name.startswith(
+            tuple(self.stack_prefixes)
+        )
+
+
+class PolicyResult(NamedTuple):
+    """The outcome of sweeping a single policy's stacks"""
+
+    policy: Policy
+    result: SweepResult
+
+
+def parse_policy(
+    policy: Dict[str, Any],
+    args: argparse.Namespace,
+    args_parser: Callable[[List[str]], argparse.Namespace],
+) -> Policy:
+    """Parse a policy's options with the same rules as the CLI, using its argument parser
+
+    Policies only delete stacks when the sweep itself is run with --delete, and take the
+    sweep's other deletion options (e.g. --no-wait and --workers) unless they set their own.
+    """
+    name = policy.get("name")
+    options = policy.get("options", {})
+    if not name:
+        raise ValueError(f"Policy {policy} must have a name")
+
+    unsupported = [option for option in UNSUPPORTED_OPTIONS if options.get(option)]
+    if unsupported:
+        raise ValueError(
+            f"Policy {name} can not set {', '.join(unsupported)}, which apply to the whole sweep"
+        )
+
+    # deletion options are validated as if deleting, as --delete is decided by the sweep
+    try:
+        policy_args = args_parser(
+            options_to_args({**inherited_options(args), **options, "delete": True})
+        )
+    except SystemExit as e:  # argparse has already logged why
+        raise ValueError(f"Invalid options for policy {name}: {options}") from e
+
+    policy_args.delete = args.delete
+    policy_args.region = args.region
+    return Policy(name, policy.get("stack_prefixes", []), policy_args)
+
+
+def load_policies(
+    path: str,
+    args: argparse.Namespace,
+    args_parser: Callable[[List[str]], argparse.Namespace],
+) -> List[Policy]:
+    """Read the policies in a --policies file"""
+    with open(path, encoding="utf-8") as policies_file:
+        policies = json.load(policies_file).get("policies", [])
+
+    if not policies:
+        raise ValueError(f"{path} does not declare any policies")
+
+    parsed = [parse_policy(policy, args, args_parser) for policy in policies]
+    names = [policy.name for policy in parsed]
+    if len(set(names)) != len(names):
+        raise ValueError(f"{path} declares more than one policy with the same name")
+
+    return parsed
+
+
+def partition_stacks(
+    policies: List[Policy], stacks: Iterable[Stack]
+) -> Dict[str, List[Stack]]:
+    """Assign each stack to the first policy that applies to it
+
+    Stacks no policy applies to are left out, so are never deleted.
+    """
+    partitions: Dict[str, List[Stack]] = {policy.name: [] for policy in policies}
+    for stack in stacks:
+        for policy in policies:
+            if policy.matches(stack):
+                partitions[policy.name].append(stack)
+                break
+
+    return partitions
+
+
+def sweep_policies(
+    policies: List[Policy], stacks: Iterable[Stack]
+) -> List[PolicyResult]:
+    """Sweep each policy's stacks, from a single inventory"""
+    results = []
+    partitions = partition_stacks(policies, stacks)
+    for policy in policies:
+        log(f"Sweeping policy {policy.name}")
+        # strategies compare against the time they were created, so they're built per sweep
+        strategy: BaseStrategy = get_strategy_from_args(policy.args)
+        results.append(
+            PolicyResult(policy, sweep(policy.args, strategy, partitions[policy.name]))
+        )
+
+    return results
+
+
+def log_policy_results(results: List[PolicyResult]):
+    """Report the outcome of every policy together"""
+    for policy_result in results:
+        result = policy_result.result
+        log(
+            f"Policy {policy_result.policy.name}: {len(result.selected)} stacks "
+            f"(of {result.stacks}) selected, {len(result.failed)} failed"
+        )
+
+    log(
+        f"{sum(len(policy_result.result.selected) for policy_result in results)} stacks "
+        f"(of {sum(policy_result.result.stacks for policy_result in results)}) selected "
+        f"across {len(results)} policies"
+    )
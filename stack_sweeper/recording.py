@@ -0,0 +1,186 @@
+import json
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Pattern, Tuple
+from urllib.parse import unquote_plus
+
+import botocore  # type: ignore
+from botocore.awsrequest import AWSResponse  # type: ignore
+
+from .file_utils import atomic_write
+
+RECORDING_VERSION = 1
+
+# account IDs are replaced, so recordings can be shared and replayed anywhere
+ACCOUNT_ID_PATTERN = re.compile(r"(?<!\d)\d{12}(?!\d)")
+SCRUBBED_ACCOUNT_ID = "123456789012"
+
+
+class ReplayError(Exception):
+    """Raised when a replayed client makes a call that wasn't recorded"""
+
+
+class RecordedCall(NamedTuple):
+    """A scrubbed API call, and the response it got"""
+
+    operation: str
+    request: str  # the URL-decoded request body
+    status_code: int
+    body: str  # the raw response body
+    latency: float  # seconds, from making the call to its response being parsed
+
+
+def request_text(body: Any) -> str:
+    """A request body as (URL-decoded) text"""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+
+    return unquote_plus(body or "")
+
+
+class Scrubber:
+    """Replaces account IDs (and any other patterns) in recorded requests and responses"""
+
+    patterns: List[Tuple[Pattern, str]]
+
+    def __init__(self, patterns: Optional[List[Tuple[str, str]]] = None):
+        self.patterns = [(ACCOUNT_ID_PATTERN, SCRUBBED_ACCOUNT_ID)] + [
+            (re.compile(pattern), replacement)
+            for pattern, replacement in patterns or []
+        ]
+
+    def scrub(self, text: str) -> str:
+        """Replace every pattern in the text"""
+        for pattern, replacement in self.patterns:
+            text = pattern.sub(replacement, text)
+
+        return text
+
+
+class Recorder:
+    """Records the calls made by botocore clients, scrubbed, with how long each took
+
+    Calls are recorded from botocore's event hooks, so nothing about how the clients are
+    used changes. Recorders are shared by every thread using the clients.
+    """
+
+    scrubber: Scrubber
+    calls: List[RecordedCall]
+
+    def __init__(self, scrubber: Optional[Scrubber] = None):
+        self.scrubber = scrubber or Scrubber()
+        self.calls = []
+        self.__lock = threading.Lock()
+        self.__sending = (
+            threading.local()
+        )  # each thread's request, while it's in flight
+
+    def attach(self, client):
+        """Record every call the client makes"""
+        client.meta.events.register("before-call", self.__before_call)
+        client.meta.events.register("before-send", self.__before_send)
+        client.meta.events.register("after-call", self.__after_call)
+
+        return client
+
+    def __before_call(self, context: Dict[str, Any], **_):
+        context["recording_started_at"] = time.perf_counter()
+
+    def __before_send(self, request, **_):
+        self.__sending.body = request.body
+
+    def __after_call(self, http_response, model, context: Dict[str, Any], **_):
+        latency = time.perf_counter() - context["recording_started_at"]
+        call = RecordedCall(
+            model.name,
+            self.scrubber.scrub(request_text(getattr(self.__sending, "body", None))),
+            http_response.status_code,
+            self.scrubber.scrub(http_response.content.decode("utf-8")),
+            latency,
+        )
+        with self.__lock:
+            self.calls.append(call)
+
+    def save(self, path: str):
+        """Save the recorded calls, in the order they were made"""
+        with self.__lock:
+            calls = [call._asdict() for call in self.calls]
+
+        with atomic_write(path) as recording_file:
+            json.dump({"version": RECORDING_VERSION, "calls": calls}, recording_file)
+
+
+def load_recording(path: str) -> List[RecordedCall]:
+    """Load the calls saved by Recorder.save"""
+    with open(path, encoding="utf-8") as recording_file:
+        recording = json.load(recording_file)
+
+    if recording.get("version") != RECORDING_VERSION:
+        raise ValueError(f"{path} is not a version {RECORDING_VERSION} recording")
+
+    return [RecordedCall(**call) for call in recording["calls"]]
+
+
+class RecordedBody:
+    """A raw HTTP response body that streams a recorded body"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **_):
+        """Stream the body"""
+        yield self.body
+
+
+class Replayer:
+    """Serves recorded responses to botocore clients, instead of sending their requests
+
+    Each distinct request is answered with its recorded responses in the order they were
+    recorded (e.g. a stack's status while it's deleted), repeating the last response once
+    they run out. Each response is delayed by its recorded latency, times latency_scale.
+    Requests aren't signed, so no credentials are needed.
+    """
+
+    latency_scale: float
+
+    def __init__(self, calls: List[RecordedCall], latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+        self.__responses: Dict[Tuple[str, str], Deque[RecordedCall]] = defaultdict(
+            deque
+        )
+        for call in calls:
+            self.__responses[(call.operation, call.request)].append(call)
+
+        self.__lock = threading.Lock()
+
+    def attach(self, client):
+        """Replay recorded responses to every call the client makes"""
+        client.meta.events.register("choose-signer", self.__choose_signer)
+        client.meta.events.register("before-send", self.__before_send)
+
+        return client
+
+    def __choose_signer(self, **_):
+        return botocore.UNSIGNED
+
+    def __before_send(self, request, event_name: str, **_) -> AWSResponse:
+        operation = event_name.rsplit(".", 1)[-1]
+        key = (operation, request_text(request.body))
+        with self.__lock:
+            responses = self.__responses.get(key)
+            if not responses:
+                raise ReplayError(f"No {operation} call was recorded for: {key[1]}")
+
+            call = responses.popleft() if len(responses) > 1 else responses[0]
+
+        if self.latency_scale:
+            time.sleep(call.latency * self.latency_scale)
+
+        return AWSResponse(
+            request.url,
+            call.status_code,
+            {"Content-Type": "text/xml"},
+            RecordedBody(call.body.encode("utf-8")),
+        )
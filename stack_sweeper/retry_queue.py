@@ -0,0 +1,90 @@
+import heapq
+import itertools
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from .cloudformation import Stack
+
+DEFAULT_RETRY_DELAY = 30
+MAX_RETRY_DELAY = 300
+
+
+class Retry(NamedTuple):
+    """A stack deletion to retry"""
+
+    stack: Stack
+    attempt: int
+    retain_resources: Optional[List[str]]
+
+
+class RetryQueue:
+    """Schedules failed stack deletions to be retried, with exponential backoff
+
+    If retain_failed_resources is set, the final attempt retains the resources that keep
+    failing to delete, so the rest of the stack can still be removed.
+    """
+
+    retries: int
+    delay: float
+    retain_failed_resources: bool
+
+    def __init__(
+        self,
+        retries: int,
+        delay: float = DEFAULT_RETRY_DELAY,
+        retain_failed_resources: bool = False,
+    ):
+        self.retries = retries
+        self.delay = delay
+        self.retain_failed_resources = retain_failed_resources
+        self.__queue: List[Tuple[float, int, Retry]] = []
+        self.__counter = (
+            itertools.count()
+        )  # breaks ties between retries due at the same time
+
+    def __len__(self) -> int:
+        return len(self.__queue)
+
+    def schedule(self, stack: Stack, attempt: int, failed_resources: List[str]) -> bool:
+        """Schedule the next attempt at deleting a stack, returning False if it's out of attempts"""
+        if attempt > self.retries:
+            return False
+
+        retain_resources = None
+        if self.retain_failed_resources and attempt == self.retries:
+            retain_resources = failed_resources or None
+
+        delay = min(self.delay * 2 ** (attempt - 1), MAX_RETRY_DELAY)
+        heapq.heappush(
+            self.__queue,
+            (
+                time.monotonic() + delay,
+                next(self.__counter),
+                Retry(stack, attempt + 1, retain_resources),
+            ),
+        )
+
+        return True
+
+    def pop_due(self) -> List[Retry]:
+        """Remove and return every retry that is due"""
+        now = time.monotonic()
+        due = []
+        while self.__queue and self.__queue[0][0] <= now:
+            due.append(heapq.heappop(self.__queue)[2])
+
+        return due
+
+    def pop_all(self) -> List[Retry]:
+        """Remove and return every retry, whether or not it's due"""
+        retries = [retry for _, _, retry in sorted(self.__queue)]
+        self.__queue = []
+
+        return retries
+
+    def seconds_until_due(self) -> Optional[float]:
+        """The number of seconds until the next retry is due, or None if nothing is queued"""
+        if not self.__queue:
+            return None
+
+        return max(self.__queue[0][0] - time.monotonic(), 0)
@@ -0,0 +1,33 @@
+import hashlib
+from typing import NamedTuple
+
+
+class Shard(NamedTuple):
+    """One of `total` hash partitions of an account's stacks, numbered from 1"""
+
+    number: int
+    total: int
+
+    def includes(self, stack_id: str) -> bool:
+        """Does this shard own the stack?
+
+        Stack IDs are hashed with a stable hash, so every node agrees on which shard owns
+        each stack without coordinating.
+        """
+        digest = hashlib.sha256(stack_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.total == self.number - 1
+
+    def __str__(self):
+        return f"{self.number}/{self.total}"
+
+
+def parse_shard(value: str) -> Shard:
+    """Parse a shard in the form i/n, e.g. 2/4"""
+    number, _, total = value.partition("/")
+    shard = Shard(int(number), int(total))
+    if not 1 <= shard.number <= shard.total:
+        raise ValueError(
+            f"{value} is not a shard between 1/{shard.total} and {total}/{total}"
+        )
+
+    return shard
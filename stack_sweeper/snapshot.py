@@ -0,0 +1,301 @@
+import mmap
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, MutableMapping, Optional
+
+from .cloudformation import Stack
+from .file_utils import atomic_write
+
+SNAPSHOT_MAGIC = b"SSWS"
+SNAPSHOT_VERSION = 1
+
+# the fields of a stack's detail a snapshot keeps
+SNAPSHOT_FIELDS = (
+    "StackId",
+    "StackName",
+    "StackStatus",
+    "CreationTime",
+    "LastUpdatedTime",
+    "Tags",
+)
+
+# each column's name and array type code, in the order they're written
+COLUMNS = (
+    ("created_at", "q"),  # microseconds since the epoch
+    ("last_updated_at", "q"),
+    ("stack_ids", "I"),  # indexes into the string table
+    ("names", "I"),
+    ("statuses", "I"),
+    ("tag_offsets", "I"),  # each stack's tags are tag_offsets[i] to tag_offsets[i + 1]
+    ("tag_keys", "I"),
+    ("tag_values", "I"),
+    (
+        "string_offsets",
+        "I",
+    ),  # each string is string_offsets[i] to string_offsets[i + 1]
+    ("strings", "B"),  # every distinct string, UTF-8 encoded
+)
+
+# magic, version, byte order, stack count, tag count, string count, then each column's offset
+HEADER = struct.Struct(f"<4sHc1xIII{len(COLUMNS)}Q")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class SnapshotError(Exception):
+    """Raised when a file isn't a snapshot this version can read"""
+
+
+def to_microseconds(value: datetime) -> int:
+    """Microseconds since the epoch, treating naive times as UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return (value - EPOCH) // MICROSECOND
+
+
+def write_snapshot(path: str, stacks: Iterable[Stack]):
+    """Write stacks to a columnar snapshot, that Snapshot can read without parsing each stack
+
+    Times are fixed-width columns, and names, statuses and tags are indexes into a table of
+    distinct strings, so the many stacks sharing tag keys and values store each only once.
+    """
+    strings: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    columns = {name: array(type_code) for name, type_code in COLUMNS}
+    columns["tag_offsets"].append(0)
+    for stack in stacks:
+        columns["created_at"].append(to_microseconds(stack.created_at))
+        columns["last_updated_at"].append(to_microseconds(stack.last_updated_at))
+        columns["stack_ids"].append(intern(stack.stack_id))
+        columns["names"].append(intern(stack.name))
+        columns["statuses"].append(intern(stack.stack_status))
+        for tag in stack.tag_list:
+            columns["tag_keys"].append(intern(tag["Key"]))
+            columns["tag_values"].append(intern(tag["Value"]))
+        columns["tag_offsets"].append(len(columns["tag_keys"]))
+
+    columns["string_offsets"].append(0)
+    for value in strings:  # in the order they were interned
+        encoded = value.encode("utf-8")
+        columns["strings"].extend(encoded)
+        columns["string_offsets"].append(len(columns["strings"]))
+
+    # each column starts 8-byte aligned
+    offsets = []
+    offset = HEADER.size
+    for name, _ in COLUMNS:
+        offset += -offset % 8
+        offsets.append(offset)
+        offset += len(columns[name]) * columns[name].itemsize
+
+    with atomic_write(path, binary=True) as snapshot_file:
+        snapshot_file.write(
+            HEADER.pack(
+                SNAPSHOT_MAGIC,
+                SNAPSHOT_VERSION,
+                sys.byteorder[0].encode("ascii"),
+                len(columns["created_at"]),
+                len(columns["tag_keys"]),
+                len(strings),
+                *offsets,
+            )
+        )
+        for (name, _), column_offset in zip(COLUMNS, offsets):
+            snapshot_file.write(b"\0" * (column_offset - snapshot_file.tell()))
+            columns[name].tofile(snapshot_file)
+
+
+class Snapshot:
+    """A memory-mapped snapshot written by write_snapshot
+
+    Opening a snapshot only reads its header, and each stack's fields are read from the
+    columns (and strings decoded) when they're first used. The snapshot must be kept open
+    while its stacks are used.
+    """
+
+    path: str
+    stack_count: int
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__columns: Dict[str, memoryview] = {}
+        with open(path, "rb") as snapshot_file:
+            try:
+                self.__mmap = mmap.mmap(
+                    snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError as e:  # an empty file
+                raise SnapshotError(f"{path} is not a snapshot") from e
+
+        view = memoryview(self.__mmap)
+        try:
+            self.__map_columns(view)
+        except Exception:
+            view.release()
+            self.close()
+            raise
+
+        view.release()
+
+    def __map_columns(self, view: memoryview):
+        """Check the header, and view each column as an array"""
+        try:
+            (
+                magic,
+                version,
+                byte_order,
+                self.stack_count,
+                tag_count,
+                string_count,
+                *offsets,
+            ) = HEADER.unpack_from(view)
+        except struct.error as e:
+            raise SnapshotError(f"{self.path} is not a snapshot") from e
+
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise SnapshotError(
+                f"{self.path} is not a version {SNAPSHOT_VERSION} snapshot"
+            )
+
+        if byte_order != sys.byteorder[0].encode("ascii"):
+            raise SnapshotError(f"{self.path} was written with another byte order")
+
+        lengths = {
+            "created_at": self.stack_count,
+            "last_updated_at": self.stack_count,
+            "stack_ids": self.stack_count,
+            "names": self.stack_count,
+            "statuses": self.stack_count,
+            "tag_offsets": self.stack_count + 1,
+            "tag_keys": tag_count,
+            "tag_values": tag_count,
+            "string_offsets": string_count + 1,
+        }
+        for (name, type_code), offset in zip(COLUMNS, offsets):
+            item_size = array(type_code).itemsize
+            length = lengths.get(name)
+            if length is None:  # the strings run to the end of the file
+                length = len(view) - offset
+
+            if offset + length * item_size > len(view):
+                raise SnapshotError(f"{self.path} is truncated")
+
+            self.__columns[name] = view[offset : offset + length * item_size].cast(
+                type_code
+            )
+
+        self.__strings: List[Optional[str]] = [None] * string_count
+
+    def __len__(self) -> int:
+        return self.stack_count
+
+    def __iter__(self) -> Iterator["SnapshotDetail"]:
+        return (SnapshotDetail(self, index) for index in range(self.stack_count))
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def string(self, index: int) -> str:
+        """A string from the string table, decoded the first time it's needed"""
+        value = self.__strings[index]
+        if value is None:
+            offsets = self.__columns["string_offsets"]
+            value = self.__strings[index] = str(
+                self.__columns["strings"][offsets[index] : offsets[index + 1]],
+                "utf-8",
+            )
+
+        return value
+
+    def field(self, index: int, key: str) -> Any:
+        """A field of a stack's detail, in describe_stacks form"""
+        columns = self.__columns
+        if key == "StackId":
+            return self.string(columns["stack_ids"][index])
+
+        if key == "StackName":
+            return self.string(columns["names"][index])
+
+        if key == "StackStatus":
+            return self.string(columns["statuses"][index])
+
+        if key == "CreationTime":
+            return EPOCH + columns["created_at"][index] * MICROSECOND
+
+        if key == "LastUpdatedTime":
+            return EPOCH + columns["last_updated_at"][index] * MICROSECOND
+
+        if key == "Tags":
+            keys = columns["tag_keys"]
+            values = columns["tag_values"]
+            return [
+                {"Key": self.string(keys[tag]), "Value": self.string(values[tag])}
+                for tag in range(
+                    columns["tag_offsets"][index], columns["tag_offsets"][index + 1]
+                )
+            ]
+
+        raise KeyError(key)
+
+    def close(self):
+        """Unmap the snapshot, after which its stacks can't be read"""
+        for column in self.__columns.values():
+            column.release()
+
+        self.__columns = {}
+        self.__mmap.close()
+
+
+class SnapshotDetail(MutableMapping[str, Any]):
+    """A stack's detail, read from a snapshot as each field is used
+
+    Fields that are set (e.g. a stack's status, once it's deleted) are kept alongside, so the
+    snapshot itself is never written to.
+    """
+
+    snapshot: Snapshot
+    index: int
+    changes: Dict[str, Any]
+
+    def __init__(self, snapshot: Snapshot, index: int):
+        self.snapshot = snapshot
+        self.index = index
+        self.changes = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.changes:
+            return self.changes[key]
+
+        value = self.snapshot.field(self.index, key)
+        if key == "Tags":  # kept, rather than rebuilt for every tag looked up
+            self.changes[key] = value
+
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.changes[key] = value
+
+    def __delitem__(self, key: str):
+        if key in SNAPSHOT_FIELDS:
+            raise KeyError(f"{key} can not be removed from a snapshot")
+
+        del self.changes[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.changes or key in SNAPSHOT_FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(dict.fromkeys([*SNAPSHOT_FIELDS, *self.changes]))
+
+    def __len__(self) -> int:
+        return len(dict.fromkeys([*SNAPSHOT_FIELDS, *self.changes]))
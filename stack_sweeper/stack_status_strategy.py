@@ -0,0 +1,35 @@
+from typing import TYPE_CHECKING, List, Optional, Set
+
+from .base_strategy import BaseStrategy
+from .cloudformation import Stack
+from .decision import Decision
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .inventory import Inventory
+
+
+class StackStatusStrategy(BaseStrategy):
+    """A strategy that uses the stack's status (e.g. ROLLBACK_COMPLETE) to determine if it should be removed"""
+
+    stack_statuses: List[str]
+
+    def __init__(self, stack_statuses: List[str]):
+        self.stack_statuses = stack_statuses
+
+    def evaluate(self, stack: Stack) -> Decision:
+        """Decide if this stack should be removed"""
+        if stack.stack_status not in self.stack_statuses:
+            return Decision(stack, False)
+
+        return Decision(stack, True, (f"status is {stack.stack_status}",))
+
+    def candidates(self, inventory: "Inventory") -> Optional[Set[str]]:
+        """Only stacks in one of the statuses can be removed"""
+        return {
+            stack.stack_id
+            for stack in inventory
+            if stack.stack_status in self.stack_statuses
+        }
+
+    def __str__(self):
+        return f"StackStatusStrategy([{', '.join(self.stack_statuses)}])"
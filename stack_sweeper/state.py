@@ -0,0 +1,284 @@
+import argparse
+import base64
+import binascii
+import json
+import logging
+import os
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .cloudformation import Stack
+from .file_utils import atomic_write
+from .inventory import Inventory
+from .log_utils import log
+from .sweeper import SweepResult
+
+STATE_VERSION = 1
+SSM_PARAMETER_DESCRIPTION = "stack-sweeper inventory state"
+SSM_PARAMETER_TIER = "Intelligent-Tiering"  # moves to the advanced tier once over 4KB
+SSM_PARAMETER_MAX_SIZE = 8192  # the advanced tier's limit
+SSM_MAX_CHUNKS = 50  # larger state is split across this many parameters at most
+SSM_CHUNKED_PREFIX = "chunks:"  # never starts encoded state, which is base64
+
+
+class StateTooLargeError(Exception):
+    """Raised when state is too large to save in its backend"""
+
+
+class SweepState(NamedTuple):
+    """What a sweep needs to carry over to the next, possibly stateless, run"""
+
+    stacks: List[Dict[str, Any]]  # stack details, as they were last described
+    deleting: List[str]  # the IDs of stacks whose deletions were left in progress
+
+
+def encode_state(state: SweepState) -> str:
+    """Serialise state as compressed JSON, small enough to fit in an SSM parameter"""
+    payload = json.dumps(
+        {"version": STATE_VERSION, **state._asdict()}, separators=(",", ":")
+    )
+
+    return base64.b64encode(zlib.compress(payload.encode("utf-8"), 9)).decode("ascii")
+
+
+def decode_state(value: str) -> Optional[SweepState]:
+    """Deserialise state, returning None if it was saved by an incompatible version or can't
+    be decoded
+    """
+    try:
+        payload = json.loads(zlib.decompress(base64.b64decode(value)))
+    except (binascii.Error, zlib.error, ValueError) as e:
+        log(f"Ignoring the saved state, it can't be decoded: {e}", logging.WARNING)
+        return None
+
+    if not isinstance(payload, dict) or payload.get("version") != STATE_VERSION:
+        return None
+
+    return SweepState(payload["stacks"], payload["deleting"])
+
+
+def state_checksum(value: str) -> str:
+    """A checksum of encoded state, to tell whether its chunks were all saved together"""
+    return f"{zlib.crc32(value.encode('ascii')):08x}"
+
+
+def stack_detail(stack: Stack) -> Dict[str, Any]:
+    """The parts of a stack's detail that strategies need, in describe_stacks form"""
+    return {
+        "StackId": stack.stack_id,
+        "StackName": stack.name,
+        "StackStatus": stack.stack_status,
+        "CreationTime": stack.created_at.isoformat(),
+        "LastUpdatedTime": stack.last_updated_at.isoformat(),
+        "Tags": stack.tag_list
+        or [{"Key": key, "Value": value} for key, value in stack.tags.items()],
+    }
+
+
+def parse_stack_detail(detail: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a saved stack detail back to describe_stacks form"""
+    return {
+        **detail,
+        "CreationTime": datetime.fromisoformat(detail["CreationTime"]),
+        "LastUpdatedTime": datetime.fromisoformat(detail["LastUpdatedTime"]),
+    }
+
+
+class StateBackend(ABC):
+    """Somewhere to keep sweep state between runs"""
+
+    @abstractmethod
+    def load(self) -> Optional[str]:
+        """Load the saved state, or None if there isn't any"""
+
+    @abstractmethod
+    def save(self, value: str):
+        """Save state, replacing anything saved before"""
+
+
+class FileStateBackend(StateBackend):
+    """Sweep state kept in a local file"""
+
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[str]:
+        """Load the saved state, or None if there isn't any"""
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path, encoding="utf-8") as state_file:
+            return state_file.read()
+
+    def save(self, value: str):
+        """Save state, replacing anything saved before"""
+        with atomic_write(self.path) as state_file:
+            state_file.write(value)
+
+
+class SsmStateBackend(StateBackend):
+    """Sweep state kept in SSM parameters, for runners without a persistent disk
+
+    State that doesn't fit in one parameter is split across numbered parameters alongside
+    it (e.g. /stack-sweeper/state-0 and /stack-sweeper/state-1), and the parameter itself
+    holds how many there are, and a checksum of the whole state. It's written last, and
+    chunks that don't match its checksum (e.g. read while another run was saving) are
+    ignored rather than loaded.
+    """
+
+    ssm: Any
+    name: str
+
+    def __init__(self, ssm, name: str):
+        self.ssm = ssm
+        self.name = name
+
+    def chunk_name(self, index: int) -> str:
+        """The name of the parameter holding one chunk of the state"""
+        return f"{self.name}-{index}"
+
+    def load(self) -> Optional[str]:
+        """Load the saved state, or None if there isn't any"""
+        try:
+            response = self.ssm.get_parameter(Name=self.name, WithDecryption=True)
+        except self.ssm.exceptions.ParameterNotFound:
+            return None
+
+        value = response["Parameter"]["Value"]
+        if value.startswith(SSM_CHUNKED_PREFIX):
+            return self.__load_chunks(value[len(SSM_CHUNKED_PREFIX) :])
+
+        return value
+
+    def __load_chunks(self, manifest: str) -> Optional[str]:
+        count, _, checksum = manifest.partition(":")
+        if not count.isdigit() or not checksum:
+            log(f"Ignoring the saved state, {self.name} is not a list of chunks")
+            return None
+
+        names = [self.chunk_name(index) for index in range(int(count))]
+        chunks: Dict[str, str] = {}
+        for start in range(0, len(names), 10):  # get_parameters takes at most 10
+            response = self.ssm.get_parameters(
+                Names=names[start : start + 10], WithDecryption=True
+            )
+            for parameter in response["Parameters"]:
+                chunks[parameter["Name"]] = parameter["Value"]
+
+        missing = [name for name in names if name not in chunks]
+        value = "".join(chunks.get(name, "") for name in names)
+        if missing:
+            log(f"Ignoring the saved state, {', '.join(missing)} are missing")
+        elif state_checksum(value) != checksum:
+            log(
+                "Ignoring the saved state, its chunks weren't all saved together (it may "
+                "have been saved while it was loaded)"
+            )
+        else:
+            return value
+
+        return None
+
+    def save(self, value: str):
+        """Save state, replacing anything saved before"""
+        if len(value) <= SSM_PARAMETER_MAX_SIZE:
+            self.__put(self.name, value)
+            return
+
+        chunks = [
+            value[start : start + SSM_PARAMETER_MAX_SIZE]
+            for start in range(0, len(value), SSM_PARAMETER_MAX_SIZE)
+        ]
+        if len(chunks) > SSM_MAX_CHUNKS:
+            raise StateTooLargeError(
+                f"The state is {len(value)} bytes, more than {SSM_MAX_CHUNKS} SSM parameters "
+                "can hold, keep --state in a file instead"
+            )
+
+        for index, chunk in enumerate(chunks):
+            self.__put(self.chunk_name(index), chunk)
+
+        # written last, so the state isn't loaded until every chunk is saved, and its
+        # checksum identifies which save the chunks must all come from
+        self.__put(
+            self.name, f"{SSM_CHUNKED_PREFIX}{len(chunks)}:{state_checksum(value)}"
+        )
+
+    def __put(self, name: str, value: str):
+        self.ssm.put_parameter(
+            Name=name,
+            Description=SSM_PARAMETER_DESCRIPTION,
+            Value=value,
+            Type="SecureString",
+            Overwrite=True,
+            Tier=SSM_PARAMETER_TIER,
+        )
+
+
+def get_state_backend(value: str, region_name: Optional[str] = None) -> StateBackend:
+    """Create a state backend, from either ssm:<parameter-name> or a local file path"""
+    if value.startswith("ssm:"):
+        from .clients import get_client  # pylint: disable=import-outside-toplevel
+
+        return SsmStateBackend(get_client("ssm", region_name), value[len("ssm:") :])
+
+    return FileStateBackend(value)
+
+
+def restore_state(backend: StateBackend, inventory: Inventory) -> Optional[SweepState]:
+    """Restore the inventory from saved state, returning None if there was none to restore"""
+    value = backend.load()
+    state = decode_state(value) if value else None
+    if state:
+        inventory.restore([parse_stack_detail(detail) for detail in state.stacks])
+
+    return state
+
+
+def report_deletions(state: SweepState, inventory: Inventory) -> List[Stack]:
+    """Report how the deletions left in progress by the last run went, once the inventory has
+    been refreshed, returning the stacks whose deletions failed
+
+    Stacks that are still being deleted are waited on by the sweep, like any other stack
+    being deleted.
+    """
+    if not state.deleting:
+        return []
+
+    stacks = [inventory.get(stack_id) for stack_id in state.deleting]
+    completed = sum(1 for stack in stacks if not stack)  # deleted stacks aren't listed
+    failed = [
+        stack for stack in stacks if stack and stack.stack_status == "DELETE_FAILED"
+    ]
+    log(
+        f"{completed} of the {len(stacks)} deletions left in progress by the last run "
+        "have completed"
+    )
+    for stack in failed:
+        log(f"Deleting stack {stack.name} failed since the last run", logging.ERROR)
+
+    return failed
+
+
+def save_state(
+    backend: StateBackend,
+    inventory: Inventory,
+    args: argparse.Namespace,
+    result: SweepResult,
+):
+    """Save the inventory, and any deletions this sweep left in progress"""
+    deleting = []
+    if args.delete and not args.wait:
+        failed = {stack.stack_id for stack in result.failed}
+        deleting = [
+            decision.stack.stack_id
+            for decision in result.selected
+            if decision.stack.stack_id not in failed
+        ]
+
+    state = SweepState([stack_detail(stack) for stack in inventory], deleting)
+    backend.save(encode_state(state))
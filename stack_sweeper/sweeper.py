@@ -0,0 +1,244 @@
+import argparse
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .base_strategy import BaseStrategy
+from .cloudformation import IN_PROGRESS_STACK_STATUSES, Stack, StackDeletionError
+from .decision import Decision
+from .evaluation import evaluate_stacks
+from .inventory import Inventory
+from .log_utils import log
+from .retry_queue import RetryQueue
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .leases import StackLeases
+
+
+class SweepResult(NamedTuple):
+    """The outcome of a single sweep"""
+
+    stacks: int
+    selected: List[Decision]
+    failed: List[Stack]
+    deleting: List[Stack]  # stacks that were already being deleted
+
+
+def empty_stack_resources(args: argparse.Namespace, stack: Stack):
+    """Empty the buckets and repositories that failed the stack's last deletion
+
+    Only resources that failed to delete are emptied, so resources the stack retains (e.g.
+    with a DeletionPolicy of Retain) are never touched.
+    """
+    # pylint: disable=import-outside-toplevel
+    from botocore.exceptions import BotoCoreError, ClientError  # type: ignore
+
+    from .cleaner import (
+        DEFAULT_CONCURRENCY,
+        BucketNotEmptiedError,
+        empty_blocking_resources,
+    )
+    from .clients import get_client
+
+    concurrency = args.workers * DEFAULT_CONCURRENCY
+    try:
+        empty_blocking_resources(
+            stack,
+            get_client("s3", args.region, concurrency),
+            get_client("ecr", args.region, concurrency),
+            logical_resource_ids=stack.failed_resources,
+        )
+    except (BucketNotEmptiedError, BotoCoreError, ClientError) as e:
+        # the stack's deletion is still attempted, as it may not need these resources emptied
+        log(f"Could not empty resources in stack {stack.name}: {e}", logging.WARNING)
+
+
+def delete_stack(
+    args: argparse.Namespace,
+    stack: Stack,
+    retain_resources: Optional[List[str]] = None,
+):
+    """Delete a stack, disabling termination protection and emptying its resources first if requested"""
+    if args.disable_termination_protection and stack.termination_protection:
+        log(f"Disabling termination protection on stack {stack.name}")
+        stack.disable_termination_protection()
+
+    if args.empty_resources and stack.failed_resources:
+        empty_stack_resources(args, stack)
+
+    if retain_resources:
+        log(
+            f"Retaining {', '.join(retain_resources)} while deleting stack {stack.name}"
+        )
+
+    stack.delete(args.wait, retain_resources)
+
+
+def get_stack_leases(args: argparse.Namespace) -> Optional["StackLeases"]:
+    """Get the leases for this sweeper's deletions, if a --lease-store is configured"""
+    if not args.lease_store:
+        return None
+
+    # pylint: disable=import-outside-toplevel
+    from .leases import OWNER, StackLeases, get_lease_store
+
+    return StackLeases(
+        get_lease_store(args.lease_store, args.region), OWNER, args.lease_seconds
+    )
+
+
+def delete_leased_stack(
+    args: argparse.Namespace,
+    leases: Optional["StackLeases"],
+    stack: Stack,
+    retain_resources: Optional[List[str]] = None,
+) -> bool:
+    """Delete a stack while holding its lease, returning False if another sweeper holds it
+
+    The lease is taken just before the deletion starts, and renewed while it's waited on.
+    """
+    if not leases:
+        delete_stack(args, stack, retain_resources)
+        return True
+
+    with leases.held(stack) as leased:
+        if leased:
+            delete_stack(args, stack, retain_resources)
+
+        return leased
+
+
+def finish_deletion(
+    future: Future,
+    stack: Stack,
+    attempt: int,
+    retry_queue: RetryQueue,
+    failed: List[Stack],
+) -> bool:
+    """Record the outcome of a stack's deletion, returning False if it will be retried"""
+    try:
+        future.result()
+    except StackDeletionError as e:
+        log(str(e), logging.ERROR)
+        if retry_queue.schedule(stack, attempt, e.failed_resources):
+            return False
+
+        failed.append(stack)
+    except Exception as e:  # pylint: disable=broad-except
+        log(str(e), logging.ERROR)
+        failed.append(stack)
+
+    return True
+
+
+def delete_stacks(
+    args: argparse.Namespace,
+    stacks: List[Stack],
+    deleting: Optional[List[Stack]] = None,
+) -> List[Stack]:
+    """Delete stacks, up to --workers at a time, returning the stacks that failed to delete
+
+    Stacks that are already being deleted (e.g. by an earlier --no-wait run) are waited on,
+    rather than deleted again. Stacks that end up in DELETE_FAILED are retried with backoff
+    alongside the other deletions, rather than waiting for the next sweep.
+
+    With a --lease-store, stacks are only deleted once leased, so sweepers sharing an
+    account never delete the same stack. Each lease is kept until its stack is deleted or
+    out of retries.
+    """
+    leases = get_stack_leases(args)
+    retry_queue = RetryQueue(
+        args.delete_retries, args.retry_delay, args.retain_failed_resources
+    )
+    failed: List[Stack] = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures: Dict[Future, Tuple[Stack, int]] = {
+            executor.submit(delete_leased_stack, args, leases, stack): (stack, 1)
+            for stack in stacks
+        }
+        for stack in deleting or []:
+            futures[executor.submit(stack.wait_for_deletion)] = (stack, 1)
+
+        while futures or retry_queue:
+            for retry in retry_queue.pop_due():
+                log(
+                    f"Retrying deletion of stack {retry.stack.name} (attempt {retry.attempt})"
+                )
+                future = executor.submit(
+                    delete_leased_stack,
+                    args,
+                    leases,
+                    retry.stack,
+                    retry.retain_resources,
+                )
+                futures[future] = (retry.stack, retry.attempt)
+
+            if not futures:
+                time.sleep(retry_queue.seconds_until_due() or 0)
+                continue
+
+            done, _ = wait(
+                futures,
+                timeout=retry_queue.seconds_until_due(),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                stack, attempt = futures.pop(future)
+                if (
+                    finish_deletion(future, stack, attempt, retry_queue, failed)
+                    and leases
+                ):
+                    leases.release(stack)
+
+    return failed
+
+
+def sweep(
+    args: argparse.Namespace, strategy: BaseStrategy, stacks: Iterable[Stack]
+) -> SweepResult:
+    """Evaluate stacks against a strategy, and delete the selected stacks if requested
+
+    When sweeping an inventory, stacks the strategy can rule out using the inventory's
+    indexes aren't evaluated at all.
+    """
+    candidate_ids = None
+    if isinstance(stacks, Inventory):
+        candidate_ids = strategy.candidates(stacks)
+
+    # stacks already being deleted skip the strategy, and go straight to being waited on
+    stack_count = 0
+    candidates: List[Stack] = []
+    deleting: List[Stack] = []
+    for stack in stacks:
+        stack_count += 1
+        if stack.stack_status in IN_PROGRESS_STACK_STATUSES:
+            deleting.append(stack)
+        elif candidate_ids is None or stack.stack_id in candidate_ids:
+            candidates.append(stack)
+
+    if deleting:
+        log(f"{len(deleting)} stacks are already being deleted")
+
+    selected = [
+        decision
+        for decision in evaluate_stacks(strategy, candidates)
+        if decision.remove
+    ]
+
+    log(f"{len(selected)} stacks (of {stack_count}) identified for removal")
+    for decision in selected:
+        log(
+            f"{decision.stack.name} selected for removal: {', '.join(decision.reasons)}",
+            logging.DEBUG,
+        )
+
+    failed: List[Stack] = []
+    if args.delete:
+        failed = delete_stacks(
+            args,
+            [decision.stack for decision in selected],
+            deleting if args.wait else None,
+        )
+
+    return SweepResult(stack_count, selected, failed, deleting)
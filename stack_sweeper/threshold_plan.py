@@ -0,0 +1,65 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional
+
+from .base_strategy import BaseStrategy
+from .cloudformation import IN_PROGRESS_STACK_STATUSES, Stack
+from .evaluation import evaluate_stacks
+from .inventory import Inventory
+from .log_utils import log
+
+
+class ThresholdPlan(NamedTuple):
+    """The stacks a --stack-update-age threshold would select"""
+
+    days: int
+    stacks: List[Stack]
+
+
+def plan_thresholds(
+    inventory: Inventory,
+    thresholds: List[int],
+    exclusion: BaseStrategy,
+    compare_time: Optional[datetime] = None,
+) -> List[ThresholdPlan]:
+    """Work out which stacks each threshold (in days) would select, after exclusions
+
+    The smallest threshold selects a superset of every other threshold, so the exclusions
+    are only evaluated once, against the stacks it selects. Each threshold is then a prefix
+    of those stacks (oldest first), found by bisecting their last update times.
+    """
+    if not compare_time:
+        compare_time = datetime.now(tz=timezone.utc)
+
+    thresholds = sorted(set(thresholds))
+    widest_cutoff = compare_time - timedelta(days=thresholds[0])
+    widest = [
+        stack
+        for stack in inventory.updated_before(widest_cutoff)
+        if stack.stack_status not in IN_PROGRESS_STACK_STATUSES
+    ]
+    included = [
+        decision.stack
+        for decision in evaluate_stacks(exclusion, widest)
+        if decision.remove
+    ]
+    included_updated_at = [stack.last_updated_at for stack in included]
+
+    plans = []
+    for days in thresholds:
+        cutoff = compare_time - timedelta(days=days)
+        plans.append(
+            ThresholdPlan(days, included[: bisect_right(included_updated_at, cutoff)])
+        )
+
+    return plans
+
+
+def log_threshold_plans(plans: List[ThresholdPlan]):
+    """Report the stacks each threshold would select"""
+    for plan in plans:
+        log(f"--stack-update-age {plan.days} would select {len(plan.stacks)} stacks")
+        for stack in plan.stacks:
+            log(
+                f"  {stack.name} (last updated: {stack.last_updated_at.strftime('%Y-%m-%d')})"
+            )
@@ -0,0 +1,143 @@
+"""Timing checks for the optimisations the unit tests only check the behaviour of
+
+Wall-clock comparisons are flaky on shared or slow machines, so they're kept out of the unit
+suite. Run them from the repository root with:
+
+    python -m tests.benchmarks
+
+Each benchmark prints its timings, and the run fails if any is slower than expected.
+"""
+import gc
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Callable, List, Tuple
+
+from stack_sweeper import clients, fast_parsing, snapshot, state
+
+from .test_clients import StandInRequestHandler, delete_stacks
+from .test_fast_parsing import large_payload, output_shape, parse_default
+from .test_import_time import import_times
+from .test_snapshot import make_stacks
+
+# generous, to avoid flakiness on slow machines; importing boto3 alone costs more than this
+CLI_IMPORT_BUDGET_MICROSECONDS = 250_000
+
+
+def best_of(function: Callable[[], object], repeat: int = 3) -> float:
+    """The fastest of several runs of a function, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+
+    return min(timings)
+
+
+def benchmark_import_time() -> Tuple[bool, str]:
+    """Importing the CLI and the Lambda handler should stay within the cold start budget"""
+    cli = import_times("import stack_sweeper.cli")["stack_sweeper.cli"]
+    handler = import_times("import stack_sweeper.lambda_handler")[
+        "stack_sweeper.lambda_handler"
+    ]
+
+    return (
+        max(cli, handler) < CLI_IMPORT_BUDGET_MICROSECONDS,
+        f"cli {cli / 1000:.1f}ms, lambda_handler {handler / 1000:.1f}ms "
+        f"(budget {CLI_IMPORT_BUDGET_MICROSECONDS / 1000:.0f}ms)",
+    )
+
+
+def benchmark_delete_throughput() -> Tuple[bool, str]:
+    """16 workers should delete stacks in well under half the time of one"""
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        serial = best_of(lambda: delete_stacks(endpoint_url, 1, 32), repeat=1)
+        parallel = best_of(lambda: delete_stacks(endpoint_url, 16, 32), repeat=1)
+    finally:
+        server.shutdown()
+        server.server_close()
+        clients.clear_clients()
+
+    return (
+        parallel < serial / 2,
+        f"32 deletes: serial {serial:.2f}s, 16 workers {parallel:.2f}s",
+    )
+
+
+def benchmark_fast_parsing() -> Tuple[bool, str]:
+    """The summary parser should parse a large page in well under botocore's time"""
+    body = large_payload(100)
+    shape = output_shape()
+    default = best_of(lambda: parse_default(body, shape))
+    fast = best_of(lambda: fast_parsing.parse_describe_stacks(body))
+
+    return (
+        fast < default / 2,
+        f"300 stacks: botocore {default * 1000:.1f}ms, fast {fast * 1000:.1f}ms",
+    )
+
+
+def benchmark_snapshot() -> Tuple[bool, str]:
+    """Restoring from a snapshot should take well under the time of decoding saved state"""
+    stacks = make_stacks(20_000)
+    value = state.encode_state(
+        state.SweepState([state.stack_detail(stack) for stack in stacks], [])
+    )
+
+    # restoring an inventory reads every stack's ID, but nothing else
+    def from_state() -> List[str]:
+        saved = state.decode_state(value)
+        return [
+            state.parse_stack_detail(detail)["StackId"]
+            for detail in saved.stacks  # type: ignore
+        ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "inventory.snapshot")
+        snapshot.write_snapshot(path, stacks)
+
+        def from_snapshot() -> List[str]:
+            with snapshot.Snapshot(path) as loaded:
+                return [detail["StackId"] for detail in loaded]
+
+        gc.disable()  # so neither is charged for collecting the stacks above
+        try:
+            decoded = best_of(from_state)
+            mapped = best_of(from_snapshot)
+        finally:
+            gc.enable()
+
+    return (
+        mapped < decoded / 2,
+        f"20,000 stacks: state {decoded * 1000:.1f}ms, snapshot {mapped * 1000:.1f}ms",
+    )
+
+
+def main() -> int:
+    """Run every benchmark, returning a non-zero exit code if any was too slow"""
+    failed = 0
+    for name, benchmark in [
+        ("import time", benchmark_import_time),
+        ("delete throughput", benchmark_delete_throughput),
+        ("fast parsing", benchmark_fast_parsing),
+        ("snapshot", benchmark_snapshot),
+    ]:
+        passed, summary = benchmark()
+        failed += not passed
+        print(f"{'ok' if passed else 'SLOW':4} {name}: {summary}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,12 +3,13 @@ import time
 from collections import namedtuple
 from datetime import datetime
 from itertools import cycle
+from typing import Optional, Set
 
 import boto3  # type: ignore
 import pytest  # type: ignore
 from botocore.stub import Stubber  # type: ignore
 
-from stack_sweeper import base_strategy, cloudformation
+from stack_sweeper import base_strategy, cloudformation, decision
 
 # prevent boto from looking for IAM creds via metadata while running tests
 os.environ["AWS_EC2_METADATA_DISABLED"] = "true"
@@ -59,6 +60,32 @@ class AlternatingTrueStrategy(base_strategy.BaseStrategy):
         return next(self.iterator)
 
 
+class ReasonedStrategy(base_strategy.BaseStrategy):
+    """An always-true strategy that explains itself"""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+    # pylint: disable=redefined-outer-name
+    def evaluate(self, stack: cloudformation.Stack) -> decision.Decision:
+        """The stack should always be removed, for a reason"""
+        return decision.Decision(stack, True, (self.reason,))
+
+    def __str__(self):
+        return f"ReasonedStrategy({self.reason})"
+
+
+class CandidateStrategy(AlwaysTrueStrategy):
+    """An always-true strategy that can only remove some stacks"""
+
+    def __init__(self, stack_ids: Set[str]):
+        self.stack_ids = stack_ids
+
+    def candidates(self, inventory) -> Optional[Set[str]]:
+        """Only the given stacks could be removed"""
+        return self.stack_ids
+
+
 @pytest.fixture
 def fake_cloudformation_client() -> StubbedClient:  # type: ignore
     """Creates a stubbed boto3 CloudFormation client"""
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from botocore.stub import ANY
 
@@ -30,6 +30,23 @@ def stub_get_parameter_value(
     )
 
 
+def stub_get_parameters_values(
+    stubber, values: Dict[str, str], names: Optional[List[str]] = None
+):
+    """Stubs an SSM get_parameters response, for the named parameters that have values"""
+    response = {
+        "Parameters": [
+            {"Name": name, "Type": "SecureString", "Value": value, "Version": 1}
+            for name, value in values.items()
+        ]
+    }
+    stubber.add_response(
+        "get_parameters",
+        response,
+        expected_params={"Names": names or list(values), "WithDecryption": True},
+    )
+
+
 def stub_get_parameter_unset(stubber, name: str):
     """Stubs SSM get_parameter_value responses where the parameter is unset"""
     stubber.add_client_error(
@@ -41,24 +58,30 @@ def stub_get_parameter_unset(stubber, name: str):
     )
 
 
-def stub_put_parameter_value(
-    stubber, name: str, description: str, value: str, version: int = 1
+def stub_put_parameter_value(  # pylint: disable=too-many-arguments
+    stubber,
+    name: str,
+    description: str,
+    value: str,
+    version: int = 1,
+    *,
+    tier: Optional[str] = None,
 ):
     """Stubs SSM put_parameter_value responses"""
     response = {
         "Version": version,
     }
-    stubber.add_response(
-        "put_parameter",
-        response,
-        expected_params={
-            "Name": name,
-            "Description": description,
-            "Value": value,
-            "Type": "SecureString",
-            "Overwrite": True,
-        },
-    )
+    expected_params = {
+        "Name": name,
+        "Description": description,
+        "Value": value,
+        "Type": "SecureString",
+        "Overwrite": True,
+    }
+    if tier:
+        expected_params["Tier"] = tier
+
+    stubber.add_response("put_parameter", response, expected_params=expected_params)
 
 
 def stub_add_tags_to_resource(stubber, name: str, tags: List[Dict]):
@@ -115,12 +138,18 @@ def stub_update_termination_protection(
     )
 
 
-def stub_delete_stack(stubber, stack_name: str):
+def stub_delete_stack(
+    stubber, stack_name: str, retain_resources: Optional[List[str]] = None
+):
     """Stubs CloudFormation delete_stack responses"""
+    expected_params: Dict = {"StackName": stack_name}
+    if retain_resources:
+        expected_params["RetainResources"] = retain_resources
+
     stubber.add_response(
         "delete_stack",
         {},
-        expected_params={"StackName": stack_name},
+        expected_params=expected_params,
     )
 
 
@@ -167,6 +196,38 @@ def stub_describe_stack_events(stubber, stack_id: str):
     )
 
 
+def stub_describe_stack_delete_failed_events(
+    stubber, stack_id: str, failed_resources: List[str]
+):
+    """Stubs CloudFormation describe_stack_events responses for a failed deletion"""
+    stack_name = stack_id.split("/")[1]
+
+    def event(logical_resource_id: str, status: str) -> Dict:
+        return {
+            "StackId": stack_id,
+            "EventId": str(uuid.uuid4()),
+            "StackName": stack_name,
+            "LogicalResourceId": logical_resource_id,
+            "Timestamp": datetime(2020, 1, 1),
+            "ResourceStatus": status,
+        }
+
+    # newest first, with a failure from an earlier deletion that should be ignored
+    response = {
+        "StackEvents": [event(stack_name, "DELETE_FAILED")]
+        + [event(resource, "DELETE_FAILED") for resource in failed_resources]
+        + [
+            event(stack_name, "DELETE_IN_PROGRESS"),
+            event("EarlierFailure", "DELETE_FAILED"),
+        ]
+    }
+    stubber.add_response(
+        "describe_stack_events",
+        response,
+        expected_params={"StackName": stack_id},
+    )
+
+
 def stub_describe_stack_resources(stubber, stack_id: str, resources=Dict[str, str]):
     """Stubs CloudFormation describe_stack_resources responses"""
     stack_name = stack_id.split("/")[1]
@@ -191,3 +252,116 @@ def stub_describe_stack_resources(stubber, stack_id: str, resources=Dict[str, st
         response,
         expected_params={"StackName": stack_id},
     )
+
+
+def generate_stack_detail(
+    stack_name: str,
+    tags: Optional[Dict[str, str]] = None,
+    last_updated_at: datetime = datetime(2020, 1, 1),
+    status: str = "CREATE_COMPLETE",
+) -> Dict:
+    """Generates a describe_stacks stack detail"""
+    return {
+        "StackName": stack_name,
+        "StackId": f"arn:aws:cloudformation:ap-southeast-2:123456789012:stack/{stack_name}"
+        "/bd6129c0-de8c-11e9-9c70-0ac26335768c",
+        "StackStatus": status,
+        "CreationTime": datetime(2020, 1, 1),
+        "LastUpdatedTime": last_updated_at,
+        "Tags": [{"Key": key, "Value": value} for key, value in (tags or {}).items()],
+    }
+
+
+def stub_describe_stack_detail(stubber, stack_detail: Dict):
+    """Stubs CloudFormation describe_stacks responses for a specific stack's full detail"""
+    stubber.add_response(
+        "describe_stacks",
+        {"Stacks": [stack_detail]},
+        expected_params={"StackName": stack_detail["StackId"]},
+    )
+
+
+def stub_describe_stack_missing(stubber, stack_id: str):
+    """Stubs CloudFormation describe_stacks responses for a stack that no longer exists"""
+    stubber.add_client_error(
+        "describe_stacks",
+        "ValidationError",
+        f"Stack with id {stack_id} does not exist",
+        400,
+        expected_params={"StackName": stack_id},
+    )
+
+
+def stub_list_stacks(
+    stubber, stack_details: List[Dict], stack_statuses: Optional[List[str]] = None
+):
+    """Stubs CloudFormation list_stacks responses, summarising the given stack details"""
+    summary_keys = [
+        "StackId",
+        "StackName",
+        "CreationTime",
+        "LastUpdatedTime",
+        "StackStatus",
+        "ParentId",
+    ]
+    response = {
+        "StackSummaries": [
+            {key: detail[key] for key in summary_keys if key in detail}
+            for detail in stack_details
+        ]
+    }
+    stubber.add_response(
+        "list_stacks",
+        response,
+        expected_params={"StackStatusFilter": stack_statuses or ANY},
+    )
+
+
+def stub_list_object_versions(
+    stubber,
+    bucket: str,
+    versions: List[Dict[str, str]],
+    delete_markers: Optional[List[Dict[str, str]]] = None,
+):
+    """Stubs S3 list_object_versions responses"""
+    response = {
+        "IsTruncated": False,
+        "Versions": versions,
+        "DeleteMarkers": delete_markers or [],
+    }
+    stubber.add_response(
+        "list_object_versions", response, expected_params={"Bucket": bucket}
+    )
+
+
+def stub_delete_objects(
+    stubber, bucket: str, objects: List[Dict[str, str]], errors: Optional[List] = None
+):
+    """Stubs S3 delete_objects responses"""
+    response = {"Errors": errors} if errors else {}
+    stubber.add_response(
+        "delete_objects",
+        response,
+        expected_params={
+            "Bucket": bucket,
+            "Delete": {"Objects": objects, "Quiet": True},
+        },
+    )
+
+
+def stub_list_images(stubber, repository: str, image_ids: List[Dict[str, str]]):
+    """Stubs ECR list_images responses"""
+    stubber.add_response(
+        "list_images",
+        {"imageIds": image_ids} if image_ids else {},
+        expected_params={"repositoryName": repository},
+    )
+
+
+def stub_batch_delete_image(stubber, repository: str, image_ids: List[Dict[str, str]]):
+    """Stubs ECR batch_delete_image responses"""
+    stubber.add_response(
+        "batch_delete_image",
+        {"imageIds": image_ids, "failures": []},
+        expected_params={"repositoryName": repository, "imageIds": image_ids},
+    )
@@ -0,0 +1,146 @@
+# pylint:disable=redefined-outer-name
+import threading
+import time
+
+import boto3  # type: ignore
+import pytest
+from botocore.stub import Stubber  # type: ignore
+
+from stack_sweeper import cleaner, cloudformation
+
+from . import stubs
+from .conftest import STACK_ID, StubbedClient
+
+
+@pytest.fixture
+def fake_s3_client() -> StubbedClient:  # type: ignore
+    """Creates a stubbed boto3 S3 client"""
+    s3_client = boto3.client("s3")
+    with Stubber(s3_client) as stubbed_client:
+        yield StubbedClient(stubbed_client, s3_client)
+        stubbed_client.assert_no_pending_responses()
+
+
+@pytest.fixture
+def fake_ecr_client() -> StubbedClient:  # type: ignore
+    """Creates a stubbed boto3 ECR client"""
+    ecr_client = boto3.client("ecr")
+    with Stubber(ecr_client) as stubbed_client:
+        yield StubbedClient(stubbed_client, ecr_client)
+        stubbed_client.assert_no_pending_responses()
+
+
+def test_batches():
+    """Tests cleaner.batches()"""
+    assert list(cleaner.batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert not list(cleaner.batches([], 2))
+
+
+def test_delete_in_batches_bounded():
+    """Tests cleaner.delete_in_batches() never has more than concurrency calls in flight"""
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def delete(batch):
+        with lock:
+            in_flight.append(batch)
+            peak.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(batch)
+        return len(batch)
+
+    assert cleaner.delete_in_batches(delete, range(2500), 100, concurrency=3) == 2500
+    assert max(peak) <= 3
+
+
+def test_empty_bucket(fake_s3_client: StubbedClient):
+    """Tests cleaner.empty_bucket() deletes all versions and delete markers in batches"""
+    versions = [{"Key": f"key-{index}", "VersionId": "null"} for index in range(1001)]
+    markers = [{"Key": "deleted", "VersionId": "marker-1"}]
+    stubs.stub_list_object_versions(fake_s3_client.stub, "bucket", versions, markers)
+    stubs.stub_delete_objects(fake_s3_client.stub, "bucket", versions[:1000])
+    stubs.stub_delete_objects(fake_s3_client.stub, "bucket", versions[1000:] + markers)
+
+    # concurrency of 1 keeps the stubbed calls in order
+    assert cleaner.empty_bucket(fake_s3_client.client, "bucket", 1) == 1002
+
+
+def test_empty_bucket_errors(fake_s3_client: StubbedClient):
+    """Tests cleaner.empty_bucket() raises when objects can't be deleted"""
+    versions = [{"Key": "key", "VersionId": "null"}]
+    stubs.stub_list_object_versions(fake_s3_client.stub, "bucket", versions)
+    stubs.stub_delete_objects(
+        fake_s3_client.stub,
+        "bucket",
+        versions,
+        [{"Key": "key", "Code": "AccessDenied", "Message": "Access Denied"}],
+    )
+
+    with pytest.raises(
+        cleaner.BucketNotEmptiedError, match="Could not empty bucket bucket"
+    ):
+        cleaner.empty_bucket(fake_s3_client.client, "bucket")
+
+
+def test_empty_repository(fake_ecr_client: StubbedClient):
+    """Tests cleaner.empty_repository() deletes all images in batches"""
+    image_ids = [{"imageDigest": f"sha256:{index}"} for index in range(150)]
+    stubs.stub_list_images(fake_ecr_client.stub, "repository", image_ids)
+    stubs.stub_batch_delete_image(fake_ecr_client.stub, "repository", image_ids[:100])
+    stubs.stub_batch_delete_image(fake_ecr_client.stub, "repository", image_ids[100:])
+
+    assert cleaner.empty_repository(fake_ecr_client.client, "repository", 1) == 150
+
+
+def test_empty_blocking_resources(
+    fake_cloudformation_client: StubbedClient,
+    fake_s3_client: StubbedClient,
+    fake_ecr_client: StubbedClient,
+    stack: cloudformation.Stack,
+):
+    """Tests cleaner.empty_blocking_resources() only empties buckets and repositories"""
+    stubs.stub_describe_stack_resources(
+        fake_cloudformation_client.stub,
+        STACK_ID,
+        {
+            "Bucket": "AWS::S3::Bucket",
+            "Repository": "AWS::ECR::Repository",
+            "Role": "AWS::IAM::Role",
+        },
+    )
+    stubs.stub_list_object_versions(fake_s3_client.stub, "Bucket-PHYSICAL-1234", [])
+    stubs.stub_list_images(fake_ecr_client.stub, "Repository-PHYSICAL-1234", [])
+
+    cleaner.empty_blocking_resources(
+        stack, fake_s3_client.client, fake_ecr_client.client
+    )
+
+
+def test_empty_blocking_resources_failed_only(
+    fake_cloudformation_client: StubbedClient,
+    fake_s3_client: StubbedClient,
+    stack: cloudformation.Stack,
+):
+    """Tests cleaner.empty_blocking_resources() only empties the resources asked for"""
+    stubs.stub_describe_stack_resources(
+        fake_cloudformation_client.stub,
+        STACK_ID,
+        {"Failed": "AWS::S3::Bucket", "Retained": "AWS::S3::Bucket"},
+    )
+    stubs.stub_list_object_versions(fake_s3_client.stub, "Failed-PHYSICAL-1234", [])
+
+    cleaner.empty_blocking_resources(
+        stack, fake_s3_client.client, None, logical_resource_ids=["Failed"]
+    )
+
+
+def test_empty_blocking_resources_none(
+    fake_cloudformation_client: StubbedClient, stack: cloudformation.Stack
+):
+    """Tests cleaner.empty_blocking_resources() with no blocking resources"""
+    stubs.stub_describe_stack_resources(
+        fake_cloudformation_client.stub, STACK_ID, {"Role": "AWS::IAM::Role"}
+    )
+    cleaner.empty_blocking_resources(stack, None, None)
@@ -4,15 +4,17 @@ from datetime import timedelta
 
 import pytest
 
-from stack_sweeper import cli
+from stack_sweeper import cli, options
 
 
 @pytest.fixture
 def base_namespace() -> Namespace:
     """A pytest fixture that provides an empty Namespace object"""
     return Namespace(
+        strategy=None,
         expiry_tag=None,
         stack_update_age=None,
+        stack_statuses=[],
         exclude_tag=[],
         exclude_stacks=[],
         exclude_stack_prefixes=[],
@@ -99,20 +101,21 @@ def test_parse_args_required_params():
 def test_get_strategy_from_args_empty(base_namespace: Namespace):
     """Tests get_strategy_from_args() on an empty args"""
     # Test an empty one is basically empty
-    strategy = cli.get_strategy_from_args(base_namespace)
-    assert isinstance(strategy, cli.NestedAllStrategy)
+    strategy = options.get_strategy_from_args(base_namespace)
+    assert isinstance(strategy, options.NestedAllStrategy)
     assert len(strategy.nested_strategies) == 1
-    assert isinstance(strategy.nested_strategies[0], cli.NestedAnyStrategy)
+    assert isinstance(strategy.nested_strategies[0], options.NestedAnyStrategy)
     assert not strategy.nested_strategies[0].nested_strategies
 
 
 def test_get_strategy_from_args_expiry_tag(base_namespace: Namespace):
     """Tests get_strategy_from_args() with an expiry tag"""
     base_namespace.expiry_tag = "expiry"
-    strategy = cli.get_strategy_from_args(base_namespace)
+    strategy = options.get_strategy_from_args(base_namespace)
     assert len(strategy.nested_strategies[0].nested_strategies) == 1
     assert isinstance(
-        strategy.nested_strategies[0].nested_strategies[0], cli.ExpirationTagStrategy
+        strategy.nested_strategies[0].nested_strategies[0],
+        options.ExpirationTagStrategy,
     )
     assert strategy.nested_strategies[0].nested_strategies[0].tag_name == "expiry"
 
@@ -120,10 +123,10 @@ def test_get_strategy_from_args_expiry_tag(base_namespace: Namespace):
 def test_get_strategy_from_args_stack_update_age(base_namespace: Namespace):
     """Tests get_strategy_from_args() with a stack update age"""
     base_namespace.stack_update_age = 90
-    strategy = cli.get_strategy_from_args(base_namespace)
+    strategy = options.get_strategy_from_args(base_namespace)
     assert len(strategy.nested_strategies[0].nested_strategies) == 1
     assert isinstance(
-        strategy.nested_strategies[0].nested_strategies[0], cli.LastUpdatedStrategy
+        strategy.nested_strategies[0].nested_strategies[0], options.LastUpdatedStrategy
     )
     assert strategy.nested_strategies[0].nested_strategies[
         0
@@ -133,8 +136,8 @@ def test_get_strategy_from_args_stack_update_age(base_namespace: Namespace):
 def test_get_strategy_from_args_exclude_tag(base_namespace: Namespace):
     """Tests get_strategy_from_args() with an exclude tag"""
     base_namespace.exclude_tag = "exclude"
-    strategy = cli.get_strategy_from_args(base_namespace)
-    assert isinstance(strategy.nested_strategies[1], cli.ExcludeTagStrategy)
+    strategy = options.get_strategy_from_args(base_namespace)
+    assert isinstance(strategy.nested_strategies[1], options.ExcludeTagStrategy)
     assert strategy.nested_strategies[1].tag_name == "exclude"
 
 
@@ -142,8 +145,8 @@ def test_get_strategy_from_args_exclude_stack_name(base_namespace: Namespace):
     """Tests get_strategy_from_args() with an exclude stack names"""
     base_namespace.exclude_stacks = ["stack-one", "stack-two"]
     base_namespace.exclude_stack_prefixes = ["prefixone", "prefixtwo"]
-    strategy = cli.get_strategy_from_args(base_namespace)
-    assert isinstance(strategy.nested_strategies[1], cli.ExcludeNamesStrategy)
+    strategy = options.get_strategy_from_args(base_namespace)
+    assert isinstance(strategy.nested_strategies[1], options.ExcludeNamesStrategy)
     assert strategy.nested_strategies[1].exclude_names == ["stack-one", "stack-two"]
     assert strategy.nested_strategies[1].exclude_name_prefixes == [
         "prefixone",
@@ -154,7 +157,353 @@ def test_get_strategy_from_args_exclude_stack_name(base_namespace: Namespace):
 def test_get_strategy_from_args_limit(base_namespace: Namespace):
     """Tests get_strategy_from_args() with a limit set"""
     base_namespace.limit = 10
-    strategy = cli.get_strategy_from_args(base_namespace)
-    assert isinstance(strategy, cli.LimitedStrategy)
+    strategy = options.get_strategy_from_args(base_namespace)
+    assert isinstance(strategy, options.LimitedStrategy)
     assert strategy.limit == 10
-    assert isinstance(strategy.nested_strategy, cli.NestedAllStrategy)
+    assert isinstance(strategy.nested_strategy, options.NestedAllStrategy)
+
+
+def test_parse_args_daemon():
+    """Tests parse_args() daemon options"""
+    namespace = cli.parse_args(["--expiry-tag", "expiry"])
+    assert not namespace.daemon
+    assert namespace.interval == 900
+    assert namespace.health_port == 8080
+
+    namespace = cli.parse_args(
+        [
+            "--expiry-tag",
+            "expiry",
+            "--daemon",
+            "--interval",
+            "60",
+            "--health-port",
+            "9000",
+        ]
+    )
+    assert namespace.daemon
+    assert namespace.interval == 60
+    assert namespace.health_port == 9000
+
+    with pytest.raises(SystemExit):
+        cli.parse_args(["--expiry-tag", "expiry", "--daemon", "--interval", "0"])
+
+
+def test_parse_args_events():
+    """Tests parse_args() event options"""
+    namespace = cli.parse_args(["--expiry-tag", "expiry", "--events", "-"])
+    assert namespace.events == "-"
+
+    with pytest.raises(SystemExit):
+        cli.parse_args(["--expiry-tag", "expiry", "--events", "-", "--daemon"])
+
+
+def test_parse_args_schedule():
+    """Tests parse_args() schedule options"""
+    namespace = cli.parse_args(["--expiry-tag", "expiry"])
+    assert not namespace.schedule
+
+    namespace = cli.parse_args(["--expiry-tag", "expiry", "--schedule"])
+    assert namespace.schedule
+
+    with pytest.raises(SystemExit):
+        cli.parse_args(["--expiry-tag", "expiry", "--schedule", "--daemon"])
+
+
+def test_parse_args_sharding():
+    """Tests parse_args() sharding options"""
+    namespace = cli.parse_args(["--expiry-tag", "expiry"])
+    assert not namespace.shard
+    assert not namespace.lease_store
+    assert namespace.lease_seconds == 3600
+
+    namespace = cli.parse_args(
+        [
+            "--expiry-tag",
+            "expiry",
+            "--delete",
+            "--shard",
+            "2/4",
+            "--lease-store",
+            "dynamodb://leases",
+        ]
+    )
+    assert (namespace.shard.number, namespace.shard.total) == (2, 4)
+    assert namespace.lease_store == "dynamodb://leases"
+
+    for args in [
+        ["--shard", "5/4"],
+        ["--shard", "two"],
+        ["--lease-store", "dynamodb://leases"],
+        ["--delete", "--lease-seconds", "0"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(["--expiry-tag", "expiry"] + args)
+
+
+def test_parse_args_empty_resources():
+    """Tests parse_args() --empty-resources"""
+    namespace = cli.parse_args(
+        ["--expiry-tag", "expiry", "--delete", "--empty-resources"]
+    )
+    assert namespace.empty_resources
+
+    for args in [
+        ["--empty-resources"],
+        ["--delete", "--empty-resources", "--no-wait"],
+        ["--delete", "--empty-resources", "--delete-retries", "0"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(["--expiry-tag", "expiry"] + args)
+
+
+def test_parse_args_delete_retries():
+    """Tests parse_args() retry options"""
+    namespace = cli.parse_args(["--expiry-tag", "expiry"])
+    assert namespace.delete_retries == 2
+    assert namespace.retry_delay == 30
+    assert not namespace.retain_failed_resources
+
+    namespace = cli.parse_args(
+        ["--expiry-tag", "expiry", "--delete", "--retain-failed-resources"]
+    )
+    assert namespace.retain_failed_resources
+
+    # retaining resources needs to wait for deletions, and retry them
+    for args in [
+        ["--retain-failed-resources"],
+        ["--delete", "--no-wait", "--retain-failed-resources"],
+        ["--delete", "--delete-retries", "0", "--retain-failed-resources"],
+        ["--delete-retries", "-1"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(["--expiry-tag", "expiry"] + args)
+
+
+def test_parse_args_plan_thresholds():
+    """Tests parse_args() --plan-thresholds"""
+    namespace = cli.parse_args(["--plan-thresholds", "30,60,90,180"])
+    assert namespace.plan_thresholds == [30, 60, 90, 180]
+
+    for args in [
+        ["--plan-thresholds", "thirty"],
+        ["--plan-thresholds", ","],
+        ["--plan-thresholds", "-1"],
+        ["--plan-thresholds", "30", "--delete"],
+        ["--plan-thresholds", "30", "--daemon"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(args)
+
+
+def test_get_exclusion_strategies_from_args(base_namespace: Namespace):
+    """Tests get_exclusion_strategies_from_args()"""
+    assert not options.get_exclusion_strategies_from_args(base_namespace)
+
+    base_namespace.exclude_tag = "exclude"
+    base_namespace.exclude_stacks = ["stack-one"]
+    strategies = options.get_exclusion_strategies_from_args(base_namespace)
+    assert isinstance(strategies[0], options.ExcludeTagStrategy)
+    assert isinstance(strategies[1], options.ExcludeNamesStrategy)
+
+
+def test_parse_args_plan_and_apply():
+    """Tests parse_args() --plan-out and --apply"""
+    namespace = cli.parse_args(["--expiry-tag", "expiry", "--plan-out", "plan.json"])
+    assert namespace.plan_out == "plan.json"
+    assert not namespace.apply
+
+    namespace = cli.parse_args(["--apply", "plan.json", "--delete", "--workers", "4"])
+    assert namespace.apply == "plan.json"
+
+    # the plan selects the stacks to delete, so nothing else can
+    for args in [
+        ["--expiry-tag", "expiry", "--plan-out", "plan.json", "--delete"],
+        ["--apply", "plan.json", "--expiry-tag", "expiry"],
+        ["--apply", "plan.json", "--limit", "5"],
+        ["--apply", "plan.json", "--daemon"],
+        ["--apply", "plan.json", "--no-wait"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(args)
+
+
+def test_parse_args_policies():
+    """Tests parse_args() --policies"""
+    namespace = cli.parse_args(["--policies", "policies.json", "--delete"])
+    assert namespace.policies == "policies.json"
+
+    # each policy has its own strategy and deletion options
+    for args in [
+        ["--expiry-tag", "expiry"],
+        ["--delete", "--empty-resources"],
+        ["--daemon"],
+        ["--plan-thresholds", "30"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(["--policies", "policies.json"] + args)
+
+
+def test_parse_args_strategy():
+    """Tests parse_args() --strategy"""
+    namespace = cli.parse_args(["--strategy", 'updated_before(30d) or has_tag("x")'])
+    assert namespace.strategy.text == 'updated_before(30d) or has_tag("x")'
+
+    for args in [
+        ["--strategy", "updated_before(30)"],
+        ["--strategy", "updated_before(30d)", "--stack-update-age", "30"],
+        ["--strategy", "updated_before(30d)", "--schedule"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(args)
+
+
+def test_get_strategy_from_args_strategy(base_namespace: Namespace):
+    """Tests get_strategy_from_args() with a strategy expression"""
+    base_namespace.strategy = cli.parse_expression("updated_before(30d)")
+    base_namespace.exclude_tag = "exclude"
+    strategy = options.get_strategy_from_args(base_namespace)
+    assert isinstance(strategy.nested_strategies[0], options.ExpressionStrategy)
+    assert isinstance(strategy.nested_strategies[1], options.ExcludeTagStrategy)
+
+
+def test_parse_args_explain():
+    """Tests parse_args() --explain"""
+    assert not cli.parse_args(["--expiry-tag", "expiry"]).explain
+    assert cli.parse_args(["--expiry-tag", "expiry", "--explain"]).explain
+
+    for args in [
+        ["--expiry-tag", "expiry", "--explain", "--daemon"],
+        ["--plan-thresholds", "30", "--explain"],
+        ["--apply", "plan.json", "--explain"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(args)
+
+
+def test_parse_args_stack_statuses():
+    """Tests parse_args() --stack-statuses"""
+    namespace = cli.parse_args(
+        ["--stack-statuses", "ROLLBACK_COMPLETE", "CREATE_FAILED"]
+    )
+    assert namespace.stack_statuses == ["ROLLBACK_COMPLETE", "CREATE_FAILED"]
+
+    for args in [
+        ["--stack-statuses", "NOT_A_STATUS"],
+        ["--stack-statuses", "ROLLBACK_COMPLETE", "--schedule"],
+        ["--stack-statuses", "ROLLBACK_COMPLETE", "--strategy", "updated_before(1d)"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(args)
+
+
+def test_get_inventory_statuses(base_namespace: Namespace):
+    """Tests get_inventory_statuses() only limits the inventory when statuses drive the selection"""
+    assert cli.get_inventory_statuses(base_namespace) is None
+
+    base_namespace.stack_statuses = ["ROLLBACK_COMPLETE"]
+    assert cli.get_inventory_statuses(base_namespace) == [
+        "DELETE_IN_PROGRESS",
+        "ROLLBACK_COMPLETE",
+    ]
+    assert isinstance(
+        options.get_strategy_from_args(base_namespace)
+        .nested_strategies[0]
+        .nested_strategies[0],
+        options.StackStatusStrategy,
+    )
+
+    # stacks in other statuses could still be selected by their age
+    base_namespace.stack_update_age = 90
+    assert cli.get_inventory_statuses(base_namespace) is None
+
+
+def test_parse_args_prefetch_pages():
+    """Tests parse_args() --prefetch-pages"""
+    assert cli.parse_args(["--expiry-tag", "expiry"]).prefetch_pages == 0
+    assert (
+        cli.parse_args(
+            ["--expiry-tag", "expiry", "--prefetch-pages", "4"]
+        ).prefetch_pages
+        == 4
+    )
+
+    with pytest.raises(SystemExit):
+        cli.parse_args(["--expiry-tag", "expiry", "--prefetch-pages", "-1"])
+
+
+def test_parse_args_snapshots():
+    """Tests parse_args() --snapshot and --snapshot-out"""
+    args = cli.parse_args(
+        [
+            "--expiry-tag",
+            "expiry",
+            "--snapshot",
+            "old.snapshot",
+            "--snapshot-out",
+            "new",
+        ]
+    )
+    assert args.snapshot == "old.snapshot"
+    assert args.snapshot_out == "new"
+
+    for invalid in [
+        ["--expiry-tag", "expiry", "--snapshot", "inventory.snapshot", "--delete"],
+        ["--expiry-tag", "expiry", "--snapshot", "inventory.snapshot", "--daemon"],
+        ["--expiry-tag", "expiry", "--snapshot", "inventory.snapshot", "--state", "s"],
+        ["--plan-thresholds", "30", "--snapshot-out", "inventory.snapshot"],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(invalid)
+
+
+def test_parse_args_recording():
+    """Tests parse_args() --record and --replay"""
+    args = cli.parse_args(["--expiry-tag", "expiry", "--replay", "recording.json"])
+    assert args.replay == "recording.json"
+    assert args.replay_latency_scale == 1
+
+    for invalid in [
+        ["--expiry-tag", "expiry", "--record", "recording.json", "--delete"],
+        ["--expiry-tag", "expiry", "--record", "a.json", "--replay", "b.json"],
+        ["--expiry-tag", "expiry", "--replay", "recording.json", "--daemon"],
+        [
+            "--expiry-tag",
+            "expiry",
+            "--replay",
+            "a.json",
+            "--replay-latency-scale",
+            "-1",
+        ],
+    ]:
+        with pytest.raises(SystemExit):
+            cli.parse_args(invalid)
+
+
+def test_get_inventory_tag_keys():
+    """Tests get_inventory_tag_keys()"""
+    args = cli.parse_args(
+        ["--expiry-tag", "expiry", "--exclude-tag", "keep", "--fast-inventory"]
+    )
+    assert args.fast_inventory
+    assert cli.get_inventory_tag_keys(args) == {"expiry", "keep"}
+
+    # expressions can test any tag, and plans keep every tag
+    assert (
+        cli.get_inventory_tag_keys(cli.parse_args(["--strategy", 'has_tag("owner")']))
+        is None
+    )
+    assert (
+        cli.get_inventory_tag_keys(
+            cli.parse_args(["--expiry-tag", "expiry", "--plan-out", "plan.json"])
+        )
+        is None
+    )
+    assert (
+        cli.get_inventory_tag_keys(
+            cli.parse_args(
+                ["--expiry-tag", "expiry", "--snapshot-out", "stacks.snapshot"]
+            )
+        )
+        is None
+    )
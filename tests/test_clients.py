@@ -0,0 +1,130 @@
+# pylint:disable=redefined-outer-name
+import logging
+import threading
+import time
+from argparse import Namespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+from stack_sweeper import clients, cloudformation, sweeper
+
+# how long the stand-in endpoint takes to respond to each request
+REQUEST_LATENCY_SECONDS = 0.05
+
+DELETE_STACK_RESPONSE = (
+    b'<DeleteStackResponse xmlns="http://cloudformation.amazonaws.com/doc/2010-05-15/">'
+    b"<ResponseMetadata><RequestId>1234</RequestId></ResponseMetadata>"
+    b"</DeleteStackResponse>"
+)
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    """A slow stand-in CloudFormation endpoint, that only knows how to DeleteStack
+
+    It records the most requests it had in flight at once.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep connections alive, like the real endpoint
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Respond to a DeleteStack request"""
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with self.lock:
+            StandInRequestHandler.in_flight += 1
+            StandInRequestHandler.max_in_flight = max(
+                StandInRequestHandler.max_in_flight, StandInRequestHandler.in_flight
+            )
+
+        time.sleep(REQUEST_LATENCY_SECONDS)
+        with self.lock:
+            StandInRequestHandler.in_flight -= 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(DELETE_STACK_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(DELETE_STACK_RESPONSE)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Don't log requests"""
+
+
+@pytest.fixture
+def endpoint_url(monkeypatch) -> Iterator[str]:
+    """A pytest fixture that serves a stand-in CloudFormation endpoint"""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        clients.clear_clients()
+
+
+def test_get_client():
+    """Tests clients.get_client() configuration and sharing"""
+    client = clients.get_client("cloudformation", "ap-southeast-2", 32)
+    assert client.meta.config.max_pool_connections == 32
+    assert client.meta.config.retries["mode"] == "adaptive"
+    assert client.meta.region_name == "ap-southeast-2"
+
+    # clients are shared
+    assert clients.get_client("cloudformation", "ap-southeast-2", 32) is client
+    assert clients.get_client("cloudformation", "us-east-1", 32) is not client
+
+    # the pool is never smaller than botocore's default
+    client = clients.get_client("cloudformation", "ap-southeast-2")
+    assert client.meta.config.max_pool_connections == 10
+
+    clients.clear_clients()
+
+
+def delete_stacks(endpoint_url: str, workers: int, count: int) -> int:
+    """Delete count stacks with a number of workers, returning the most deleted at once"""
+    client = clients.get_client(
+        "cloudformation", "ap-southeast-2", workers, endpoint_url
+    )
+    stacks = [
+        cloudformation.Stack(
+            stack_id=f"stack-{index}", name=f"stack-{index}", cloudformation=client
+        )
+        for index in range(count)
+    ]
+    args = Namespace(
+        wait=False,
+        disable_termination_protection=False,
+        empty_resources=False,
+        workers=workers,
+        lease_store=None,
+        delete_retries=0,
+        retry_delay=0,
+        retain_failed_resources=False,
+    )
+
+    StandInRequestHandler.max_in_flight = 0
+    assert not sweeper.delete_stacks(args, stacks)
+    return StandInRequestHandler.max_in_flight
+
+
+def test_delete_concurrency(endpoint_url: str, caplog):
+    """Tests deletes are sent in parallel, each worker on its own connection
+
+    How much faster parallel deletes are is measured by tests/benchmarks.py.
+    """
+    assert delete_stacks(endpoint_url, 1, 8) == 1
+
+    with caplog.at_level(logging.WARNING, logger="urllib3"):
+        assert delete_stacks(endpoint_url, 8, 32) > 1
+
+    # every worker gets its own connection, rather than waiting for (or discarding) one
+    assert "Connection pool is full" not in caplog.text
@@ -1,11 +1,12 @@
 # pylint:disable=redefined-outer-name
+import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Union
 
 import pytest  # type: ignore
 from botocore.exceptions import ClientError  # type: ignore
 
-from stack_sweeper import cloudformation
+from stack_sweeper import cloudformation, log_utils
 
 from . import stubs
 from .conftest import STACK_ID, StubbedClient
@@ -212,3 +213,146 @@ def test_get_stacks_exclude_nested_stacks(fake_cloudformation_client: StubbedCli
     stubs.stub_describe_stacks(fake_cloudformation_client.stub, stack_responses)
     stacks = list(cloudformation.get_stacks(fake_cloudformation_client.client))
     assert len(stacks) == 1
+
+
+def test_delete_wait_failed_resources(
+    fake_cloudformation_client: StubbedClient, stack: cloudformation.Stack
+):
+    """Tests Stack.delete(wait=True) reports the resources that failed to delete"""
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+    stubs.stub_describe_stack(
+        fake_cloudformation_client.stub, STACK_ID, "DELETE_FAILED"
+    )
+    stubs.stub_describe_stack_delete_failed_events(
+        fake_cloudformation_client.stub, STACK_ID, ["Bucket", "Repository"]
+    )
+    with pytest.raises(cloudformation.StackDeletionError) as error:
+        stack.delete(True)
+
+    assert error.value.status == "DELETE_FAILED"
+    assert error.value.failed_resources == ["Bucket", "Repository"]
+    assert stack.failed_resources == ["Bucket", "Repository"]
+
+
+def test_delete_retain_resources(
+    fake_cloudformation_client: StubbedClient, stack: cloudformation.Stack
+):
+    """Tests Stack.delete() retaining resources"""
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID, ["Bucket"])
+    stack.delete(False, ["Bucket"])
+
+
+def test_find_failed_resources():
+    """Tests cloudformation.find_failed_resources()"""
+
+    def event(logical_resource_id: str, status: str) -> Dict[str, str]:
+        return {"LogicalResourceId": logical_resource_id, "ResourceStatus": status}
+
+    events = [
+        event("MyStack", "DELETE_FAILED"),
+        event("Bucket", "DELETE_FAILED"),
+        event("Bucket", "DELETE_IN_PROGRESS"),
+        event("Role", "DELETE_COMPLETE"),
+        event("Bucket", "DELETE_FAILED"),
+        event("MyStack", "DELETE_IN_PROGRESS"),
+        event("Older", "DELETE_FAILED"),
+    ]
+    assert cloudformation.find_failed_resources(events, "MyStack") == ["Bucket"]
+    assert not cloudformation.find_failed_resources([], "MyStack")
+
+
+def test_stack_tags(stack: cloudformation.Stack):
+    """Tests Stack.tags is built lazily from the described tag list"""
+    stack.tag_list = [
+        {"Key": "Something", "Value": "Else"},
+        {"Key": "MyTag", "Value": "Value"},
+    ]
+    assert stack.tag_value("MyTag") == "Value"
+    assert stack.tag_value("Missing") is None
+
+    assert stack.tags == {"Something": "Else", "MyTag": "Value"}
+    stack.tags["MyTag"] = "Changed"
+    assert stack.tag_value("MyTag") == "Changed"
+
+    # changing the tags in place writes them through to the detail too
+    stack.tags["Added"] = "New"
+    del stack.tags["Something"]
+    assert stack.detail["Tags"] == [
+        {"Key": "MyTag", "Value": "Changed"},
+        {"Key": "Added", "Value": "New"},
+    ]
+    assert stack.tag_list == stack.detail["Tags"]
+
+    # setting the tags writes them through to the detail
+    stack.tags = {"Team": "web"}
+    assert stack.detail["Tags"] == [{"Key": "Team", "Value": "web"}]
+    assert stack.tag_list == [{"Key": "Team", "Value": "web"}]
+    assert stack.tag_value("Team") == "web"
+
+
+def test_stack_parameters(stack: cloudformation.Stack):
+    """Tests Stack.parameters writes through to the detail"""
+    stack.detail["Parameters"] = [
+        {"ParameterKey": "Env", "ParameterValue": "dev", "ResolvedValue": "dev"}
+    ]
+    assert stack.parameters == {"Env": "dev"}
+
+    # changes in place keep the rest of each parameter's detail
+    stack.parameters["Env"] = "prod"
+    stack.parameters["Size"] = "large"
+    assert stack.detail["Parameters"] == [
+        {"ParameterKey": "Env", "ParameterValue": "prod", "ResolvedValue": "dev"},
+        {"ParameterKey": "Size", "ParameterValue": "large"},
+    ]
+
+    stack.parameters = {"Team": "web"}
+    assert stack.detail["Parameters"] == [
+        {"ParameterKey": "Team", "ParameterValue": "web"}
+    ]
+    assert stack.parameters == {"Team": "web"}
+
+
+def test_event_log_level(monkeypatch):
+    """Tests cloudformation.event_log_level() only coalesces when asked to"""
+    assert (
+        cloudformation.event_log_level("Bucket", "DELETE_IN_PROGRESS", "MyStack")
+        == logging.INFO
+    )
+
+    monkeypatch.setattr(log_utils, "COALESCE_EVENTS", True)
+    for logical_resource_id, resource_status, level in [
+        ("MyStack", "DELETE_IN_PROGRESS", logging.INFO),
+        ("MyStack", "DELETE_COMPLETE", logging.INFO),
+        ("Bucket", "DELETE_IN_PROGRESS", logging.DEBUG),
+        ("Bucket", "DELETE_COMPLETE", logging.DEBUG),
+        ("Bucket", "DELETE_FAILED", logging.INFO),
+    ]:
+        assert (
+            cloudformation.event_log_level(
+                logical_resource_id, resource_status, "MyStack"
+            )
+            == level
+        )
+
+
+def test_log_event(caplog):
+    """Tests cloudformation.log_event() prefixes events with their stack's name"""
+    caplog.set_level(logging.INFO)
+    cloudformation.log_event("Bucket", "DELETE_FAILED", "Bucket not empty", "MyStack")
+    cloudformation.log_event("MyStack", "DELETE_COMPLETE", None, "MyStack")
+    assert caplog.messages[-2:] == [
+        "MyStack - Bucket - DELETE_FAILED - Bucket not empty",
+        "MyStack - MyStack - DELETE_COMPLETE",
+    ]
+
+
+def test_stack_lists_are_per_stack():
+    """Tests stacks don't share their failed resources or marking strategies"""
+    first = cloudformation.Stack({"StackId": "first"})
+    second = cloudformation.Stack({"StackId": "second"})
+    first.failed_resources.append("Bucket")
+    first.mark("strategy")
+
+    assert first.marked_by_strategies == ["strategy"]
+    assert not second.failed_resources
+    assert not second.marked_by_strategies
@@ -0,0 +1,82 @@
+# pylint:disable=redefined-outer-name
+import json
+from argparse import Namespace
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from stack_sweeper import daemon, inventory
+
+from . import stubs
+from .conftest import ReasonedStrategy, StubbedClient
+
+
+@pytest.fixture
+def stack_daemon(fake_cloudformation_client: StubbedClient) -> daemon.Daemon:
+    """A pytest fixture that provides a dry-run Daemon"""
+    args = Namespace(delete=False, interval=1)
+    return daemon.Daemon(
+        args,
+        inventory.Inventory(fake_cloudformation_client.client),
+        lambda _: ReasonedStrategy("because"),
+    )
+
+
+def test_tick(fake_cloudformation_client: StubbedClient, stack_daemon: daemon.Daemon):
+    """Tests Daemon.tick()"""
+    assert stack_daemon.health()["status"] == "starting"
+
+    detail = stubs.generate_stack_detail("stack-one")
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, [detail])
+    stats = stack_daemon.tick()
+    assert stats["added"] == 1
+    assert stats["stacks"] == 1
+    assert stats["selected"] == 1
+    assert not stats["error"]
+
+    # the next tick is incremental
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, [detail])
+    stats = stack_daemon.tick()
+    assert stats["added"] == 0
+    assert stats["stacks"] == 1
+
+    health = stack_daemon.health()
+    assert health["status"] == "ok"
+    assert health["runs"] == 2
+    assert health["last_run"] == stats
+
+
+def test_tick_failure(
+    fake_cloudformation_client: StubbedClient, stack_daemon: daemon.Daemon
+):
+    """Tests Daemon.tick() records failures"""
+    fake_cloudformation_client.stub.add_client_error("describe_stacks", "Throttling")
+    stats = stack_daemon.tick()
+    assert "Throttling" in stats["error"]
+    assert stack_daemon.health()["status"] == "failing"
+
+
+def test_health_server(
+    fake_cloudformation_client: StubbedClient, stack_daemon: daemon.Daemon
+):
+    """Tests HealthServer serves the daemon's health"""
+    server = daemon.HealthServer(stack_daemon, 0)
+    server.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urlopen(f"{url}/health") as response:
+            assert json.load(response)["status"] == "starting"
+
+        fake_cloudformation_client.stub.add_client_error("describe_stacks")
+        stack_daemon.tick()
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{url}/health")  # pylint: disable=consider-using-with
+        assert error.value.code == 503
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{url}/elsewhere")  # pylint: disable=consider-using-with
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
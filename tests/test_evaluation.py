@@ -0,0 +1,31 @@
+from stack_sweeper import cloudformation, evaluation, limited_strategy
+
+from .conftest import AlternatingTrueStrategy, ReasonedStrategy
+
+
+def test_evaluate_stacks(stack: cloudformation.Stack):
+    """Tests evaluation.evaluate_stacks()"""
+    decisions = evaluation.evaluate_stacks(ReasonedStrategy("because"), [stack, stack])
+    assert len(decisions) == 2
+    assert all(decision.remove for decision in decisions)
+    assert decisions[0].reasons == ("because",)
+    assert not stack.marked_by_strategies
+
+    # strategies that only implement should_remove() still work
+    decisions = evaluation.evaluate_stacks(AlternatingTrueStrategy(), [stack] * 4)
+    assert [decision.remove for decision in decisions] == [True, False, True, False]
+
+
+def test_evaluate_stacks_limited(stack: cloudformation.Stack):
+    """Tests evaluation.evaluate_stacks() applies limits across the selection"""
+    strategy = limited_strategy.LimitedStrategy(3, ReasonedStrategy("because"))
+
+    for _ in range(2):  # the same strategy can be reused without carrying state over
+        decisions = evaluation.evaluate_stacks(strategy, [stack] * 5)
+        assert [decision.remove for decision in decisions] == [
+            True,
+            True,
+            True,
+            False,
+            False,
+        ]
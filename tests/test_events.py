@@ -0,0 +1,248 @@
+# pylint:disable=redefined-outer-name
+import io
+import json
+import threading
+from argparse import Namespace
+
+import boto3  # type: ignore
+import pytest
+from botocore.stub import Stubber  # type: ignore
+
+from stack_sweeper import events, inventory
+
+from . import stubs
+from .conftest import ReasonedStrategy, StubbedClient
+
+QUEUE_URL = "https://sqs.ap-southeast-2.amazonaws.com/123456789012/stack-events"
+
+
+def stack_status_event(stack_id: str, status: str) -> dict:
+    """Generates an EventBridge stack status change event"""
+    return {
+        "version": "0",
+        "source": "aws.cloudformation",
+        "detail-type": "CloudFormation Stack Status Change",
+        "resources": [stack_id],
+        "detail": {
+            "stack-id": stack_id,
+            "status-details": {"status": status, "status-reason": ""},
+        },
+    }
+
+
+@pytest.fixture
+def processor(fake_cloudformation_client: StubbedClient) -> events.EventProcessor:
+    """A pytest fixture that provides a dry-run EventProcessor"""
+    return events.EventProcessor(
+        Namespace(delete=False, interval=900),
+        inventory.Inventory(fake_cloudformation_client.client),
+        lambda _: ReasonedStrategy("because"),
+    )
+
+
+def test_parse_event():
+    """Tests events.parse_event()"""
+    change = events.parse_event(stack_status_event("stack-id", "UPDATE_COMPLETE"))
+    assert change == events.StackChange("stack-id", "UPDATE_COMPLETE")
+
+    # resource changes are stack changes without a status
+    change = events.parse_event(
+        {
+            "source": "aws.cloudformation",
+            "detail-type": "CloudFormation Resource Status Change",
+            "detail": {"stack-id": "stack-id", "logical-resource-id": "Bucket"},
+        }
+    )
+    assert change == events.StackChange("stack-id", None)
+
+    assert not events.parse_event({"source": "aws.ec2", "detail": {}})
+    assert not events.parse_event({"source": "aws.cloudformation", "detail": {}})
+
+
+def test_unwrap_records():
+    """Tests events.unwrap_records()"""
+    record = stack_status_event("stack-id", "CREATE_COMPLETE")
+    assert events.unwrap_records(record) == [record]
+    assert events.unwrap_records([record, record]) == [record, record]
+    assert events.unwrap_records({"Message": json.dumps(record)}) == [record]
+    assert not events.unwrap_records("nonsense")
+
+
+def test_stream_batches():
+    """Tests events.stream_batches()"""
+    record = stack_status_event("stack-id", "CREATE_COMPLETE")
+    stream = io.StringIO(f"{json.dumps(record)}\n\nnot json\n{json.dumps([record])}\n")
+    assert [batch.records for batch in events.stream_batches(stream)] == [
+        [record],
+        [record],
+    ]
+
+
+def test_sqs_batches():
+    """Tests events.sqs_batches() only removes messages once they're acknowledged"""
+    record = stack_status_event("stack-id", "CREATE_COMPLETE")
+    sqs = boto3.client("sqs")
+    with Stubber(sqs) as stub:
+        stub.add_response(
+            "receive_message",
+            {
+                "Messages": [
+                    {"Body": json.dumps(record), "ReceiptHandle": "handle-1"},
+                    {"Body": "not json", "ReceiptHandle": "handle-2"},
+                ]
+            },
+            {"QueueUrl": QUEUE_URL, "MaxNumberOfMessages": 10, "WaitTimeSeconds": 20},
+        )
+        stub.add_response("receive_message", {}, None)
+        stub.add_response(
+            "receive_message",
+            {"Messages": [{"Body": json.dumps([record]), "ReceiptHandle": "handle-3"}]},
+            None,
+        )
+
+        batches = events.sqs_batches(sqs, QUEUE_URL)
+        first = next(batches)
+        assert first.records == [record]
+
+        # the next batches don't remove the first, and empty polls are empty batches
+        assert next(batches).records == []
+        assert next(batches).records == [record]
+        stub.assert_no_pending_responses()
+
+        # only the well-formed message is removed, the malformed one goes to the DLQ
+        stub.add_response(
+            "delete_message_batch",
+            {"Successful": [{"Id": "0"}], "Failed": []},
+            {
+                "QueueUrl": QUEUE_URL,
+                "Entries": [{"Id": "0", "ReceiptHandle": "handle-1"}],
+            },
+        )
+        first.acknowledge()
+        stub.assert_no_pending_responses()
+
+
+def test_run_acknowledges_processed_batches(
+    fake_cloudformation_client: StubbedClient, processor: events.EventProcessor
+):
+    """Tests EventProcessor.run() only acknowledges batches that were processed"""
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, [])
+    acknowledged = []
+    batches = [
+        events.EventBatch([{"source": "aws.ec2"}], lambda: acknowledged.append("ok")),
+        events.EventBatch(
+            [
+                stack_status_event("missing", "UPDATE_COMPLETE")
+            ],  # not stubbed, so it fails
+            lambda: acknowledged.append("failed"),
+        ),
+    ]
+
+    processor.run(batches)
+    assert acknowledged == ["ok"]
+    assert processor.failed_batches == 1
+
+
+def test_run_sweeps_periodically(
+    fake_cloudformation_client: StubbedClient,
+    processor: events.EventProcessor,
+    monkeypatch,
+):
+    """Tests EventProcessor.run() sweeps the whole inventory at first, and every interval"""
+    now = [1000.0]
+    monkeypatch.setattr(events.time, "monotonic", lambda: now[0])
+    detail = stubs.generate_stack_detail("unchanged")
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, [detail])
+    processor.run([events.EventBatch([], events.no_acknowledgement)])
+    assert detail["StackId"] in processor.inventory
+    fake_cloudformation_client.stub.assert_no_pending_responses()
+
+    # not yet due, so the inventory isn't refreshed
+    now[0] += 899
+    assert not processor.sweep_due()
+    processor.run([events.EventBatch([], events.no_acknowledgement)])
+
+    now[0] += 1
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, [detail])
+    processor.run([events.EventBatch([], events.no_acknowledgement)])
+    fake_cloudformation_client.stub.assert_no_pending_responses()
+
+
+def test_run_sweeps_without_events(
+    fake_cloudformation_client: StubbedClient, processor: events.EventProcessor
+):
+    """Tests EventProcessor.run() sweeps every interval while no events arrive"""
+    processor.args.interval = 0.05
+    detail = stubs.generate_stack_detail("unchanged")
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, [detail])
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, [detail])
+
+    sweeps = []
+    swept_twice = threading.Event()
+    sweep_all = processor.sweep_all
+
+    def counted_sweep_all():
+        sweeps.append(sweep_all())
+        if len(sweeps) == 2:
+            swept_twice.set()
+
+        return sweeps[-1]
+
+    def quiet_batches():
+        swept_twice.wait(5)
+        yield from []
+
+    processor.sweep_all = counted_sweep_all  # type: ignore
+    processor.run(quiet_batches())
+    assert swept_twice.is_set()
+    fake_cloudformation_client.stub.assert_no_pending_responses()
+
+
+def test_idle_batches():
+    """Tests events.idle_batches() passes batches through, and raises the source's errors"""
+    batch = events.EventBatch([{"source": "aws.ec2"}], events.no_acknowledgement)
+    assert list(events.idle_batches([batch], lambda: 5)) == [batch]
+
+    def failing_batches():
+        yield batch
+        raise ValueError("unreadable")
+
+    idle = events.idle_batches(failing_batches(), lambda: 5)
+    assert next(idle) == batch
+    with pytest.raises(ValueError):
+        next(idle)
+
+
+def test_sqs_endpoint_url():
+    """Tests events.sqs_endpoint_url()"""
+    assert not events.sqs_endpoint_url(QUEUE_URL)
+    assert (
+        events.sqs_endpoint_url("http://localhost:9324/000000000000/stack-events")
+        == "http://localhost:9324"
+    )
+
+
+def test_process(
+    fake_cloudformation_client: StubbedClient, processor: events.EventProcessor
+):
+    """Tests EventProcessor.process() only describes and sweeps changed stacks"""
+    changed = stubs.generate_stack_detail("changed")
+    deleted = stubs.generate_stack_detail("deleted")
+    processor.inventory.stacks[deleted["StackId"]] = object()
+
+    stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, changed)
+    result = processor.process(
+        [
+            stack_status_event(changed["StackId"], "CREATE_IN_PROGRESS"),
+            stack_status_event(changed["StackId"], "CREATE_COMPLETE"),
+            stack_status_event(deleted["StackId"], "DELETE_COMPLETE"),
+            {"source": "aws.ec2"},
+        ]
+    )
+    assert result.stacks == 1
+    assert result.selected[0].stack.name == "changed"
+    assert changed["StackId"] in processor.inventory
+    assert deleted["StackId"] not in processor.inventory
+
+    # events that don't change any stacks don't sweep
+    assert not processor.process([{"source": "aws.ec2"}]).stacks
@@ -1,4 +1,7 @@
-from stack_sweeper import cloudformation, exclude_tag_strategy
+from stack_sweeper import cloudformation, exclude_tag_strategy, inventory
+
+from . import stubs
+from .conftest import StubbedClient
 
 
 def test_not_excluded(stack: cloudformation.Stack):
@@ -41,3 +44,21 @@ def test_str():
 
     strategy = exclude_tag_strategy.ExcludeTagStrategy("stack-sweeper:ignore")
     assert str(strategy) == "ExcludeTagStrategy(stack-sweeper:ignore)"
+
+
+def test_candidates(fake_cloudformation_client: StubbedClient):
+    """Tests ExcludeTagStrategy.candidates() excludes stacks using the tag index"""
+    details = [
+        stubs.generate_stack_detail("ignored", tags={"stack-sweeper:ignore": "yes"}),
+        stubs.generate_stack_detail("other", tags={"stack-sweeper:other": "yes"}),
+        stubs.generate_stack_detail("untagged"),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+
+    strategy = exclude_tag_strategy.ExcludeTagStrategy("stack-sweeper:ignore")
+    assert strategy.candidates(stack_inventory) == {
+        details[1]["StackId"],
+        details[2]["StackId"],
+    }
@@ -2,7 +2,10 @@ from datetime import datetime, timedelta
 
 from dateutil.tz import tzutc
 
-from stack_sweeper import cloudformation, expiration_tag_strategy
+from stack_sweeper import cloudformation, expiration_tag_strategy, inventory
+
+from . import stubs
+from .conftest import StubbedClient
 
 
 def test_expiration_not_valid(stack: cloudformation.Stack):
@@ -96,3 +99,45 @@ def test_get_mark_reason(stack: cloudformation.Stack):
     past_time = datetime(2020, 1, 7, 9, 0, 0, tzinfo=tzutc())
     stack.tags["expiration"] = past_time.isoformat(timespec="seconds")
     assert "expired 2 days ago" in strategy.get_mark_reason(stack)
+
+
+def test_evaluate(stack: cloudformation.Stack):
+    """Tests ExpirationTagStrategy.evaluate()"""
+    strategy = expiration_tag_strategy.ExpirationTagStrategy(
+        "expiration", datetime(2020, 1, 9, 9, 0, 0, tzinfo=tzutc())
+    )
+
+    decision = strategy.evaluate(stack)
+    assert not decision.remove
+    assert not decision.reasons
+
+    stack.tags["expiration"] = "2020-01-07 09:00:00Z"
+    decision = strategy.evaluate(stack)
+    assert decision.remove
+    assert decision.stack is stack
+    assert "expired 2 days ago" in decision.reasons[0]
+
+    # evaluating must not mark the stack
+    assert not stack.marked_by_strategies
+
+
+def test_candidates(fake_cloudformation_client: StubbedClient):
+    """Tests ExpirationTagStrategy.candidates() selects stacks from the tag index"""
+    details = [
+        stubs.generate_stack_detail("expired", tags={"expiration": "2020-01-07"}),
+        stubs.generate_stack_detail("also-expired", tags={"expiration": "2020-01-07"}),
+        stubs.generate_stack_detail("not-expired", tags={"expiration": "2020-01-10"}),
+        stubs.generate_stack_detail("invalid", tags={"expiration": "never"}),
+        stubs.generate_stack_detail("untagged"),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+
+    strategy = expiration_tag_strategy.ExpirationTagStrategy(
+        "expiration", datetime(2020, 1, 9, 9, 0, 0, tzinfo=tzutc())
+    )
+    assert strategy.candidates(stack_inventory) == {
+        details[0]["StackId"],
+        details[1]["StackId"],
+    }
@@ -0,0 +1,202 @@
+# pylint:disable=redefined-outer-name
+from argparse import Namespace
+from datetime import datetime
+
+import pytest
+from dateutil.tz import tzutc
+
+from stack_sweeper import expiry_scheduler, inventory
+from stack_sweeper.limited_strategy import LimitedStrategy
+
+from . import stubs
+from .conftest import ReasonedStrategy, StubbedClient
+
+CREATED_AT = datetime(2020, 1, 1, tzinfo=tzutc())
+
+
+@pytest.fixture
+def scheduler(
+    fake_cloudformation_client: StubbedClient,
+) -> expiry_scheduler.ExpiryScheduler:
+    """A pytest fixture that provides a dry-run ExpiryScheduler"""
+    args = Namespace(
+        delete=False, interval=60, expiry_tag="expiry", stack_update_age=None
+    )
+    return expiry_scheduler.ExpiryScheduler(
+        args,
+        inventory.Inventory(fake_cloudformation_client.client),
+        lambda _: ReasonedStrategy("because"),
+    )
+
+
+def test_schedule(
+    fake_cloudformation_client: StubbedClient,
+    scheduler: expiry_scheduler.ExpiryScheduler,
+):
+    """Tests ExpiryScheduler sweeps stacks in expiry order as they fall due"""
+    details = [
+        stubs.generate_stack_detail(
+            "later", tags={"expiry": "2020-03-01"}, last_updated_at=CREATED_AT
+        ),
+        stubs.generate_stack_detail(
+            "sooner", tags={"expiry": "2020-02-01"}, last_updated_at=CREATED_AT
+        ),
+        stubs.generate_stack_detail(
+            "invalid", tags={"expiry": "never"}, last_updated_at=CREATED_AT
+        ),
+        stubs.generate_stack_detail("untagged", last_updated_at=CREATED_AT),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    scheduler.sync()
+    assert len(scheduler) == 2
+
+    now = datetime(2020, 1, 31, tzinfo=tzutc())
+    assert scheduler.seconds_until_due(now) == 24 * 60 * 60
+    assert scheduler.tick(now).stacks == 0
+
+    now = datetime(2020, 2, 1, tzinfo=tzutc())
+    assert [decision.stack.name for decision in scheduler.tick(now).selected] == [
+        "sooner"
+    ]
+    assert scheduler.tick(now).stacks == 0
+
+    now = datetime(2020, 3, 2, tzinfo=tzutc())
+    assert [decision.stack.name for decision in scheduler.tick(now).selected] == [
+        "later"
+    ]
+    assert scheduler.seconds_until_due(now) is None
+
+
+def test_reschedule_only_on_change(
+    fake_cloudformation_client: StubbedClient,
+    scheduler: expiry_scheduler.ExpiryScheduler,
+):
+    """Tests ExpiryScheduler only reschedules stacks when their expiry tag changes"""
+    detail = stubs.generate_stack_detail(
+        "stack-one", tags={"expiry": "2020-02-01"}, last_updated_at=CREATED_AT
+    )
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, [detail])
+    scheduler.sync()
+    stack = scheduler.inventory.get(detail["StackId"])
+    scheduled = scheduler.get(detail["StackId"])
+    assert scheduled.due_at == datetime(2020, 2, 1, tzinfo=tzutc())
+
+    # unchanged stacks keep their schedule
+    assert not scheduler.schedule(stack)
+    assert scheduler.get(detail["StackId"]) is scheduled
+
+    # an updated expiry replaces the earlier one
+    # (a new detail, as stacks are views over the detail they were described with)
+    detail = dict(
+        detail,
+        Tags=[{"Key": "expiry", "Value": "2020-04-01"}],
+        LastUpdatedTime=datetime(2020, 1, 15, tzinfo=tzutc()),
+    )
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, [detail])
+    stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, detail)
+    scheduler.sync()
+    assert scheduler.get(detail["StackId"]).due_at == datetime(
+        2020, 4, 1, tzinfo=tzutc()
+    )
+    assert scheduler.tick(datetime(2020, 2, 1, tzinfo=tzutc())).stacks == 0
+    assert scheduler.tick(datetime(2020, 4, 1, tzinfo=tzutc())).stacks == 1
+
+    # stacks that are removed are no longer scheduled
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, [])
+    scheduler.sync()
+    assert not scheduler
+
+
+def test_stack_update_age(
+    fake_cloudformation_client: StubbedClient,
+    scheduler: expiry_scheduler.ExpiryScheduler,
+):
+    """Tests ExpiryScheduler schedules stacks by the earliest of their expiry and age"""
+    scheduler.args.stack_update_age = 7
+    details = [
+        stubs.generate_stack_detail(
+            "expires", tags={"expiry": "2020-01-03"}, last_updated_at=CREATED_AT
+        ),
+        stubs.generate_stack_detail(
+            "ages", tags={"expiry": "2020-03-01"}, last_updated_at=CREATED_AT
+        ),
+        stubs.generate_stack_detail("untagged", last_updated_at=CREATED_AT),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    scheduler.sync()
+
+    assert [scheduler.get(detail["StackId"]).due_at.day for detail in details] == [
+        3,
+        8,
+        8,
+    ]
+
+
+def test_reschedule_failed(
+    fake_cloudformation_client: StubbedClient,
+    scheduler: expiry_scheduler.ExpiryScheduler,
+    monkeypatch,
+):
+    """Tests ExpiryScheduler sweeps stacks that fail to delete again, backing off"""
+    detail = stubs.generate_stack_detail(
+        "stuck", tags={"expiry": "2020-02-01"}, last_updated_at=CREATED_AT
+    )
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, [detail])
+    scheduler.sync()
+
+    def failing_sweep(args, strategy, stacks):
+        return expiry_scheduler.SweepResult(len(stacks), [], list(stacks), [])
+
+    monkeypatch.setattr(expiry_scheduler, "sweep", failing_sweep)
+    now = datetime(2020, 2, 1, tzinfo=tzutc())
+    assert scheduler.tick(now).failed
+    assert scheduler.seconds_until_due(now) == 60
+
+    now = datetime(2020, 2, 1, 0, 1, tzinfo=tzutc())
+    assert scheduler.tick(now).failed
+    assert scheduler.seconds_until_due(now) == 120
+
+    # once it's deleted, it's no longer backed off, and the next refresh drops it
+    scheduler.args.delete = True
+    monkeypatch.setattr(
+        expiry_scheduler,
+        "sweep",
+        lambda args, strategy, stacks: expiry_scheduler.SweepResult(1, [], [], []),
+    )
+    now = datetime(2020, 2, 1, 0, 3, tzinfo=tzutc())
+    assert scheduler.tick(now).stacks == 1
+    assert scheduler.seconds_until_due(now) == 60
+
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, [])
+    scheduler.sync()
+    assert scheduler.seconds_until_due(now) is None
+
+
+def test_reschedule_left_out(
+    fake_cloudformation_client: StubbedClient,
+    scheduler: expiry_scheduler.ExpiryScheduler,
+):
+    """Tests ExpiryScheduler sweeps due stacks left out by --limit again"""
+    scheduler.strategy_factory = lambda _: LimitedStrategy(
+        1, ReasonedStrategy("because")
+    )
+    details = [
+        stubs.generate_stack_detail(
+            name, tags={"expiry": "2020-02-01"}, last_updated_at=CREATED_AT
+        )
+        for name in ["first", "second"]
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    scheduler.sync()
+
+    now = datetime(2020, 2, 1, tzinfo=tzutc())
+    assert [decision.stack.name for decision in scheduler.tick(now).selected] == [
+        "first"
+    ]
+    assert scheduler.seconds_until_due(now) == 60
+
+    now = datetime(2020, 2, 1, 0, 1, tzinfo=tzutc())
+    assert [decision.stack.name for decision in scheduler.tick(now).selected] == [
+        "second"
+    ]
+    assert scheduler.seconds_until_due(now) is None
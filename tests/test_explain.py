@@ -0,0 +1,109 @@
+from argparse import Namespace
+from datetime import datetime, timezone
+
+from stack_sweeper import (
+    cloudformation,
+    evaluation,
+    explain,
+    expression_strategy,
+    inventory,
+    limited_strategy,
+    nested_strategies,
+    sweeper,
+)
+
+from .conftest import (
+    AlwaysFalseStrategy,
+    AlwaysTrueStrategy,
+    ReasonedStrategy,
+    StubbedClient,
+)
+
+
+def test_explain_strategy(stack: cloudformation.Stack):
+    """Tests explain.explain_strategy() records every node's decisions"""
+    strategy = limited_strategy.LimitedStrategy(
+        5,
+        nested_strategies.NestedAllStrategy(
+            [
+                nested_strategies.NestedAnyStrategy(
+                    [AlwaysFalseStrategy(), ReasonedStrategy("because")]
+                ),
+                AlwaysTrueStrategy(),
+            ]
+        ),
+    )
+    explained = explain.explain_strategy(strategy)
+
+    decisions = evaluation.evaluate_stacks(explained, [stack, stack, stack])
+    assert [decision.reasons for decision in decisions] == [("because",)] * 3
+
+    nested_all = explained.children[0]
+    nested_any, always_true = nested_all.children
+    always_false, reasoned = nested_any.children
+    assert (explained.calls, explained.removed) == (3, 3)
+    assert (always_false.calls, always_false.removed) == (3, 0)
+    assert (reasoned.calls, reasoned.removed) == (3, 3)
+    assert (always_true.calls, always_true.removed) == (3, 3)
+    assert explained.seconds >= nested_all.seconds >= nested_any.seconds
+
+    # the original tree is left untouched
+    assert isinstance(strategy.nested_strategy, nested_strategies.NestedAllStrategy)
+    assert isinstance(strategy.nested_strategy.nested_strategies[1], AlwaysTrueStrategy)
+
+
+def test_format_explanation(stack: cloudformation.Stack):
+    """Tests explain.format_explanation() annotates each node, indented by depth"""
+    explained = explain.explain_strategy(
+        nested_strategies.NestedAllStrategy(
+            [AlwaysFalseStrategy(), AlwaysTrueStrategy()]
+        )
+    )
+    evaluation.evaluate_stacks(explained, [stack, stack])
+
+    lines = explain.format_explanation(explained)
+    assert len(lines) == 3
+    assert lines[0].startswith(
+        "NestedAllStrategy: 2 evaluated, 0 removed (0.0%), 2 kept"
+    )
+    assert lines[1].startswith("  AlwaysFalseStrategy: 2 evaluated, 0 removed")
+    # short-circuited by the strategy before it
+    assert lines[2].startswith("  AlwaysTrueStrategy: 0 evaluated, 0 removed (n/a)")
+
+
+def test_explain_pruned(fake_cloudformation_client: StubbedClient):
+    """Tests explained strategies count the stacks their candidates rule out"""
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.restore(
+        [
+            {
+                "StackId": name,
+                "StackName": name,
+                "StackStatus": "CREATE_COMPLETE",
+                "CreationTime": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                "Tags": [{"Key": "owner", "Value": "me"}] if name == "owned" else [],
+            }
+            for name in ["owned", "unowned", "other"]
+        ]
+    )
+    explained = explain.explain_strategy(
+        nested_strategies.NestedAllStrategy(
+            [
+                expression_strategy.ExpressionStrategy(
+                    expression_strategy.parse_expression('has_tag("owner")')
+                ),
+                AlwaysTrueStrategy(),
+            ]
+        )
+    )
+
+    sweeper.sweep(Namespace(delete=False), explained, stack_inventory)
+    expression, always_true = explained.children
+    assert (explained.pruned, explained.calls) == (2, 1)
+    assert expression.pruned == 2
+    assert always_true.pruned == 0
+
+    lines = explain.format_explanation(explained)
+    assert lines[0].startswith("NestedAllStrategy: 2 pruned by indexes, 1 evaluated")
+    # expressions are shown with their source
+    assert lines[1].startswith('  ExpressionStrategy(has_tag("owner")): 2 pruned')
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+import pytest
+from dateutil.tz import tzutc
+
+from stack_sweeper import cloudformation, expression_strategy, inventory
+from stack_sweeper.expression_strategy import And, Call, Constant, Not, Or
+
+from . import stubs
+from .conftest import StubbedClient
+
+COMPARE_TIME = datetime(2020, 12, 31, tzinfo=tzutc())
+EXPRESSION = (
+    '(tag_expired("expiry") or updated_before(30d)) and not name_glob("prod-*")'
+)
+
+
+def make_stack(
+    client, name: str, tags=None, last_updated_at=datetime(2020, 12, 30, tzinfo=tzutc())
+) -> cloudformation.Stack:
+    """Create a Stack object from a generated stack detail"""
+    return cloudformation.Stack.factory_from_stack_detail(
+        client, stubs.generate_stack_detail(name, tags, last_updated_at)
+    )
+
+
+def test_parse_expression():
+    """Tests expression_strategy.parse_expression() parses and folds expressions"""
+    expression = expression_strategy.parse_expression(EXPRESSION)
+    assert expression.text == EXPRESSION
+    assert expression.node == And(
+        (
+            Not(Call("name_glob", "prod-*")),
+            Or(
+                (
+                    Call("updated_before", timedelta(days=30)),
+                    Call("tag_expired", "expiry"),
+                )
+            ),
+        )
+    )
+
+    assert expression_strategy.parse_expression(
+        'has_tag("a\\"b") and updated_before(2w)'
+    ).node == And((Call("has_tag", 'a"b'), Call("updated_before", timedelta(weeks=2))))
+
+
+def test_fold():
+    """Tests expression_strategy.fold() folds constants and flattens nested operands"""
+    for text, node in [
+        ('true and has_tag("a")', Call("has_tag", "a")),
+        ('false and has_tag("a")', Constant(False)),
+        ('false or not not has_tag("a")', Call("has_tag", "a")),
+        ('has_tag("a") or (true or has_tag("b"))', Constant(True)),
+        ('not (has_tag("a") and false)', Constant(True)),
+        (
+            'has_tag("a") and (has_tag("b") and has_tag("a"))',
+            And((Call("has_tag", "a"), Call("has_tag", "b"))),
+        ),
+    ]:
+        assert expression_strategy.parse_expression(text).node == node
+
+
+def test_parse_expression_errors():
+    """Tests expression_strategy.parse_expression() rejects invalid expressions"""
+    for text in [
+        "",
+        "updated_before(30)",
+        'updated_before("30d")',
+        'unknown("a")',
+        'has_tag("a") and',
+        'has_tag("a"))',
+        'has_tag("a") # comment',
+    ]:
+        with pytest.raises(ValueError):
+            expression_strategy.parse_expression(text)
+
+
+def test_expression_strategy(fake_cloudformation_client: StubbedClient):
+    """Tests ExpressionStrategy.evaluate()"""
+    client = fake_cloudformation_client.client
+    strategy = expression_strategy.ExpressionStrategy(
+        expression_strategy.parse_expression(EXPRESSION), COMPARE_TIME
+    )
+    old = datetime(2020, 1, 1, tzinfo=tzutc())
+
+    expected = {
+        "expired": ({"expiry": "2020-06-01"}, None, True),
+        "unexpired": ({"expiry": "2021-06-01"}, None, False),
+        "unparsable": ({"expiry": "tomorrow-ish"}, None, False),
+        "old": (None, old, True),
+        "recent": (None, None, False),
+        "prod-old": (None, old, False),
+    }
+    for name, (tags, last_updated_at, remove) in expected.items():
+        stack = make_stack(client, name, tags, last_updated_at or COMPARE_TIME)
+        decision = strategy.evaluate(stack)
+        assert decision.remove == remove, name
+        assert strategy.should_remove(stack) == remove, name
+        if remove:
+            assert decision.reasons == (f"matches {EXPRESSION}",)
+
+
+def test_expression_strategy_candidates(fake_cloudformation_client: StubbedClient):
+    """Tests ExpressionStrategy.candidates() uses the inventory's indexes"""
+    details = [
+        stubs.generate_stack_detail(
+            "expired", {"expiry": "2020-06-01"}, COMPARE_TIME - timedelta(days=1)
+        ),
+        stubs.generate_stack_detail(
+            "recent", last_updated_at=datetime(2020, 12, 30, tzinfo=tzutc())
+        ),
+        stubs.generate_stack_detail(
+            "old", last_updated_at=datetime(2020, 1, 1, tzinfo=tzutc())
+        ),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+
+    def candidate_names(text: str):
+        candidates = expression_strategy.ExpressionStrategy(
+            expression_strategy.parse_expression(text), COMPARE_TIME
+        ).candidates(stack_inventory)
+        if candidates is None:
+            return None
+
+        return sorted(stack_inventory.get(stack_id).name for stack_id in candidates)
+
+    assert candidate_names(EXPRESSION) == ["expired", "old"]
+    assert candidate_names('tag_expired("expiry") and has_tag("other")') == []
+    assert candidate_names('has_tag("expiry") or name_glob("r*")') is None
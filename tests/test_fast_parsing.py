@@ -0,0 +1,145 @@
+import re
+from pathlib import Path
+
+import boto3  # type: ignore
+import botocore  # type: ignore
+from botocore.awsrequest import AWSResponse  # type: ignore
+from botocore.parsers import QueryParser  # type: ignore
+
+from stack_sweeper import cloudformation, fast_parsing, recording
+
+PAYLOAD = (Path(__file__).parent / "payloads" / "describe_stacks.xml").read_bytes()
+FIELDS = [
+    "StackId",
+    "StackName",
+    "CreationTime",
+    "LastUpdatedTime",
+    "StackStatus",
+    "ParentId",
+]
+
+
+def large_payload(copies: int) -> bytes:
+    """The recorded page, with its stacks repeated (under distinct IDs) to make a large page"""
+    head, members, tail = re.split(rb"(?s)(?<=<Stacks>)(.*)(?=</Stacks>)", PAYLOAD)
+    copied = [
+        members.replace(b"-11e9-", f"-{copy:04x}-".encode()) for copy in range(copies)
+    ]
+
+    return b"".join([head, *copied, tail])
+
+
+def output_shape():
+    """The shape botocore parses DescribeStacks responses with"""
+    client = boto3.client("cloudformation", region_name="ap-southeast-2")
+    return client.meta.service_model.operation_model("DescribeStacks").output_shape
+
+
+def parse_default(body: bytes, shape):
+    """Parse a response the way botocore does"""
+    return QueryParser().parse({"body": body, "headers": {}, "status_code": 200}, shape)
+
+
+def summarise(stack):
+    """The fields of a parsed stack that get_stacks needs"""
+    return [stack.get(field) for field in FIELDS] + [stack.get("Tags") or []]
+
+
+def test_parse_describe_stacks():
+    """Test fast_parsing.parse_describe_stacks() matches botocore's parser"""
+    default = parse_default(PAYLOAD, output_shape())
+    parsed = fast_parsing.parse_describe_stacks(PAYLOAD)
+
+    assert len(parsed["Stacks"]) == 3
+    assert [summarise(stack) for stack in parsed["Stacks"]] == [
+        summarise(stack) for stack in default["Stacks"]
+    ]
+    assert parsed["NextToken"] == default["NextToken"]
+    assert parsed["ResponseMetadata"]["RequestId"] == "5ccc7dcd-744c-11e5-be70-example"
+    assert parsed["Stacks"][0]["Tags"][1] == {"Key": "team", "Value": "web & mobile"}
+    assert "Outputs" not in parsed["Stacks"][0]
+    assert "Parameters" not in parsed["Stacks"][0]
+
+
+def test_parse_describe_stacks_tag_keys():
+    """Test fast_parsing.parse_describe_stacks() only keeps the needed tags"""
+    parsed = fast_parsing.parse_describe_stacks(PAYLOAD, {"expiry"})
+
+    assert [stack["Tags"] for stack in parsed["Stacks"]] == [
+        [{"Key": "expiry", "Value": "2024-04-01"}],
+        [{"Key": "expiry", "Value": "2024-04-01"}],
+        [],
+    ]
+
+
+def test_summary_parser_falls_back():
+    """Test fast_parsing.SummaryParser leaves other responses to botocore"""
+    client = boto3.client("cloudformation", region_name="ap-southeast-2")
+    parser = fast_parsing.SummaryParserFactory().create_parser("query")
+    error = (
+        b"<ErrorResponse><Error><Type>Sender</Type><Code>ValidationError</Code>"
+        b"<Message>Stack with id missing does not exist</Message></Error>"
+        b"<RequestId>abc</RequestId></ErrorResponse>"
+    )
+
+    parsed = parser.parse(
+        {"body": error, "headers": {}, "status_code": 400}, output_shape()
+    )
+    assert parsed["Error"]["Code"] == "ValidationError"
+
+    protection = client.meta.service_model.operation_model(
+        "UpdateTerminationProtection"
+    ).output_shape
+    parsed = parser.parse(
+        {
+            "body": b"<UpdateTerminationProtectionResponse><UpdateTerminationProtectionResult>"
+            b"<StackId>stack</StackId></UpdateTerminationProtectionResult>"
+            b"</UpdateTerminationProtectionResponse>",
+            "headers": {},
+            "status_code": 200,
+        },
+        protection,
+    )
+    assert parsed["StackId"] == "stack"
+
+
+def test_get_stacks_summary_client():
+    """Test cloudformation.get_stacks() with a summary client"""
+    regular_client = boto3.client("cloudformation", region_name="ap-southeast-2")
+    summary_client = fast_parsing.get_summary_client("ap-southeast-2")
+    # a single page, without a token for another page
+    body = re.sub(rb"<NextToken>.*</NextToken>", b"", PAYLOAD)
+    # unsigned, so no credentials are needed
+    summary_client.meta.events.register(
+        "choose-signer.cloudformation", lambda **_: botocore.UNSIGNED
+    )
+    summary_client.meta.events.register(
+        "before-send.cloudformation.DescribeStacks",
+        lambda request, **_: AWSResponse(
+            request.url, 200, {}, recording.RecordedBody(body)
+        ),
+    )
+
+    stacks = list(cloudformation.get_stacks(regular_client, 0, summary_client))
+
+    # the nested stack is skipped, and stacks are bound to the regular client
+    assert [stack.name for stack in stacks] == ["preview-feature-1234", "networking"]
+    assert stacks[0].tags["expiry"] == "2024-04-01"
+    assert stacks[0].last_updated_at.isoformat() == "2024-03-05T10:20:30.123000+00:00"
+    assert stacks[1].last_updated_at == stacks[1].created_at
+    assert all(stack.cloudformation is regular_client for stack in stacks)
+
+
+def test_parse_describe_stacks_large_page():
+    """Test fast_parsing.parse_describe_stacks() matches botocore's parser on a large page
+
+    Timings are compared by tests/benchmarks.py, not here.
+    """
+    body = large_payload(100)
+    default = parse_default(body, output_shape())
+    parsed = fast_parsing.parse_describe_stacks(body)
+
+    assert len(parsed["Stacks"]) == 300
+    assert [summarise(stack) for stack in parsed["Stacks"]] == [
+        summarise(stack) for stack in default["Stacks"]
+    ]
@@ -0,0 +1,34 @@
+import pytest
+
+from stack_sweeper import file_utils
+
+
+def test_atomic_write(tmp_path):
+    """Tests file_utils.atomic_write() only replaces the file once it's written"""
+    path = tmp_path / "state.json"
+    path.write_text("old")
+
+    with file_utils.atomic_write(str(path)) as state_file:
+        state_file.write("new")
+        assert path.read_text() == "old"
+
+    assert path.read_text() == "new"
+
+    with file_utils.atomic_write(str(path), binary=True) as state_file:
+        state_file.write(b"\0binary")
+
+    assert path.read_bytes() == b"\0binary"
+
+
+def test_atomic_write_interrupted(tmp_path):
+    """Tests file_utils.atomic_write() leaves the file untouched when writing fails"""
+    path = tmp_path / "state.json"
+    path.write_text("old")
+
+    with pytest.raises(KeyboardInterrupt):
+        with file_utils.atomic_write(str(path)) as state_file:
+            state_file.write("partial")
+            raise KeyboardInterrupt()
+
+    assert path.read_text() == "old"
+    assert [child.name for child in tmp_path.iterdir()] == ["state.json"]
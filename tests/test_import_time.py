@@ -0,0 +1,69 @@
+import subprocess
+import sys
+from typing import Dict
+
+# modules that are slow to import, and must only be imported when they're actually used
+HEAVY_MODULES = ["boto3", "botocore", "dateutil", "http.server"]
+
+
+def import_times(code: str) -> Dict[str, int]:
+    """Run code in a fresh interpreter, returning the cumulative import time (µs) of every module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, module = line[len("import time:") :].split("|")
+        times[module.strip()] = int(cumulative)
+
+    return times
+
+
+def assert_no_heavy_modules(times: Dict[str, int]):
+    """Asserts none of the heavy modules (or their submodules) were imported"""
+    for module in times:
+        for heavy_module in HEAVY_MODULES:
+            assert not (
+                module == heavy_module or module.startswith(f"{heavy_module}.")
+            ), f"{module} should not be imported"
+
+
+def test_cli_import():
+    """Tests importing the CLI doesn't import heavy dependencies"""
+    times = import_times("import stack_sweeper.cli")
+    assert "stack_sweeper.cli" in times
+    assert_no_heavy_modules(times)
+
+
+def test_cli_help_and_validation():
+    """Tests --help and argument validation errors don't import heavy dependencies"""
+    assert_no_heavy_modules(
+        import_times("from stack_sweeper import cli; cli.parse_args(['--help'])")
+    )
+    assert_no_heavy_modules(
+        import_times("from stack_sweeper import cli; cli.parse_args([])")
+    )
+
+
+def test_strategy_construction():
+    """Tests building a strategy from arguments doesn't import heavy dependencies"""
+    assert_no_heavy_modules(
+        import_times(
+            "from stack_sweeper import cli, options; "
+            "options.get_strategy_from_args(cli.parse_args(['--expiry-tag', 'expiry', '--stack-update-age', '7']))"
+        )
+    )
+
+
+def test_lambda_handler_import():
+    """Tests a Lambda cold start doesn't import heavy dependencies before the first client"""
+    times = import_times("import stack_sweeper.lambda_handler")
+    assert "stack_sweeper.lambda_handler" in times
+    assert_no_heavy_modules(times)
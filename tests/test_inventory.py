@@ -0,0 +1,255 @@
+from datetime import datetime
+
+from stack_sweeper import inventory, sharding
+
+from . import stubs
+from .conftest import StubbedClient
+
+
+def test_load(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory.load()"""
+    details = [
+        stubs.generate_stack_detail("stack-one"),
+        stubs.generate_stack_detail("stack-two"),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    changes = stack_inventory.load()
+    assert len(stack_inventory) == 2
+    assert details[0]["StackId"] in stack_inventory
+    assert [stack.name for stack in stack_inventory] == ["stack-one", "stack-two"]
+    assert changes.added == [details[0]["StackId"], details[1]["StackId"]]
+    assert not changes.updated
+    assert not changes.removed
+
+
+def test_refresh_loads_when_empty(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory.refresh() performs a full load the first time"""
+    stubs.stub_describe_stacks(
+        fake_cloudformation_client.stub, [stubs.generate_stack_detail("stack-one")]
+    )
+
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.refresh()
+    assert len(stack_inventory) == 1
+    assert stack_inventory.loaded
+
+
+def test_refresh_incremental(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory.refresh() only describes new and updated stacks"""
+    unchanged = stubs.generate_stack_detail("unchanged")
+    deleting = stubs.generate_stack_detail("deleting")
+    updated = stubs.generate_stack_detail("updated")
+    removed = stubs.generate_stack_detail("removed")
+    stubs.stub_describe_stacks(
+        fake_cloudformation_client.stub, [unchanged, deleting, updated, removed]
+    )
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+
+    updated = stubs.generate_stack_detail(
+        "updated", {"New": "Tag"}, last_updated_at=datetime(2020, 2, 1)
+    )
+    added = stubs.generate_stack_detail("added")
+    nested = dict(stubs.generate_stack_detail("nested"), ParentId=added["StackId"])
+    vanished = stubs.generate_stack_detail("vanished")
+    deleting["StackStatus"] = "DELETE_IN_PROGRESS"
+    stubs.stub_list_stacks(
+        fake_cloudformation_client.stub,
+        [unchanged, deleting, updated, added, nested, vanished],
+    )
+    stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, updated)
+    stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, added)
+    stubs.stub_describe_stack_missing(
+        fake_cloudformation_client.stub, vanished["StackId"]
+    )
+
+    changes = stack_inventory.refresh()
+    assert changes.added == [added["StackId"]]
+    assert changes.updated == [updated["StackId"]]
+    assert changes.removed == [removed["StackId"]]
+    assert [stack.name for stack in stack_inventory] == [
+        "unchanged",
+        "deleting",
+        "updated",
+        "added",
+    ]
+    assert stack_inventory.get(updated["StackId"]).tags == {"New": "Tag"}
+
+    # status changes are picked up without describing the stack again
+    assert stack_inventory.get(deleting["StackId"]).stack_status == "DELETE_IN_PROGRESS"
+
+
+def test_updated_before(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory.updated_before() selects stacks from the sorted index"""
+    details = [
+        stubs.generate_stack_detail("newest", last_updated_at=datetime(2020, 3, 1)),
+        stubs.generate_stack_detail("oldest", last_updated_at=datetime(2020, 1, 1)),
+        stubs.generate_stack_detail("middle", last_updated_at=datetime(2020, 2, 1)),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+
+    def names_updated_before(cutoff: datetime):
+        return [stack.name for stack in stack_inventory.updated_before(cutoff)]
+
+    assert names_updated_before(datetime(2019, 12, 31)) == []
+    assert names_updated_before(datetime(2020, 1, 1)) == ["oldest"]
+    assert names_updated_before(datetime(2020, 2, 15)) == ["oldest", "middle"]
+    assert names_updated_before(datetime(2021, 1, 1)) == ["oldest", "middle", "newest"]
+
+    # the index is rebuilt when the inventory changes
+    stack_inventory.discard(details[1]["StackId"])
+    assert names_updated_before(datetime(2021, 1, 1)) == ["middle", "newest"]
+
+    details[1]["LastUpdatedTime"] = datetime(2020, 4, 1)
+    stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, details[1])
+    stack_inventory.refresh_stack(details[1]["StackId"])
+    assert names_updated_before(datetime(2021, 1, 1)) == ["middle", "newest", "oldest"]
+
+
+def test_tagged(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory.tagged() and Inventory.tag_values() use an inverted tag index"""
+    details = [
+        stubs.generate_stack_detail("team-a", tags={"Team": "a", "Ignore": "yes"}),
+        stubs.generate_stack_detail("team-b", tags={"Team": "b"}),
+        stubs.generate_stack_detail("untagged"),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+    team_a, team_b, untagged = [detail["StackId"] for detail in details]
+
+    assert stack_inventory.tagged("Team") == {team_a, team_b}
+    assert stack_inventory.tagged("Team", "b") == {team_b}
+    assert stack_inventory.tagged("Team", "c") == set()
+    assert stack_inventory.tagged("Ignore") == {team_a}
+    assert stack_inventory.tag_values("Team") == {"a": {team_a}, "b": {team_b}}
+
+    # the index is rebuilt when the inventory changes
+    stack_inventory.discard(team_a)
+    assert stack_inventory.tagged("Team") == {team_b}
+
+    details[2]["Tags"] = [{"Key": "Team", "Value": "b"}]
+    stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, details[2])
+    stack_inventory.refresh_stack(untagged)
+    assert stack_inventory.tagged("Team", "b") == {team_b, untagged}
+
+
+def test_shard(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory only keeps the stacks its shard owns"""
+    details = [stubs.generate_stack_detail(f"stack-{i}") for i in range(10)]
+    shard = sharding.Shard(1, 2)
+    owned = [
+        detail["StackId"] for detail in details if shard.includes(detail["StackId"])
+    ]
+    assert 0 < len(owned) < len(details)
+
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client, shard)
+    stack_inventory.load()
+    assert [stack.stack_id for stack in stack_inventory] == owned
+
+    # stacks owned by other shards aren't described
+    new_details = [stubs.generate_stack_detail(f"new-stack-{i}") for i in range(10)]
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, details + new_details)
+    for detail in new_details:
+        if shard.includes(detail["StackId"]):
+            stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, detail)
+
+    changes = stack_inventory.refresh()
+    assert all(shard.includes(stack_id) for stack_id in changes.added)
+    assert len(stack_inventory) == len(owned) + len(changes.added)
+
+    # nor are they refreshed by events
+    not_owned = next(
+        detail["StackId"] for detail in details if not shard.includes(detail["StackId"])
+    )
+    assert stack_inventory.refresh_stack(not_owned) is None
+
+
+def test_load_stack_statuses(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory.load() only describes stacks in the inventory's statuses"""
+    failed = stubs.generate_stack_detail("failed", status="ROLLBACK_COMPLETE")
+    nested = dict(
+        stubs.generate_stack_detail("nested", status="ROLLBACK_COMPLETE"),
+        ParentId=failed["StackId"],
+    )
+    vanished = stubs.generate_stack_detail("vanished", status="ROLLBACK_COMPLETE")
+    stubs.stub_list_stacks(
+        fake_cloudformation_client.stub,
+        [failed, nested, vanished],
+        ["ROLLBACK_COMPLETE"],
+    )
+    stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, failed)
+    stubs.stub_describe_stack_missing(
+        fake_cloudformation_client.stub, vanished["StackId"]
+    )
+
+    stack_inventory = inventory.Inventory(
+        fake_cloudformation_client.client, stack_statuses=["ROLLBACK_COMPLETE"]
+    )
+    stack_inventory.load()
+    assert [stack.name for stack in stack_inventory] == ["failed"]
+
+    # refreshes are limited to the same statuses
+    stubs.stub_list_stacks(
+        fake_cloudformation_client.stub, [failed], ["ROLLBACK_COMPLETE"]
+    )
+    assert not any(stack_inventory.refresh())
+
+
+def test_load_stack_statuses_without_tags(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory.load() uses the listed summaries when no tags are needed"""
+    failed = stubs.generate_stack_detail("failed", status="ROLLBACK_COMPLETE")
+    stubs.stub_list_stacks(
+        fake_cloudformation_client.stub, [failed], ["ROLLBACK_COMPLETE"]
+    )
+
+    stack_inventory = inventory.Inventory(
+        fake_cloudformation_client.client,
+        stack_statuses=["ROLLBACK_COMPLETE"],
+        tag_keys=set(),
+    )
+    stack_inventory.load()
+    assert [stack.name for stack in stack_inventory] == ["failed"]
+    assert stack_inventory.get(failed["StackId"]).stack_status == "ROLLBACK_COMPLETE"
+
+
+def test_load_stack_statuses_many(
+    fake_cloudformation_client: StubbedClient, monkeypatch
+):
+    """Tests Inventory.load() pages through every stack when many stacks match"""
+    monkeypatch.setattr(inventory, "DESCRIBE_EACH_LIMIT", 1)
+    failed = [
+        stubs.generate_stack_detail(name, status="ROLLBACK_COMPLETE")
+        for name in ["failed-one", "failed-two"]
+    ]
+    complete = stubs.generate_stack_detail("complete")
+    stubs.stub_list_stacks(
+        fake_cloudformation_client.stub, failed, ["ROLLBACK_COMPLETE"]
+    )
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, [*failed, complete])
+
+    stack_inventory = inventory.Inventory(
+        fake_cloudformation_client.client, stack_statuses=["ROLLBACK_COMPLETE"]
+    )
+    stack_inventory.load()
+    assert [stack.name for stack in stack_inventory] == ["failed-one", "failed-two"]
+
+
+def test_load_prefetched(fake_cloudformation_client: StubbedClient):
+    """Tests Inventory.load() with pages prefetched"""
+    details = [
+        stubs.generate_stack_detail("stack-one"),
+        stubs.generate_stack_detail("stack-two"),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+
+    stack_inventory = inventory.Inventory(
+        fake_cloudformation_client.client, prefetch_pages=2
+    )
+    stack_inventory.load()
+    assert [stack.name for stack in stack_inventory] == ["stack-one", "stack-two"]
@@ -0,0 +1,249 @@
+# pylint:disable=redefined-outer-name,unused-argument
+from datetime import datetime
+
+import pytest
+from dateutil.tz import tzutc
+
+from stack_sweeper import clients, lambda_handler, leases
+
+from . import stubs
+from .conftest import StubbedClient
+
+OPTIONS = {"stack_update_age": 30, "exclude_stacks": ["kept"], "delete": True}
+
+
+class FakeContext:
+    """A Lambda context whose remaining time drops by `step_millis` every time it's checked"""
+
+    def __init__(self, remaining_millis: int, step_millis: int = 0):
+        self.remaining_millis = remaining_millis
+        self.step_millis = step_millis
+
+    def get_remaining_time_in_millis(self) -> int:
+        """The time remaining in this invocation"""
+        remaining_millis = self.remaining_millis
+        self.remaining_millis -= self.step_millis
+        return remaining_millis
+
+
+@pytest.fixture
+def lambda_cloudformation(
+    fake_cloudformation_client: StubbedClient, monkeypatch
+) -> StubbedClient:
+    """Provides the handler with a stubbed CloudFormation client"""
+    monkeypatch.setattr(
+        clients, "get_client", lambda *args, **kwargs: fake_cloudformation_client.client
+    )
+    return fake_cloudformation_client
+
+
+def test_options_to_args():
+    """Tests lambda_handler.options_to_args()"""
+    assert lambda_handler.options_to_args(OPTIONS) == [
+        "--stack-update-age",
+        "30",
+        "--exclude-stacks",
+        "kept",
+        "--delete",
+    ]
+    assert not lambda_handler.options_to_args({"delete": False, "limit": None})
+
+
+def test_parse_options():
+    """Tests lambda_handler.parse_options() never waits, and rejects options it doesn't support"""
+    args = lambda_handler.parse_options(
+        {**OPTIONS, "lease_store": "sqlite:///leases.db", "lease_seconds": 60}
+    )
+    assert args.delete
+    assert not args.wait
+    assert args.lease_store == "sqlite:///leases.db"
+
+    with pytest.raises(ValueError):
+        lambda_handler.parse_options({"delete": True})
+
+    for option, value in [
+        ("daemon", True),
+        ("apply", "plan.json"),
+        ("policies", "policies.json"),
+        ("state", "ssm:///stack-sweeper"),
+        ("snapshot_out", "inventory.snapshot"),
+        ("record", "recording.jsonl"),
+        ("explain", True),
+        ("async_logging", True),
+    ]:
+        with pytest.raises(ValueError, match=option):
+            lambda_handler.parse_options({**OPTIONS, option: value})
+
+
+def test_handler_dry_run(lambda_cloudformation: StubbedClient):
+    """Tests lambda_handler.handler() reports the selected stacks without deleting them"""
+    details = [
+        stubs.generate_stack_detail(
+            name, last_updated_at=datetime(2020, 1, 1, tzinfo=tzutc())
+        )
+        for name in ["old", "kept"]
+    ]
+    stubs.stub_describe_stacks(lambda_cloudformation.stub, details)
+
+    result = lambda_handler.handler(
+        {"options": {**OPTIONS, "delete": False}}, FakeContext(60_000)
+    )
+    assert result == {
+        "selected": [details[0]["StackId"]],
+        "deleted": [],
+        "failed": [],
+        "continuation": None,
+    }
+
+
+def test_handler_continuation(lambda_cloudformation: StubbedClient, sleepless):
+    """Tests lambda_handler.handler() stops as time runs out, and continues from its token"""
+    details = [
+        stubs.generate_stack_detail(
+            name, last_updated_at=datetime(2020, 1, 1, tzinfo=tzutc())
+        )
+        for name in ["first", "second"]
+    ]
+    first_id, second_id = [detail["StackId"] for detail in details]
+    stub = lambda_cloudformation.stub
+
+    # the first invocation only has time to start one deletion
+    stubs.stub_describe_stacks(stub, details)
+    stubs.stub_describe_stack_detail(stub, details[0])
+    stubs.stub_delete_stack(stub, first_id)
+    stubs.stub_describe_stack_detail(
+        stub, {**details[0], "StackStatus": "DELETE_IN_PROGRESS"}
+    )
+
+    result = lambda_handler.handler(
+        {"options": OPTIONS, "reserve_seconds": 0}, FakeContext(10_000, 4_000)
+    )
+    assert result["selected"] == [first_id, second_id]
+    assert not result["deleted"]
+    assert result["continuation"] == {"pending": [second_id], "deleting": [first_id]}
+
+    # the next picks up where it stopped, without another inventory, describing each
+    # pending stack again just before deleting it
+    stubs.stub_describe_stack_detail(
+        stub, {**details[0], "StackStatus": "DELETE_IN_PROGRESS"}
+    )
+    stubs.stub_describe_stack_detail(
+        stub, {**details[0], "StackStatus": "DELETE_COMPLETE"}
+    )
+    stubs.stub_describe_stack_detail(stub, details[1])
+    stubs.stub_delete_stack(stub, second_id)
+    stubs.stub_describe_stack_missing(stub, second_id)
+
+    result = lambda_handler.handler(
+        {"options": OPTIONS, "continuation": result["continuation"]},
+        FakeContext(60_000),
+    )
+    assert not result["selected"]
+    assert result["deleted"] == [first_id, second_id]
+    assert not result["continuation"]
+
+
+def test_handler_retries(lambda_cloudformation: StubbedClient, sleepless):
+    """Tests lambda_handler.handler() skips changed stacks, and retries failed deletions"""
+    changed, stuck = [
+        stubs.generate_stack_detail(
+            name, last_updated_at=datetime(2020, 1, 1, tzinfo=tzutc())
+        )
+        for name in ["changed", "stuck"]
+    ]
+    stub = lambda_cloudformation.stub
+    options = {**OPTIONS, "delete_retries": 1, "retain_failed_resources": True}
+    continuation = {"pending": [changed["StackId"], stuck["StackId"]], "deleting": []}
+
+    # the changed stack was updated since it was selected, and the stuck stack fails
+    stubs.stub_describe_stack_detail(
+        stub, {**changed, "LastUpdatedTime": datetime.now(tz=tzutc())}
+    )
+    stubs.stub_describe_stack_detail(stub, stuck)
+    stubs.stub_delete_stack(stub, stuck["StackId"])
+    stubs.stub_describe_stack_detail(stub, {**stuck, "StackStatus": "DELETE_FAILED"})
+    stubs.stub_describe_stack_delete_failed_events(stub, stuck["StackId"], ["Bucket"])
+
+    result = lambda_handler.handler(
+        {"options": options, "continuation": continuation, "reserve_seconds": 0},
+        FakeContext(10_000, 3_000),
+    )
+    assert not result["deleted"]
+    assert not result["failed"]
+    assert result["continuation"] == {
+        "pending": [stuck["StackId"]],
+        "deleting": [],
+        "attempts": {stuck["StackId"]: 2},
+    }
+
+    # its final attempt retains the resources that failed to delete
+    stubs.stub_describe_stack_detail(stub, {**stuck, "StackStatus": "DELETE_FAILED"})
+    stubs.stub_describe_stack_delete_failed_events(stub, stuck["StackId"], ["Bucket"])
+    stubs.stub_delete_stack(stub, stuck["StackId"], ["Bucket"])
+    stubs.stub_describe_stack_missing(stub, stuck["StackId"])
+
+    result = lambda_handler.handler(
+        {"options": options, "continuation": result["continuation"]},
+        FakeContext(60_000),
+    )
+    assert result["deleted"] == [stuck["StackId"]]
+    assert not result["continuation"]
+
+
+def test_handler_leases(lambda_cloudformation: StubbedClient, sleepless, tmp_path):
+    """Tests lambda_handler.handler() skips stacks leased by another sweeper"""
+    held, free = [
+        stubs.generate_stack_detail(
+            name, last_updated_at=datetime(2020, 1, 1, tzinfo=tzutc())
+        )
+        for name in ["held", "free"]
+    ]
+    url = f"sqlite:///{tmp_path / 'leases.db'}"
+    store = leases.get_lease_store(url)
+    assert store.acquire(held["StackId"], "another-sweeper", 600)
+    stub = lambda_cloudformation.stub
+
+    # the held stack isn't deleted, and the free one is deleted under its lease
+    stubs.stub_describe_stack_detail(stub, held)
+    stubs.stub_describe_stack_detail(stub, free)
+    stubs.stub_delete_stack(stub, free["StackId"])
+    stubs.stub_describe_stack_detail(
+        stub, {**free, "StackStatus": "DELETE_IN_PROGRESS"}
+    )
+
+    result = lambda_handler.handler(
+        {
+            "options": {**OPTIONS, "lease_store": url},
+            "continuation": {
+                "pending": [held["StackId"], free["StackId"]],
+                "deleting": [],
+            },
+            "reserve_seconds": 0,
+        },
+        FakeContext(10_000, 3_000),
+    )
+    assert not result["deleted"]
+    owner = result["continuation"]["lease_owner"]
+    assert result["continuation"] == {
+        "pending": [],
+        "deleting": [free["StackId"]],
+        "lease_owner": owner,
+    }
+    assert not store.acquire(free["StackId"], "another-sweeper", 600)
+
+    # the next invocation keeps the lease, and releases it once the stack is deleted
+    stubs.stub_describe_stack_detail(
+        stub, {**free, "StackStatus": "DELETE_IN_PROGRESS"}
+    )
+    stubs.stub_describe_stack_missing(stub, free["StackId"])
+
+    result = lambda_handler.handler(
+        {
+            "options": {**OPTIONS, "lease_store": url},
+            "continuation": result["continuation"],
+        },
+        FakeContext(60_000),
+    )
+    assert result["deleted"] == [free["StackId"]]
+    assert not result["continuation"]
+    assert store.acquire(free["StackId"], "another-sweeper", 600)
@@ -2,7 +2,9 @@ from datetime import datetime, timedelta
 
 from dateutil.tz import tzutc
 
-from stack_sweeper import cloudformation, last_updated_strategy
+from stack_sweeper import cloudformation, inventory, last_updated_strategy
+
+from . import stubs
 
 
 def test_expiration_not_valid(stack: cloudformation.Stack):
@@ -80,3 +82,43 @@ def test_get_mark_reason(stack: cloudformation.Stack):
     assert "last updated 8 days ago (threshold: 7 days" in strategy.get_mark_reason(
         stack
     )
+
+
+def test_evaluate(stack: cloudformation.Stack):
+    """Tests LastUpdatedStrategy.evaluate()"""
+    strategy = last_updated_strategy.LastUpdatedStrategy(
+        timedelta(days=7), datetime(2020, 1, 9, 9, 0, 0, tzinfo=tzutc())
+    )
+
+    stack.last_updated_at = datetime(2020, 1, 8, 9, 0, 0, tzinfo=tzutc())
+    decision = strategy.evaluate(stack)
+    assert not decision.remove
+    assert not decision.reasons
+
+    stack.last_updated_at = datetime(2020, 1, 1, 9, 0, 0, tzinfo=tzutc())
+    decision = strategy.evaluate(stack)
+    assert decision.remove
+    assert "last updated 8 days ago" in decision.reasons[0]
+
+    # evaluating must not mark the stack
+    assert not stack.marked_by_strategies
+
+
+def test_candidates(fake_cloudformation_client):
+    """Tests LastUpdatedStrategy.candidates() uses the inventory's last updated index"""
+    details = [
+        stubs.generate_stack_detail(
+            "old", last_updated_at=datetime(2020, 1, 1, tzinfo=tzutc())
+        ),
+        stubs.generate_stack_detail(
+            "new", last_updated_at=datetime(2020, 1, 5, tzinfo=tzutc())
+        ),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+
+    strategy = last_updated_strategy.LastUpdatedStrategy(
+        timedelta(days=7), datetime(2020, 1, 8, 0, 0, 0, tzinfo=tzutc())
+    )
+    assert strategy.candidates(stack_inventory) == {details[0]["StackId"]}
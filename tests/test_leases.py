@@ -0,0 +1,148 @@
+# pylint:disable=redefined-outer-name
+import threading
+import time
+from unittest.mock import ANY
+
+import boto3  # type: ignore
+import pytest
+from botocore.stub import Stubber  # type: ignore
+
+from stack_sweeper import leases
+
+from .conftest import StubbedClient
+
+
+@pytest.fixture
+def fake_dynamodb_client() -> StubbedClient:  # type: ignore
+    """Creates a stubbed boto3 DynamoDB client"""
+    dynamodb_client = boto3.client("dynamodb")
+    with Stubber(dynamodb_client) as stubbed_client:
+        yield StubbedClient(stubbed_client, dynamodb_client)
+        stubbed_client.assert_no_pending_responses()
+
+
+def test_sqlite_lease_store(tmp_path):
+    """Tests SqliteLeaseStore grants exclusive leases, and can take over expired leases"""
+    url = f"sqlite:///{tmp_path / 'leases.db'}"
+    store = leases.get_lease_store(url)
+    other_store = leases.get_lease_store(url)  # e.g. another sweeper on the same host
+
+    assert store.acquire("stack-one", "sweeper-a", 60)
+    assert not other_store.acquire("stack-one", "sweeper-b", 60)
+    assert store.acquire("stack-one", "sweeper-a", 60)  # renewing
+
+    # releasing only releases your own leases
+    other_store.release("stack-one", "sweeper-b")
+    assert not other_store.acquire("stack-one", "sweeper-b", 60)
+    store.release("stack-one", "sweeper-a")
+    assert other_store.acquire("stack-one", "sweeper-b", 0.01)
+
+    # expired leases can be taken over
+    time.sleep(0.02)
+    assert store.acquire("stack-one", "sweeper-a", 60)
+
+
+def test_dynamodb_lease_store(fake_dynamodb_client: StubbedClient):
+    """Tests DynamoDBLeaseStore takes leases with conditional writes"""
+    store = leases.DynamoDBLeaseStore(fake_dynamodb_client.client, "leases")
+    expected_put = {
+        "TableName": "leases",
+        "Item": {
+            "key": {"S": "stack-one"},
+            "owner": {"S": "sweeper-a"},
+            "expires_at": ANY,
+        },
+        "ConditionExpression": ANY,
+        "ExpressionAttributeNames": ANY,
+        "ExpressionAttributeValues": ANY,
+    }
+    fake_dynamodb_client.stub.add_response("put_item", {}, expected_put)
+    assert store.acquire("stack-one", "sweeper-a", 60)
+
+    fake_dynamodb_client.stub.add_client_error(
+        "put_item", "ConditionalCheckFailedException", expected_params=expected_put
+    )
+    assert not store.acquire("stack-one", "sweeper-a", 60)
+
+    fake_dynamodb_client.stub.add_client_error(
+        "delete_item", "ConditionalCheckFailedException"
+    )
+    store.release("stack-one", "sweeper-a")
+
+
+def test_get_lease_store():
+    """Tests leases.get_lease_store() parses lease store URLs"""
+    store = leases.get_lease_store("dynamodb://leases", "ap-southeast-2")
+    assert isinstance(store, leases.DynamoDBLeaseStore)
+    assert store.table_name == "leases"
+
+    store = leases.get_lease_store("dynamodb+http://localhost:8000/leases")
+    assert isinstance(store, leases.DynamoDBLeaseStore)
+    assert store.table_name == "leases"
+    assert store.dynamodb.meta.endpoint_url == "http://localhost:8000"
+
+    with pytest.raises(ValueError):
+        leases.get_lease_store("redis://localhost")
+
+    with pytest.raises(ValueError):
+        leases.get_lease_store("sqlite://leases.db")
+
+    with pytest.raises(TypeError):
+        leases.LeaseStore()  # pylint: disable=abstract-class-instantiated
+
+
+def test_get_sqlite_lease_store(tmp_path, monkeypatch):
+    """Tests sqlite:/// lease store paths are relative, and sqlite://// paths absolute"""
+    monkeypatch.chdir(tmp_path)
+    store = leases.get_lease_store("sqlite:///leases.db")
+    assert store.path == "leases.db"
+    assert (tmp_path / "leases.db").exists()
+
+    store = leases.get_lease_store(f"sqlite:///{tmp_path / 'absolute.db'}")
+    assert store.path == str(tmp_path / "absolute.db")
+
+
+class CountingLeaseStore(leases.LeaseStore):
+    """A lease store that grants every lease, counting how often each is taken"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.renewed = threading.Event()
+
+    def acquire(self, key: str, owner: str, seconds: float) -> bool:
+        self.acquired += 1
+        if self.acquired > 1:
+            self.renewed.set()
+
+        return True
+
+    def release(self, key: str, owner: str):
+        pass
+
+
+def test_stack_leases(tmp_path, stack):
+    """Tests StackLeases skips stacks leased by another sweeper"""
+    store = leases.get_lease_store(f"sqlite:///{tmp_path / 'leases.db'}")
+    sweeper_a = leases.StackLeases(store, "sweeper-a", 60)
+    sweeper_b = leases.StackLeases(store, "sweeper-b", 60)
+
+    assert sweeper_a.acquire(stack)
+    assert not sweeper_b.acquire(stack)
+    with sweeper_b.held(stack) as leased:
+        assert not leased
+
+    sweeper_a.release(stack)
+    assert sweeper_b.acquire(stack)
+
+
+def test_stack_leases_heartbeat(stack):
+    """Tests StackLeases.held() renews the lease while it's held, and stops once it isn't"""
+    store = CountingLeaseStore()
+    stack_leases = leases.StackLeases(store, "sweeper-a", 0.03)
+    with stack_leases.held(stack) as leased:
+        assert leased
+        assert store.renewed.wait(5)
+
+    renewals = store.acquired
+    time.sleep(0.05)
+    assert store.acquired == renewals
@@ -35,3 +35,26 @@ def test_str():
 
     strategy = limited_strategy.LimitedStrategy(30, AlwaysTrueStrategy())
     assert str(strategy) == "LimitedStrategy(30, nested_strategy=AlwaysTrueStrategy)"
+
+
+def test_evaluate_and_finalise(stack: cloudformation.Stack):
+    """Tests LimitedStrategy.evaluate() and LimitedStrategy.finalise()"""
+    strategy = limited_strategy.LimitedStrategy(2, AlwaysTrueStrategy())
+
+    # evaluate ignores the limit, and does not count
+    decisions = [strategy.evaluate(stack) for _ in range(5)]
+    assert all(decision.remove for decision in decisions)
+    assert strategy.processed == 0
+
+    # the limit is applied over the whole selection
+    finalised = strategy.finalise(decisions)
+    assert [decision.remove for decision in finalised] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+    # finalising is repeatable, because no state is kept
+    assert strategy.finalise(decisions) == finalised
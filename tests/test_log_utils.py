@@ -0,0 +1,21 @@
+import logging
+import queue
+
+from stack_sweeper import log_utils
+
+
+def test_bounded_queue_handler():
+    """Tests BoundedQueueHandler drops records, rather than blocking, once its queue is full"""
+    handler = log_utils.BoundedQueueHandler(queue.Queue(2))
+    logger = logging.getLogger("test_bounded_queue_handler")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    for index in range(5):
+        logger.warning("message %d", index)
+
+    assert handler.dropped == 3
+    assert [handler.queue.get_nowait().getMessage() for _ in range(2)] == [
+        "message 0",
+        "message 1",
+    ]
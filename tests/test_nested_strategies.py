@@ -1,6 +1,12 @@
-from stack_sweeper import cloudformation, nested_strategies
+from stack_sweeper import cloudformation, decision, inventory, nested_strategies
+from stack_sweeper.limited_strategy import LimitedStrategy
 
-from .conftest import AlwaysFalseStrategy, AlwaysTrueStrategy
+from .conftest import (
+    AlwaysFalseStrategy,
+    AlwaysTrueStrategy,
+    CandidateStrategy,
+    ReasonedStrategy,
+)
 
 
 def test_nested_all_strategy(stack: cloudformation.Stack):
@@ -64,3 +70,100 @@ def test_str():
         str(strategy)
         == "NestedAnyStrategy(nested_strategies=[AlwaysTrueStrategy, AlwaysFalseStrategy])"
     )
+
+
+def test_nested_evaluate_reasons(stack: cloudformation.Stack):
+    """Tests nested strategies combine the reasons from their nested strategies"""
+    strategy = nested_strategies.NestedAllStrategy(
+        [ReasonedStrategy("one"), AlwaysTrueStrategy(), ReasonedStrategy("two")]
+    )
+    decision = strategy.evaluate(stack)
+    assert decision.remove
+    assert decision.reasons == ("one", "two")
+
+    strategy = nested_strategies.NestedAllStrategy(
+        [ReasonedStrategy("one"), AlwaysFalseStrategy()]
+    )
+    decision = strategy.evaluate(stack)
+    assert not decision.remove
+    assert not decision.reasons
+
+    strategy = nested_strategies.NestedAnyStrategy(
+        [AlwaysFalseStrategy(), ReasonedStrategy("one"), ReasonedStrategy("two")]
+    )
+    decision = strategy.evaluate(stack)
+    assert decision.remove
+    assert decision.reasons == ("one",)
+
+
+def test_nested_candidates():
+    """Tests nested strategies combine the candidates of their nested strategies"""
+    stack_inventory = inventory.Inventory(None)
+
+    strategy = nested_strategies.NestedAllStrategy(
+        [
+            CandidateStrategy({"a", "b"}),
+            AlwaysTrueStrategy(),
+            CandidateStrategy({"b", "c"}),
+        ]
+    )
+    assert strategy.candidates(stack_inventory) == {"b"}
+    assert (
+        nested_strategies.NestedAllStrategy([AlwaysTrueStrategy()]).candidates(
+            stack_inventory
+        )
+        is None
+    )
+
+    strategy = nested_strategies.NestedAnyStrategy(
+        [CandidateStrategy({"a", "b"}), CandidateStrategy({"b", "c"})]
+    )
+    assert strategy.candidates(stack_inventory) == {"a", "b", "c"}
+
+    # any strategy that can't rule stacks out means every stack must be evaluated
+    strategy = nested_strategies.NestedAnyStrategy(
+        [CandidateStrategy({"a"}), AlwaysTrueStrategy()]
+    )
+    assert strategy.candidates(stack_inventory) is None
+
+
+def test_nested_finalise(stack: cloudformation.Stack):
+    """Tests nested strategies apply the limits of their nested strategies"""
+    strategy = nested_strategies.NestedAllStrategy(
+        [AlwaysTrueStrategy(), LimitedStrategy(2, ReasonedStrategy("one"))]
+    )
+    decisions = [strategy.evaluate(stack) for _ in range(4)]
+    assert [finalised.remove for finalised in strategy.finalise(decisions)] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+
+    # each nested strategy only limits the stacks it selected
+    strategy = nested_strategies.NestedAnyStrategy(
+        [LimitedStrategy(1, ReasonedStrategy("one")), ReasonedStrategy("two")]
+    )
+    assert strategy.constrains_selection()
+    assert not nested_strategies.NestedAnyStrategy(
+        [AlwaysTrueStrategy()]
+    ).constrains_selection()
+    decisions = [strategy.evaluate(stack) for _ in range(3)]
+    assert [finalised.reasons for finalised in strategy.finalise(decisions)] == [
+        ("one",),
+        ("two",),
+        ("two",),
+    ]
+
+    strategy = nested_strategies.NestedAnyStrategy(
+        [LimitedStrategy(1, ReasonedStrategy("one")), AlwaysFalseStrategy()]
+    )
+    decisions = [strategy.evaluate(stack) for _ in range(3)] + [
+        decision.Decision(stack, False)
+    ]
+    assert [finalised.remove for finalised in strategy.finalise(decisions)] == [
+        True,
+        False,
+        False,
+        False,
+    ]
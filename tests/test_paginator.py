@@ -0,0 +1,52 @@
+# pylint:disable=redefined-outer-name
+import pytest
+from botocore.exceptions import ClientError  # type: ignore
+
+from stack_sweeper import paginator
+
+from . import stubs
+from .conftest import StubbedClient
+
+
+def stub_pages(stubber, pages: int):
+    """Stubs describe_stacks responses, one stack per page"""
+    for page in range(pages):
+        response = {"Stacks": [stubs.generate_stack_detail(f"stack-{page}")]}
+        expected_params = {"NextToken": f"page-{page}"} if page else {}
+        if page < pages - 1:
+            response["NextToken"] = f"page-{page + 1}"
+
+        stubber.add_response("describe_stacks", response, expected_params)
+
+
+def test_paginate_prefetched(fake_cloudformation_client: StubbedClient):
+    """Tests paginator.paginate_prefetched() yields every page's results, in order"""
+    stub_pages(fake_cloudformation_client.stub, 5)
+    stacks = paginator.paginate_prefetched(
+        fake_cloudformation_client.client.describe_stacks, 1
+    )
+    assert [stack["StackName"] for stack in stacks] == [
+        f"stack-{page}" for page in range(5)
+    ]
+
+
+def test_paginate_prefetched_error(fake_cloudformation_client: StubbedClient):
+    """Tests paginator.paginate_prefetched() raises errors from the background thread"""
+    fake_cloudformation_client.stub.add_client_error("describe_stacks", "Throttling")
+
+    with pytest.raises(ClientError):
+        list(
+            paginator.paginate_prefetched(
+                fake_cloudformation_client.client.describe_stacks
+            )
+        )
+
+
+def test_paginate_prefetched_closed(fake_cloudformation_client: StubbedClient):
+    """Tests paginator.paginate_prefetched() stops fetching when closed early"""
+    stub_pages(fake_cloudformation_client.stub, 1)
+    stacks = paginator.paginate_prefetched(
+        fake_cloudformation_client.client.describe_stacks, 1
+    )
+    assert next(stacks)["StackName"] == "stack-0"
+    stacks.close()
@@ -0,0 +1,98 @@
+# pylint:disable=redefined-outer-name
+from datetime import datetime
+
+import pytest
+from dateutil.tz import tzutc
+
+from stack_sweeper import cloudformation, decision, plan
+
+from . import stubs
+from .conftest import StubbedClient
+
+
+def make_stack(client, stack_detail) -> cloudformation.Stack:
+    """Create a Stack object from a generated stack detail"""
+    return cloudformation.Stack.factory_from_stack_detail(client, stack_detail)
+
+
+def test_stack_fingerprint(fake_cloudformation_client: StubbedClient):
+    """Tests plan.stack_fingerprint() changes with anything a strategy could use"""
+    client = fake_cloudformation_client.client
+    detail = stubs.generate_stack_detail("stack", {"expiry": "2020-01-01"})
+    fingerprint = plan.stack_fingerprint(make_stack(client, detail))
+    assert fingerprint == plan.stack_fingerprint(make_stack(client, detail))
+
+    retagged = stubs.generate_stack_detail("stack", {"expiry": "2030-01-01"})
+    assert fingerprint != plan.stack_fingerprint(make_stack(client, retagged))
+
+    updated = stubs.generate_stack_detail(
+        "stack",
+        {"expiry": "2020-01-01"},
+        last_updated_at=datetime(2020, 6, 1, tzinfo=tzutc()),
+    )
+    assert fingerprint != plan.stack_fingerprint(make_stack(client, updated))
+
+
+def test_write_and_read_plan(fake_cloudformation_client: StubbedClient, tmp_path):
+    """Tests plan.create_plan(), plan.write_plan() and plan.read_plan() round trip"""
+    client = fake_cloudformation_client.client
+    stacks = [
+        make_stack(client, stubs.generate_stack_detail(name)) for name in ["one", "two"]
+    ]
+    deletion_plan = plan.create_plan(
+        [decision.Decision(stacks[0], True, ("expired",))], "ap-southeast-2"
+    )
+    assert deletion_plan["stacks"] == [
+        {
+            "stack_id": stacks[0].stack_id,
+            "name": "one",
+            "fingerprint": plan.stack_fingerprint(stacks[0]),
+            "reasons": ["expired"],
+        }
+    ]
+
+    path = str(tmp_path / "plan.json")
+    plan.write_plan(path, deletion_plan)
+    assert plan.read_plan(path) == deletion_plan
+
+
+def test_read_plan_version(tmp_path):
+    """Tests plan.read_plan() refuses plans from other versions"""
+    path = tmp_path / "plan.json"
+    path.write_text('{"version": 0, "stacks": []}')
+
+    with pytest.raises(ValueError, match="not a plan"):
+        plan.read_plan(str(path))
+
+
+def test_check_freshness(fake_cloudformation_client: StubbedClient):
+    """Tests plan.check_freshness() only describes the planned stacks"""
+    client = fake_cloudformation_client.client
+    details = {
+        name: stubs.generate_stack_detail(name, {"expiry": "2020-01-01"})
+        for name in ["fresh", "changed", "deleting", "gone"]
+    }
+    stacks = [make_stack(client, detail) for detail in details.values()]
+    deletion_plan = plan.create_plan(
+        [decision.Decision(stack, True) for stack in stacks], "ap-southeast-2"
+    )
+
+    stubs.stub_describe_stack_detail(fake_cloudformation_client.stub, details["fresh"])
+    stubs.stub_describe_stack_detail(
+        fake_cloudformation_client.stub,
+        stubs.generate_stack_detail("changed", {"expiry": "2030-01-01"}),
+    )
+    stubs.stub_describe_stack_detail(
+        fake_cloudformation_client.stub,
+        stubs.generate_stack_detail(
+            "deleting", {"expiry": "2020-01-01"}, status="DELETE_IN_PROGRESS"
+        ),
+    )
+    stubs.stub_describe_stack_missing(
+        fake_cloudformation_client.stub, details["gone"]["StackId"]
+    )
+
+    check = plan.check_freshness(client, deletion_plan)
+    assert [stack.name for stack in check.fresh] == ["fresh"]
+    assert [stack.name for stack in check.deleting] == ["deleting"]
+    assert check.stale == [details["changed"]["StackId"], details["gone"]["StackId"]]
@@ -0,0 +1,135 @@
+# pylint:disable=redefined-outer-name
+import json
+from argparse import Namespace
+from datetime import datetime
+
+import pytest
+from dateutil.tz import tzutc
+
+from stack_sweeper import cli, cloudformation, policies
+
+from . import stubs
+from .conftest import StubbedClient
+
+POLICIES = {
+    "policies": [
+        {
+            "name": "pull-requests",
+            "stack_prefixes": ["pr-"],
+            "options": {"stack_update_age": 7, "empty_resources": True},
+        },
+        {
+            "name": "features",
+            "stack_prefixes": ["feature-"],
+            "options": {"expiry_tag": "expiry", "limit": 1},
+        },
+        {"name": "default", "options": {"stack_update_age": 90}},
+    ]
+}
+
+
+@pytest.fixture
+def sweep_args() -> Namespace:
+    """A pytest fixture that provides the sweep's own (dry run) options"""
+    return cli.parse_args(["--policies", "policies.json", "--region", "ap-southeast-2"])
+
+
+@pytest.fixture
+def policies_file(tmp_path) -> str:
+    """A pytest fixture that provides a --policies file"""
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps(POLICIES))
+    return str(path)
+
+
+def test_load_policies(policies_file: str, sweep_args: Namespace):
+    """Tests policies.load_policies()"""
+    loaded = policies.load_policies(policies_file, sweep_args, cli.parse_args)
+    assert [policy.name for policy in loaded] == [
+        "pull-requests",
+        "features",
+        "default",
+    ]
+    assert loaded[0].stack_prefixes == ["pr-"]
+    assert loaded[0].args.stack_update_age == 7
+    assert loaded[0].args.empty_resources
+    assert loaded[1].args.limit == 1
+
+    # only the sweep decides whether to delete
+    assert not any(policy.args.delete for policy in loaded)
+
+
+def test_parse_policy_errors(sweep_args: Namespace):
+    """Tests policies.parse_policy() rejects invalid policies"""
+    for policy in [
+        {"options": {"stack_update_age": 7}},
+        {"name": "no-strategy", "options": {}},
+        {"name": "daemon", "options": {"stack_update_age": 7, "daemon": True}},
+        {"name": "region", "options": {"stack_update_age": 7, "region": "us-east-1"}},
+        {"name": "explain", "options": {"stack_update_age": 7, "explain": True}},
+        {"name": "fast", "options": {"stack_update_age": 7, "fast_inventory": True}},
+    ]:
+        with pytest.raises(ValueError):
+            policies.parse_policy(policy, sweep_args, cli.parse_args)
+
+
+def test_parse_policy_inherits(sweep_args: Namespace):
+    """Tests policies take the sweep's deletion options, unless they set their own"""
+    sweep_args.wait = False
+    sweep_args.workers = 4
+    policy = policies.parse_policy(
+        {"name": "inherits", "options": {"stack_update_age": 7}},
+        sweep_args,
+        cli.parse_args,
+    )
+    assert not policy.args.wait
+    assert policy.args.workers == 4
+
+    policy = policies.parse_policy(
+        {"name": "own", "options": {"stack_update_age": 7, "workers": 2}},
+        sweep_args,
+        cli.parse_args,
+    )
+    assert policy.args.workers == 2
+
+    # inherited options are validated with the policy's own
+    with pytest.raises(ValueError):
+        policies.parse_policy(
+            {
+                "name": "empties",
+                "options": {"stack_update_age": 7, "empty_resources": True},
+            },
+            sweep_args,
+            cli.parse_args,
+        )
+
+
+def test_sweep_policies(
+    policies_file: str,
+    sweep_args: Namespace,
+    fake_cloudformation_client: StubbedClient,
+):
+    """Tests policies.sweep_policies() applies each stack's first matching policy"""
+    updated_at = datetime(2020, 1, 1, tzinfo=tzutc())
+    stacks = [
+        cloudformation.Stack.factory_from_stack_detail(
+            fake_cloudformation_client.client,
+            stubs.generate_stack_detail(name, tags, last_updated_at=updated_at),
+        )
+        for name, tags in [
+            ("pr-1", None),
+            ("feature-1", {"expiry": "2020-01-01"}),
+            ("feature-2", {"expiry": "2020-01-01"}),
+            ("feature-3", None),
+            ("baseline", None),
+        ]
+    ]
+
+    results = policies.sweep_policies(
+        policies.load_policies(policies_file, sweep_args, cli.parse_args), stacks
+    )
+    assert [
+        [decision.stack.name for decision in policy_result.result.selected]
+        for policy_result in results
+    ] == [["pr-1"], ["feature-1"], ["baseline"]]
+    assert [policy_result.result.stacks for policy_result in results] == [1, 3, 1]
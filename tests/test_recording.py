@@ -0,0 +1,219 @@
+import logging
+from pathlib import Path
+from typing import Dict, List
+
+import boto3  # type: ignore
+import pytest
+from botocore.awsrequest import AWSResponse  # type: ignore
+
+from stack_sweeper import cli, clients, cloudformation, recording
+
+PAYLOAD = (Path(__file__).parent / "payloads" / "describe_stacks.xml").read_bytes()
+# recorded from another account, so scrubbing can be seen
+FIRST_PAGE = PAYLOAD.replace(b"123456789012", b"987654321098")
+LAST_PAGE = FIRST_PAGE.replace(b"<NextToken>", b"<!--").replace(b"</NextToken>", b"-->")
+STACK_ID = (
+    "arn:aws:cloudformation:ap-southeast-2:987654321098:stack/deleting"
+    "/bd6129c0-de8c-11e9-9c70-0ac26335768c"
+)
+NAMESPACE = "http://cloudformation.amazonaws.com/doc/2010-05-15/"
+
+
+def describe_stack_body(status: str) -> bytes:
+    """A DescribeStacks response for a single stack"""
+    return (
+        f'<DescribeStacksResponse xmlns="{NAMESPACE}"><DescribeStacksResult><Stacks><member>'
+        f"<StackId>{STACK_ID}</StackId><StackName>deleting</StackName>"
+        f"<CreationTime>2024-01-01T00:00:00Z</CreationTime><StackStatus>{status}</StackStatus>"
+        "</member></Stacks></DescribeStacksResult></DescribeStacksResponse>"
+    ).encode("utf-8")
+
+
+def describe_stack_events_body(statuses: List[str]) -> bytes:
+    """A DescribeStackEvents response, with an event for each of the stack's statuses"""
+    events = "".join(
+        f"<member><EventId>event-{index}</EventId><StackId>{STACK_ID}</StackId>"
+        "<StackName>deleting</StackName><LogicalResourceId>deleting</LogicalResourceId>"
+        f"<ResourceStatus>{status}</ResourceStatus>"
+        "<Timestamp>2024-01-01T00:00:00Z</Timestamp></member>"
+        for index, status in reversed(list(enumerate(statuses)))
+    )
+
+    return (
+        f'<DescribeStackEventsResponse xmlns="{NAMESPACE}"><DescribeStackEventsResult>'
+        f"<StackEvents>{events}</StackEvents>"
+        "</DescribeStackEventsResult></DescribeStackEventsResponse>"
+    ).encode("utf-8")
+
+
+class RecordedBody:
+    """A raw HTTP body that streams a canned body"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **_):
+        """Stream the body"""
+        yield self.body
+
+
+def serve(client, bodies: Dict[str, List[bytes]]):
+    """Answer the client's calls to each operation with canned bodies, in order"""
+
+    def send(request, event_name: str, **_):
+        operation = event_name.rsplit(".", 1)[-1]
+        request_text = recording.request_text(request.body)
+        if operation == "DescribeStacks" and "NextToken" in request_text:
+            body = LAST_PAGE
+        else:
+            body = bodies[operation].pop(0)
+
+        return AWSResponse(request.url, 200, {}, RecordedBody(body))
+
+    client.meta.events.register("before-send", send)
+
+
+def new_client():
+    """A CloudFormation client that isn't shared"""
+    return boto3.client("cloudformation", region_name="ap-southeast-2")
+
+
+def record_get_stacks() -> recording.Recorder:
+    """Record get_stacks() paging through two pages of stacks"""
+    recorder = recording.Recorder()
+    client = recorder.attach(new_client())  # before serve, so it sees each request
+    serve(client, {"DescribeStacks": [FIRST_PAGE]})
+    assert len(list(cloudformation.get_stacks(client))) == 4
+
+    return recorder
+
+
+def test_recorder(tmp_path):
+    """Tests recording.Recorder"""
+    recorder = record_get_stacks()
+
+    first, last = recorder.calls
+    assert first.operation == "DescribeStacks"
+    assert first.request == "Action=DescribeStacks&Version=2010-05-15"
+    assert first.status_code == 200
+    assert first.latency > 0
+    assert "987654321098" not in first.body
+    assert recording.SCRUBBED_ACCOUNT_ID in first.body
+    assert "NextToken=dGhlIG5leHQgcGFnZSBvZiBzdGFja3M=" in last.request
+
+    path = str(tmp_path / "recording.json")
+    recorder.save(path)
+    assert recording.load_recording(path) == recorder.calls
+
+
+def test_scrubber():
+    """Tests recording.Scrubber replaces account IDs and extra patterns"""
+    scrubber = recording.Scrubber([(r"preview-[\w-]+", "preview-scrubbed")])
+    assert (
+        scrubber.scrub("arn:aws:sns:ap-southeast-2:987654321098:preview-feature-1234")
+        == "arn:aws:sns:ap-southeast-2:123456789012:preview-scrubbed"
+    )
+    # only whole 12 digit numbers are account IDs
+    assert scrubber.scrub("1234567890123") == "1234567890123"
+
+
+def test_replayer_get_stacks():
+    """Tests cloudformation.get_stacks() against a recording"""
+    replayer = recording.Replayer(record_get_stacks().calls, latency_scale=0)
+    client = replayer.attach(new_client())
+
+    stacks = list(cloudformation.get_stacks(client))
+    assert [stack.name for stack in stacks] == [
+        "preview-feature-1234",
+        "networking",
+        "preview-feature-1234",
+        "networking",
+    ]
+    assert recording.SCRUBBED_ACCOUNT_ID in stacks[0].stack_id
+
+    # a call that wasn't recorded
+    with pytest.raises(recording.ReplayError):
+        client.describe_stacks(StackName="missing")
+
+
+def test_replayer_latency(monkeypatch):
+    """Tests recording.Replayer scales each call's recorded latency"""
+    call = recording.RecordedCall(
+        "DescribeStacks",
+        "Action=DescribeStacks&Version=2010-05-15",
+        200,
+        LAST_PAGE.decode("utf-8"),
+        0.1,
+    )
+    delays: List[float] = []
+    monkeypatch.setattr(recording.time, "sleep", delays.append)
+
+    for latency_scale in [1, 0.5, 0]:
+        client = recording.Replayer([call], latency_scale).attach(new_client())
+        client.describe_stacks()
+
+    assert delays == [0.1, 0.05]
+
+
+def test_replayer_wait(monkeypatch):
+    """Tests replaying Stack.wait() polling a stack until it's deleted"""
+    monkeypatch.setattr(cloudformation.time, "sleep", lambda seconds: None)
+
+    recorder = recording.Recorder()
+    client = recorder.attach(new_client())
+    serve(
+        client,
+        {
+            "DescribeStacks": [
+                describe_stack_body("DELETE_IN_PROGRESS"),
+                describe_stack_body("DELETE_COMPLETE"),
+            ],
+            "DescribeStackEvents": [
+                describe_stack_events_body(["DELETE_IN_PROGRESS"]),
+                describe_stack_events_body(["DELETE_IN_PROGRESS", "DELETE_COMPLETE"]),
+            ],
+        },
+    )
+    stack = cloudformation.Stack(
+        stack_id=STACK_ID, name="deleting", cloudformation=client
+    )
+    assert stack.wait() == "DELETE_COMPLETE"
+    assert len(recorder.calls) == 4
+
+    # the same status checks get each recorded status in turn
+    client = recording.Replayer(recorder.calls, latency_scale=0).attach(new_client())
+    stack = cloudformation.Stack(
+        stack_id=STACK_ID.replace("987654321098", recording.SCRUBBED_ACCOUNT_ID),
+        name="deleting",
+        cloudformation=client,
+    )
+    assert stack.wait() == "DELETE_COMPLETE"
+    assert not stack.failed_resources
+
+
+def test_replay_cli(tmp_path, caplog):
+    """Tests replaying a whole dry run through cli.main()"""
+    path = str(tmp_path / "recording.json")
+    record_get_stacks().save(path)
+
+    caplog.set_level(logging.INFO)
+    try:
+        cli.main(
+            cli.parse_args(
+                [
+                    "--stack-update-age",
+                    "1",
+                    "--replay",
+                    path,
+                    "--replay-latency-scale",
+                    "0",
+                    "--region",
+                    "ap-southeast-2",
+                ]
+            )
+        )
+    finally:
+        clients.clear_clients()  # the shared client was replaying
+
+    # both pages hold the same stacks, so the inventory holds each once
+    assert "2 stacks (of 2) identified for removal" in caplog.text
@@ -0,0 +1,56 @@
+import time
+
+from stack_sweeper import cloudformation, retry_queue
+
+
+def test_schedule(stack: cloudformation.Stack):
+    """Tests RetryQueue.schedule() gives up once attempts are exhausted"""
+    queue = retry_queue.RetryQueue(2, 0)
+    assert queue.schedule(stack, 1, [])
+    assert queue.schedule(stack, 2, [])
+    assert not queue.schedule(stack, 3, [])
+    assert len(queue) == 2
+
+    assert not retry_queue.RetryQueue(0, 0).schedule(stack, 1, [])
+
+
+def test_pop_due(stack: cloudformation.Stack):
+    """Tests RetryQueue.pop_due() only returns due retries, oldest first"""
+    queue = retry_queue.RetryQueue(5, 60)
+    assert queue.seconds_until_due() is None
+
+    queue.schedule(stack, 1, [])
+    assert not queue.pop_due()
+    assert 59 < queue.seconds_until_due() <= 60
+
+    queue = retry_queue.RetryQueue(5, 0.01)
+    queue.schedule(stack, 2, [])  # 0.02 seconds
+    queue.schedule(stack, 1, [])  # 0.01 seconds
+    time.sleep(0.05)
+    assert queue.seconds_until_due() == 0
+    assert [retry.attempt for retry in queue.pop_due()] == [2, 3]
+    assert not queue
+
+
+def test_backoff(stack: cloudformation.Stack):
+    """Tests RetryQueue.schedule() backs off exponentially, up to a maximum"""
+    queue = retry_queue.RetryQueue(10, 100)
+    queue.schedule(stack, 2, [])
+    assert 199 < queue.seconds_until_due() <= 200
+
+    queue = retry_queue.RetryQueue(10, 100)
+    queue.schedule(stack, 9, [])
+    assert queue.seconds_until_due() <= retry_queue.MAX_RETRY_DELAY
+
+
+def test_retain_failed_resources(stack: cloudformation.Stack):
+    """Tests RetryQueue only retains resources on the final attempt, and only if asked"""
+    queue = retry_queue.RetryQueue(2, 0, retain_failed_resources=True)
+    queue.schedule(stack, 1, ["Bucket"])
+    queue.schedule(stack, 2, ["Bucket"])
+    retries = queue.pop_due()
+    assert [retry.retain_resources for retry in retries] == [None, ["Bucket"]]
+
+    queue = retry_queue.RetryQueue(1, 0)
+    queue.schedule(stack, 1, ["Bucket"])
+    assert queue.pop_due()[0].retain_resources is None
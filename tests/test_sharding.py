@@ -0,0 +1,33 @@
+import pytest
+
+from stack_sweeper import sharding
+
+from .conftest import STACK_ID
+
+
+def test_parse_shard():
+    """Tests sharding.parse_shard()"""
+    assert sharding.parse_shard("2/4") == sharding.Shard(2, 4)
+    assert str(sharding.parse_shard("1/1")) == "1/1"
+
+    for value in ["0/4", "5/4", "1", "a/b", "-1/2"]:
+        with pytest.raises(ValueError):
+            sharding.parse_shard(value)
+
+
+def test_includes():
+    """Tests every stack is owned by exactly one shard, and the shards are balanced"""
+    stack_ids = [STACK_ID.replace("MyStack", f"stack-{i}") for i in range(1000)]
+    shards = [sharding.Shard(index, 4) for index in range(1, 5)]
+
+    owners = [
+        [shard for shard in shards if shard.includes(stack_id)]
+        for stack_id in stack_ids
+    ]
+    assert all(len(owner) == 1 for owner in owners)
+
+    for shard in shards:
+        assert 200 < sum(owner == [shard] for owner in owners) < 300
+
+    # the same stack always lands in the same shard
+    assert shards[0].includes(STACK_ID) == sharding.Shard(1, 4).includes(STACK_ID)
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from stack_sweeper import inventory, snapshot
+from stack_sweeper.cloudformation import Stack
+from stack_sweeper.last_updated_strategy import LastUpdatedStrategy
+
+CREATED_AT = datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+STACK_ARN = "arn:aws:cloudformation:ap-southeast-2:123456789012:stack"
+
+
+def make_stacks(count: int):
+    """Stacks sharing a few tag keys and values, as most accounts' stacks do"""
+    return [
+        Stack(
+            {
+                "StackId": f"{STACK_ARN}/preview-{index}/{index:08x}",
+                "StackName": f"preview-{index}",
+                "StackStatus": "UPDATE_COMPLETE" if index % 2 else "CREATE_COMPLETE",
+                "CreationTime": CREATED_AT + timedelta(hours=index),
+                "LastUpdatedTime": CREATED_AT + timedelta(days=index),
+                "Tags": [
+                    {"Key": "team", "Value": ["web", "data", "платформа"][index % 3]},
+                    {"Key": "expiry", "Value": "2024-06-01"},
+                ],
+            }
+        )
+        for index in range(count)
+    ]
+
+
+def test_write_snapshot(tmp_path):
+    """Tests snapshot.write_snapshot() and Snapshot round trip"""
+    path = str(tmp_path / "inventory.snapshot")
+    stacks = make_stacks(5)
+    stacks.append(
+        Stack(
+            {
+                "StackId": "never-updated",
+                "StackName": "never-updated",
+                "StackStatus": "CREATE_COMPLETE",
+                "CreationTime": datetime(2024, 1, 1),  # naive times are UTC
+            }
+        )
+    )
+    snapshot.write_snapshot(path, stacks)
+
+    with snapshot.Snapshot(path) as loaded:
+        assert len(loaded) == 6
+        restored = [Stack(detail) for detail in loaded]
+        for original, copy in zip(stacks[:5], restored):
+            assert copy.stack_id == original.stack_id
+            assert copy.name == original.name
+            assert copy.stack_status == original.stack_status
+            assert copy.created_at == original.created_at
+            assert copy.last_updated_at == original.last_updated_at
+            assert copy.tags == original.tags
+
+        assert restored[2].tags["team"] == "платформа"
+        assert restored[5].tag_list == []
+        assert restored[5].last_updated_at == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_snapshot_interns_strings(tmp_path):
+    """Tests snapshot.write_snapshot() stores each distinct string once"""
+    path = tmp_path / "inventory.snapshot"
+    stacks = make_stacks(1000)
+    snapshot.write_snapshot(str(path), stacks)
+
+    # beyond each stack's ID and name, only fixed-width columns grow with the stack count
+    unique = sum(len(stack.stack_id) + len(stack.name) for stack in stacks)
+    assert path.stat().st_size < unique + 1000 * 64
+
+
+def test_snapshot_detail_changes(tmp_path):
+    """Tests SnapshotDetail keeps changes alongside the snapshot"""
+    path = str(tmp_path / "inventory.snapshot")
+    snapshot.write_snapshot(path, make_stacks(1))
+
+    loaded = snapshot.Snapshot(path)
+    stack = Stack(next(iter(loaded)))
+    stack.stack_status = "DELETE_IN_PROGRESS"
+    assert stack.stack_status == "DELETE_IN_PROGRESS"
+    assert next(iter(loaded))["StackStatus"] == "CREATE_COMPLETE"
+    assert "ParentId" not in stack.detail
+    assert stack.parent_id is None
+    assert list(stack.detail) == list(snapshot.SNAPSHOT_FIELDS)
+
+    with pytest.raises(KeyError):
+        del stack.detail["StackId"]
+
+    loaded.close()
+
+
+def test_snapshot_errors(tmp_path):
+    """Tests Snapshot rejects files that aren't snapshots"""
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    not_snapshot = tmp_path / "state.json"
+    not_snapshot.write_bytes(b"{}" * 100)
+    truncated = tmp_path / "truncated.snapshot"
+    snapshot.write_snapshot(str(truncated), make_stacks(10))
+    truncated.write_bytes(truncated.read_bytes()[:200])
+
+    for path in [empty, not_snapshot, truncated]:
+        with pytest.raises(snapshot.SnapshotError):
+            snapshot.Snapshot(str(path))
+
+
+def test_snapshot_inventory(tmp_path):
+    """Tests restoring an inventory from a snapshot, and evaluating a strategy against it"""
+    path = str(tmp_path / "inventory.snapshot")
+    stacks = make_stacks(10)
+    snapshot.write_snapshot(path, stacks)
+
+    stack_inventory = inventory.Inventory(None)
+    stack_inventory.restore(list(snapshot.Snapshot(path)))
+    assert len(stack_inventory) == 10
+
+    # stacks last updated up to (and including) the sixth stack
+    strategy = LastUpdatedStrategy(timedelta(0), stacks[5].last_updated_at)
+    assert strategy.candidates(stack_inventory) == {
+        stack.stack_id for stack in stacks[:6]
+    }
+    assert stack_inventory.tag_values("team")["web"] == {
+        stack.stack_id for stack in stacks[::3]
+    }
+
+
+def test_snapshot_reads_only_used_fields(tmp_path, monkeypatch):
+    """Tests restoring an inventory from a snapshot only reads each stack's ID
+
+    Loading a snapshot is compared with decoding saved state by tests/benchmarks.py.
+    """
+    path = str(tmp_path / "inventory.snapshot")
+    snapshot.write_snapshot(path, make_stacks(100))
+
+    fields = []
+    read_field = snapshot.Snapshot.field
+    monkeypatch.setattr(
+        snapshot.Snapshot,
+        "field",
+        lambda loaded, index, key: fields.append(key) or read_field(loaded, index, key),
+    )
+    with snapshot.Snapshot(path) as loaded:
+        stack_inventory = inventory.Inventory(None)
+        stack_inventory.restore(list(loaded))
+
+        assert len(stack_inventory) == 100
+        assert set(fields) == {"StackId"}
@@ -0,0 +1,41 @@
+from stack_sweeper import cloudformation, inventory, stack_status_strategy
+
+from . import stubs
+from .conftest import StubbedClient
+
+
+def test_stack_status_strategy(stack: cloudformation.Stack):
+    """Tests StackStatusStrategy.evaluate()"""
+    strategy = stack_status_strategy.StackStatusStrategy(
+        ["ROLLBACK_COMPLETE", "CREATE_FAILED"]
+    )
+
+    stack.stack_status = "CREATE_COMPLETE"
+    assert not strategy.evaluate(stack).remove
+
+    stack.stack_status = "ROLLBACK_COMPLETE"
+    decision = strategy.evaluate(stack)
+    assert decision.remove
+    assert decision.reasons == ("status is ROLLBACK_COMPLETE",)
+
+
+def test_candidates(fake_cloudformation_client: StubbedClient):
+    """Tests StackStatusStrategy.candidates()"""
+    details = [
+        stubs.generate_stack_detail("failed", status="CREATE_FAILED"),
+        stubs.generate_stack_detail("complete"),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+
+    strategy = stack_status_strategy.StackStatusStrategy(["CREATE_FAILED"])
+    assert strategy.candidates(stack_inventory) == {details[0]["StackId"]}
+
+
+def test_str():
+    """Tests StackStatusStrategy.__str__()"""
+    strategy = stack_status_strategy.StackStatusStrategy(
+        ["ROLLBACK_COMPLETE", "CREATE_FAILED"]
+    )
+    assert str(strategy) == "StackStatusStrategy([ROLLBACK_COMPLETE, CREATE_FAILED])"
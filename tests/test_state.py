@@ -0,0 +1,185 @@
+# pylint:disable=redefined-outer-name
+from argparse import Namespace
+from datetime import datetime
+
+import boto3  # type: ignore
+import pytest
+from botocore.stub import Stubber  # type: ignore
+from dateutil.tz import tzutc
+
+from stack_sweeper import decision, inventory, state, sweeper
+
+from . import stubs
+from .conftest import StubbedClient
+
+PARAMETER_NAME = "/stack-sweeper/state"
+
+
+@pytest.fixture
+def fake_ssm_client() -> StubbedClient:  # type: ignore
+    """Creates a stubbed boto3 SSM client"""
+    ssm_client = boto3.client("ssm")
+    with Stubber(ssm_client) as stubbed_client:
+        yield StubbedClient(stubbed_client, ssm_client)
+        stubbed_client.assert_no_pending_responses()
+
+
+def test_encode_state():
+    """Tests state.encode_state() and state.decode_state() round trip, compressed"""
+    sweep_state = state.SweepState(
+        [{"StackId": f"stack-{index}", "Tags": []} for index in range(100)],
+        ["stack-1"],
+    )
+    value = state.encode_state(sweep_state)
+    assert len(value) < len(str(sweep_state._asdict())) / 4
+    assert state.decode_state(value) == sweep_state
+
+    # state that can't be decoded (e.g. mixed up chunks) is ignored, rather than raising
+    assert state.decode_state(value[:-8]) is None
+    assert state.decode_state("not base64!") is None
+    assert state.decode_state(value[8:]) is None
+
+
+def test_file_state_backend(tmp_path):
+    """Tests FileStateBackend"""
+    backend = state.get_state_backend(str(tmp_path / "state"))
+    assert isinstance(backend, state.FileStateBackend)
+    assert backend.load() is None
+
+    backend.save("saved")
+    backend.save("saved again")
+    assert backend.load() == "saved again"
+
+
+def test_ssm_state_backend(fake_ssm_client: StubbedClient):
+    """Tests SsmStateBackend"""
+    backend = state.SsmStateBackend(fake_ssm_client.client, PARAMETER_NAME)
+
+    stubs.stub_get_parameter_unset(fake_ssm_client.stub, PARAMETER_NAME)
+    assert backend.load() is None
+
+    stubs.stub_put_parameter_value(
+        fake_ssm_client.stub,
+        PARAMETER_NAME,
+        state.SSM_PARAMETER_DESCRIPTION,
+        "saved",
+        tier=state.SSM_PARAMETER_TIER,
+    )
+    backend.save("saved")
+
+    stubs.stub_get_parameter_value(fake_ssm_client.stub, PARAMETER_NAME, "saved")
+    assert backend.load() == "saved"
+
+    backend = state.get_state_backend(f"ssm:{PARAMETER_NAME}", "ap-southeast-2")
+    assert isinstance(backend, state.SsmStateBackend)
+    assert backend.name == PARAMETER_NAME
+
+
+def test_ssm_state_backend_chunks(fake_ssm_client: StubbedClient):
+    """Tests SsmStateBackend splits state too large for one parameter"""
+    backend = state.SsmStateBackend(fake_ssm_client.client, PARAMETER_NAME)
+    value = "a" * state.SSM_PARAMETER_MAX_SIZE + "b"
+    manifest = f"chunks:2:{state.state_checksum(value)}"
+
+    for name, chunk in [
+        (f"{PARAMETER_NAME}-0", "a" * state.SSM_PARAMETER_MAX_SIZE),
+        (f"{PARAMETER_NAME}-1", "b"),
+        (PARAMETER_NAME, manifest),
+    ]:
+        stubs.stub_put_parameter_value(
+            fake_ssm_client.stub,
+            name,
+            state.SSM_PARAMETER_DESCRIPTION,
+            chunk,
+            tier=state.SSM_PARAMETER_TIER,
+        )
+    backend.save(value)
+
+    stubs.stub_get_parameter_value(fake_ssm_client.stub, PARAMETER_NAME, manifest)
+    stubs.stub_get_parameters_values(
+        fake_ssm_client.stub,
+        {
+            f"{PARAMETER_NAME}-0": "a" * state.SSM_PARAMETER_MAX_SIZE,
+            f"{PARAMETER_NAME}-1": "b",
+        },
+    )
+    assert backend.load() == value
+
+    # chunks from different saves (e.g. read while another run saves) lose the state
+    stubs.stub_get_parameter_value(fake_ssm_client.stub, PARAMETER_NAME, manifest)
+    stubs.stub_get_parameters_values(
+        fake_ssm_client.stub,
+        {
+            f"{PARAMETER_NAME}-0": "c" * state.SSM_PARAMETER_MAX_SIZE,
+            f"{PARAMETER_NAME}-1": "b",
+        },
+    )
+    assert backend.load() is None
+
+    # as does a manifest without a checksum
+    stubs.stub_get_parameter_value(fake_ssm_client.stub, PARAMETER_NAME, "chunks:2")
+    assert backend.load() is None
+
+    # a chunk that's gone loses the state, rather than loading part of it
+    stubs.stub_get_parameter_value(fake_ssm_client.stub, PARAMETER_NAME, manifest)
+    stubs.stub_get_parameters_values(
+        fake_ssm_client.stub,
+        {f"{PARAMETER_NAME}-0": "a"},
+        [f"{PARAMETER_NAME}-0", f"{PARAMETER_NAME}-1"],
+    )
+    assert backend.load() is None
+
+    # state too large for every chunk fails before anything is saved
+    with pytest.raises(state.StateTooLargeError):
+        backend.save("a" * state.SSM_PARAMETER_MAX_SIZE * state.SSM_MAX_CHUNKS + "b")
+
+
+def test_resume(fake_cloudformation_client: StubbedClient, tmp_path):
+    """Tests a stateless run resumes an incremental inventory and in-progress deletions"""
+    details = [
+        stubs.generate_stack_detail(
+            name,
+            tags={"Team": name},
+            last_updated_at=datetime(2020, 1, 1, tzinfo=tzutc()),
+        )
+        for name in ["deleted", "unchanged"]
+    ]
+    backend = state.FileStateBackend(str(tmp_path / "state"))
+
+    # the first run performs a full inventory, and deletes a stack without waiting
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    first_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    assert not state.restore_state(backend, first_inventory)
+    first_inventory.refresh()
+    deleted = first_inventory.get(details[0]["StackId"])
+    result = sweeper.SweepResult(2, [decision.Decision(deleted, True)], [], [])
+    state.save_state(
+        backend, first_inventory, Namespace(delete=True, wait=False), result
+    )
+
+    # the next run only needs a list_stacks to catch up
+    second_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    saved = state.restore_state(backend, second_inventory)
+    assert saved.deleting == [details[0]["StackId"]]
+    restored = second_inventory.get(details[0]["StackId"])
+    assert restored.tags == {"Team": "deleted"}
+    assert restored.last_updated_at == deleted.last_updated_at
+
+    # the deletion failed since, which list_stacks reports
+    details[0]["StackStatus"] = "DELETE_FAILED"
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, details)
+    changes = second_inventory.refresh()
+    assert not any(changes)
+    assert len(second_inventory) == 2
+    assert state.report_deletions(saved, second_inventory) == [restored]
+
+    # or completed, so it's no longer listed
+    stubs.stub_list_stacks(fake_cloudformation_client.stub, details[1:])
+    second_inventory.refresh()
+    assert not state.report_deletions(saved, second_inventory)
+
+
+def test_state_backend_is_abstract():
+    """Tests StateBackend can't be used without implementing it"""
+    with pytest.raises(TypeError):
+        state.StateBackend()  # pylint: disable=abstract-class-instantiated
@@ -0,0 +1,234 @@
+# pylint:disable=redefined-outer-name
+from argparse import Namespace
+
+import pytest
+
+from stack_sweeper import cleaner, cloudformation, inventory, leases, sweeper
+
+from . import stubs
+from .conftest import (
+    STACK_ID,
+    AlwaysFalseStrategy,
+    CandidateStrategy,
+    ReasonedStrategy,
+    StubbedClient,
+)
+
+
+@pytest.fixture
+def sweep_namespace() -> Namespace:
+    """A pytest fixture that provides the Namespace options used while sweeping"""
+    return Namespace(
+        delete=True,
+        wait=False,
+        disable_termination_protection=False,
+        empty_resources=False,
+        workers=1,
+        delete_retries=0,
+        retry_delay=0,
+        retain_failed_resources=False,
+        lease_store=None,
+        region="ap-southeast-2",
+    )
+
+
+def test_sweep_dry_run(sweep_namespace: Namespace, stack: cloudformation.Stack):
+    """Tests sweeper.sweep() without --delete"""
+    sweep_namespace.delete = False
+    result = sweeper.sweep(sweep_namespace, ReasonedStrategy("because"), [stack])
+    assert result.stacks == 1
+    assert [decision.stack for decision in result.selected] == [stack]
+    assert not result.failed
+
+
+def test_sweep_delete(
+    sweep_namespace: Namespace,
+    fake_cloudformation_client: StubbedClient,
+    stack: cloudformation.Stack,
+):
+    """Tests sweeper.sweep() deleting stacks"""
+    result = sweeper.sweep(sweep_namespace, AlwaysFalseStrategy(), [stack])
+    assert not result.selected
+
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+    result = sweeper.sweep(sweep_namespace, ReasonedStrategy("because"), [stack])
+    assert len(result.selected) == 1
+    assert not result.failed
+
+    stubs.stub_delete_stack_error(fake_cloudformation_client.stub, "Can not delete")
+    result = sweeper.sweep(sweep_namespace, ReasonedStrategy("because"), [stack])
+    assert result.failed == [stack]
+
+
+def test_delete_stacks_leases(
+    sweep_namespace: Namespace,
+    fake_cloudformation_client: StubbedClient,
+    stack: cloudformation.Stack,
+    tmp_path,
+):
+    """Tests sweeper.delete_stacks() skips stacks leased by another sweeper"""
+    sweep_namespace.lease_store = f"sqlite:///{tmp_path / 'leases.db'}"
+    sweep_namespace.lease_seconds = 60
+    other_sweeper = leases.get_lease_store(sweep_namespace.lease_store)
+
+    assert other_sweeper.acquire(STACK_ID, "other-sweeper", 60)
+    assert not sweeper.delete_stacks(sweep_namespace, [stack])
+
+    # the lease is released once the stack is deleted
+    other_sweeper.release(STACK_ID, "other-sweeper")
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+    assert not sweeper.delete_stacks(sweep_namespace, [stack])
+    assert other_sweeper.acquire(STACK_ID, "other-sweeper", 60)
+
+
+def test_delete_stack_termination_protection(
+    sweep_namespace: Namespace,
+    fake_cloudformation_client: StubbedClient,
+    stack: cloudformation.Stack,
+):
+    """Tests sweeper.delete_stack() disables termination protection when requested"""
+    sweep_namespace.disable_termination_protection = True
+    stubs.stub_describe_stack(
+        fake_cloudformation_client.stub, STACK_ID, "CREATE_COMPLETE", True
+    )
+    stubs.stub_update_termination_protection(
+        fake_cloudformation_client.stub, STACK_ID, False
+    )
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+    sweeper.delete_stack(sweep_namespace, stack)
+
+
+def test_delete_stack_empty_resources(
+    sweep_namespace: Namespace,
+    fake_cloudformation_client: StubbedClient,
+    stack: cloudformation.Stack,
+    monkeypatch,
+):
+    """Tests sweeper.delete_stack() only empties the resources that failed to delete"""
+    emptied = []
+    monkeypatch.setattr(
+        cleaner,
+        "empty_blocking_resources",
+        lambda stack, s3, ecr, logical_resource_ids: emptied.append(
+            logical_resource_ids
+        ),
+    )
+    sweep_namespace.empty_resources = True
+
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+    sweeper.delete_stack(sweep_namespace, stack)
+    assert not emptied
+
+    stack.failed_resources = ["Bucket"]
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+    sweeper.delete_stack(sweep_namespace, stack)
+    assert emptied == [["Bucket"]]
+
+    # the stack is still deleted when its resources can't be emptied
+    def not_emptied(stack, s3, ecr, logical_resource_ids):
+        raise cleaner.BucketNotEmptiedError("bucket", "key", "Access Denied")
+
+    monkeypatch.setattr(cleaner, "empty_blocking_resources", not_emptied)
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+    sweeper.delete_stack(sweep_namespace, stack)
+    fake_cloudformation_client.stub.assert_no_pending_responses()
+
+
+def test_delete_stacks_retries(
+    sweep_namespace: Namespace,
+    fake_cloudformation_client: StubbedClient,
+    stack: cloudformation.Stack,
+):
+    """Tests sweeper.delete_stacks() retries failed deletions, retaining resources last"""
+    sweep_namespace.wait = True
+    sweep_namespace.delete_retries = 1
+    sweep_namespace.retain_failed_resources = True
+
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+    stubs.stub_describe_stack(
+        fake_cloudformation_client.stub, STACK_ID, "DELETE_FAILED"
+    )
+    stubs.stub_describe_stack_delete_failed_events(
+        fake_cloudformation_client.stub, STACK_ID, ["Bucket"]
+    )
+    stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID, ["Bucket"])
+    stubs.stub_describe_stack(
+        fake_cloudformation_client.stub, STACK_ID, "DELETE_COMPLETE"
+    )
+    stubs.stub_describe_stack_events(fake_cloudformation_client.stub, STACK_ID)
+
+    assert not sweeper.delete_stacks(sweep_namespace, [stack])
+
+
+def test_delete_stacks_retries_exhausted(
+    sweep_namespace: Namespace,
+    fake_cloudformation_client: StubbedClient,
+    stack: cloudformation.Stack,
+):
+    """Tests sweeper.delete_stacks() gives up once retries are exhausted"""
+    sweep_namespace.wait = True
+    sweep_namespace.delete_retries = 1
+
+    for _ in range(2):
+        stubs.stub_delete_stack(fake_cloudformation_client.stub, STACK_ID)
+        stubs.stub_describe_stack(
+            fake_cloudformation_client.stub, STACK_ID, "DELETE_FAILED"
+        )
+        stubs.stub_describe_stack_delete_failed_events(
+            fake_cloudformation_client.stub, STACK_ID, ["Bucket"]
+        )
+
+    assert sweeper.delete_stacks(sweep_namespace, [stack]) == [stack]
+
+
+def test_sweep_attaches_to_deletions(
+    sweep_namespace: Namespace,
+    fake_cloudformation_client: StubbedClient,
+    stack: cloudformation.Stack,
+):
+    """Tests sweeper.sweep() waits on stacks that are already being deleted"""
+    stack.stack_status = "DELETE_IN_PROGRESS"
+
+    # already deleting stacks are never evaluated, nor deleted again
+    sweep_namespace.delete = False
+    result = sweeper.sweep(sweep_namespace, ReasonedStrategy("because"), [stack])
+    assert result.stacks == 1
+    assert not result.selected
+    assert result.deleting == [stack]
+
+    # they're waited on when deleting
+    sweep_namespace.delete = True
+    sweep_namespace.wait = True
+    stubs.stub_describe_stack(
+        fake_cloudformation_client.stub, STACK_ID, "DELETE_COMPLETE"
+    )
+    stubs.stub_describe_stack_events(fake_cloudformation_client.stub, STACK_ID)
+    result = sweeper.sweep(sweep_namespace, ReasonedStrategy("because"), [stack])
+    assert not result.failed
+
+    # but not when --no-wait is used
+    sweep_namespace.wait = False
+    result = sweeper.sweep(sweep_namespace, ReasonedStrategy("because"), [stack])
+    assert result.deleting == [stack]
+
+
+def test_sweep_inventory_candidates(
+    sweep_namespace: Namespace, fake_cloudformation_client: StubbedClient
+):
+    """Tests sweeper.sweep() only evaluates an inventory's candidate stacks"""
+    details = [
+        stubs.generate_stack_detail("one"),
+        stubs.generate_stack_detail("two"),
+        stubs.generate_stack_detail("three", status="DELETE_IN_PROGRESS"),
+    ]
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+
+    sweep_namespace.delete = False
+    result = sweeper.sweep(
+        sweep_namespace, CandidateStrategy({details[1]["StackId"]}), stack_inventory
+    )
+    assert result.stacks == 3
+    assert [decision.stack.name for decision in result.selected] == ["two"]
+    assert [stack.name for stack in result.deleting] == ["three"]
@@ -0,0 +1,76 @@
+# pylint:disable=redefined-outer-name
+from datetime import datetime
+
+import pytest
+from dateutil.tz import tzutc
+
+from stack_sweeper import (
+    exclude_names_strategy,
+    inventory,
+    nested_strategies,
+    threshold_plan,
+)
+
+from . import stubs
+from .conftest import StubbedClient
+
+COMPARE_TIME = datetime(2020, 12, 31, tzinfo=tzutc())
+
+
+@pytest.fixture
+def stack_inventory(fake_cloudformation_client: StubbedClient) -> inventory.Inventory:
+    """A pytest fixture that provides an inventory of stacks of various ages"""
+    details = [
+        stubs.generate_stack_detail(
+            name, last_updated_at=datetime(2020, month, 1, tzinfo=tzutc())
+        )
+        for name, month in [
+            ("december", 12),
+            ("june", 6),
+            ("excluded-june", 6),
+            ("september", 9),
+            ("january", 1),
+        ]
+    ]
+    details.append(
+        stubs.generate_stack_detail(
+            "deleting",
+            last_updated_at=datetime(2020, 1, 1, tzinfo=tzutc()),
+            status="DELETE_IN_PROGRESS",
+        )
+    )
+    stubs.stub_describe_stacks(fake_cloudformation_client.stub, details)
+
+    stack_inventory = inventory.Inventory(fake_cloudformation_client.client)
+    stack_inventory.load()
+    return stack_inventory
+
+
+def test_plan_thresholds(stack_inventory: inventory.Inventory):
+    """Tests threshold_plan.plan_thresholds()"""
+    exclusion = nested_strategies.NestedAllStrategy(
+        [
+            exclude_names_strategy.ExcludeNamesStrategy(
+                exclude_name_prefixes=["excluded-"]
+            )
+        ]
+    )
+    plans = threshold_plan.plan_thresholds(
+        stack_inventory, [180, 30, 90, 90, 365], exclusion, COMPARE_TIME
+    )
+
+    assert [plan.days for plan in plans] == [30, 90, 180, 365]
+    assert [[stack.name for stack in plan.stacks] for plan in plans] == [
+        ["january", "june", "september", "december"],
+        ["january", "june", "september"],
+        ["january", "june"],
+        ["january"],
+    ]
+
+
+def test_plan_thresholds_without_exclusions(stack_inventory: inventory.Inventory):
+    """Tests threshold_plan.plan_thresholds() with nothing excluded"""
+    plans = threshold_plan.plan_thresholds(
+        stack_inventory, [7], nested_strategies.NestedAllStrategy([]), COMPARE_TIME
+    )
+    assert len(plans[0].stacks) == 5